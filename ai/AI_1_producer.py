@@ -4,11 +4,18 @@
 #   python ai_1_producer.py sample/ai_1_input.json -o sample/ai_1_output.json -k 3
 # BE단에서 받은 factpack.v1.1형식의 be_input.json을 ai_1_output.json 으로 변환
 
-import os, json, math, hashlib, argparse
-from typing import Any, Dict, List, Tuple
+import os, json, math, time, bisect, hashlib, argparse
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime, timezone, timedelta
-from openai import OpenAI
+import numpy as np
 from dotenv import load_dotenv
+from llm_cache import LLMCache, make_key, DEFAULT_TTL_SEC, DEFAULT_MAX_ENTRIES
+from llm_backend import shared_client, estimate_tokens, without_retries, parse_json_object
+from rule_tagger import split_by_rules, DEFAULT_RULE_THRESHOLD
+from telemetry import TELEMETRY
+from tracing import TRACER, traced
 
 load_dotenv()
 
@@ -17,9 +24,28 @@ load_dotenv()
 # client = OpenAI(api_key=os.environ["OPENAI_API_KEY_1"])
 
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")  # 가성비형 모델 기본값
-client = OpenAI()  # 환경변수 OPENAI_API_KEY 사용
+# LLM 클라이언트는 첫 호출 때 만든다 (get_client). 여기에 직접 넣으면 그 클라이언트를 사용 (테스트/주입용)
+client = None
+
+
+def get_client():
+    """LLM 클라이언트 접근자: 주입된 client, 없으면 프로세스 공용 클라이언트 (첫 사용 시 생성.
+    환경변수 OPENAI_API_KEY 사용, MASIL_LLM_BACKEND=fake|record|replay 로 대체 가능)"""
+    return client if client is not None else shared_client()
+
+
+# 보강 배치 계획: 배치 크기(-b)는 상한이고, 예상 토큰(프롬프트+응답)이 예산을 넘지 않게 묶는다.
+# 실패/부분 응답 배치는 누락 job_id만 반으로 나눠 재시도 (최대 ENRICH_MAX_SPLIT_DEPTH 단계)
+# 아래 값은 환경변수로 정하는 기본값. 실행별 값은 token_budget/max_split_depth/rule_threshold 인자로 넘긴다
+# (CLI가 모듈 전역을 바꾸면 같은 프로세스에서 import해 쓰는 오케스트레이터/파이프라인/스풀 워커에 값이 남음)
+ENRICH_TOKEN_BUDGET = int(os.getenv("ENRICH_TOKEN_BUDGET", "6000"))
+ENRICH_MAX_SPLIT_DEPTH = int(os.getenv("ENRICH_MAX_SPLIT_DEPTH", "2"))
+ENRICH_ITEM_OUTPUT_TOKENS = 80  # 후보 1건 응답(org/desc/features) 예상 토큰
+# 규칙 태거 빠른 경로: 임계값이 있으면 규칙 신뢰도가 그 이상인 공고는 LLM을 건너뜀 (None=끔)
+RULE_THRESHOLD: Optional[float] = float(os.environ["ENRICH_RULE_THRESHOLD"]) if os.getenv("ENRICH_RULE_THRESHOLD") else None
 
 WEEKDAYS = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
+DAY_MIN = 24*60
 
 # ---------------- 시간/거리/임금 유틸 (결정론) ----------------
 def parse_time_to_min(s: str) -> int:
@@ -65,6 +91,74 @@ time_fit(합성):
 geometric_mean(job_norm, intersection_norm, user_fit_ratio)
 → 세 지표를 균형 있게 반영(어느 하나가 낮으면 전체가 내려가는 특성)
 """
+class AvailabilityProfile:
+    """
+    사용자 가용 시간(availability_json)을 한 번만 파싱해 둔 컴파일 결과. factpack 하나(또는 같은 사용자의
+    여러 요청) 동안 재사용해 후보마다 문자열을 다시 파싱하지 않는다.
+      - slots[d]: d요일(0=Mon)의 (start_min, end_min) 정수 구간 튜플. 정렬·병합되어 서로 겹치지 않음
+      - min_by_day[d]: d요일 가용 분 합, total_min: 주간 합
+    자정을 넘는 슬롯(예: 22:00–02:00)은 당일 [22:00, 24:00)과 다음 요일 [00:00, 02:00)로 나눠 넣는다.
+    """
+    __slots__ = ("slots", "min_by_day", "total_min")
+
+    def __init__(self, slots: List[List[Tuple[int, int]]]):
+        self.slots: Tuple[Tuple[Tuple[int, int], ...], ...] = tuple(merge_intervals(d) for d in slots)
+        self.min_by_day: Tuple[int, ...] = tuple(sum(e - s for s, e in d) for d in self.slots)
+        self.total_min: int = sum(self.min_by_day)
+
+
+def merge_intervals(intervals: List[Tuple[int, int]]) -> Tuple[Tuple[int, int], ...]:
+    merged: List[List[int]] = []
+    for s, e in sorted(intervals):
+        if merged and s <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], e)
+        else:
+            merged.append([s, e])
+    return tuple((s, e) for s, e in merged)
+
+
+# 회원가입/프로필 화면(SignUpForm.jsx, MyProfilePage.jsx dayTimeSchedule)이 저장하는 형식:
+#   {"월": ["오전", "저녁"], "화": [], ...}  → 요일 키는 한글, 슬롯은 시간대 이름
+# 시간대 이름은 아래 구간으로 본다. factpack 형식({"Mon": [["09:00", "12:00"]]})과 섞여 있어도 된다.
+AVAIL_DAY_ALIASES = {"월": "Mon", "화": "Tue", "수": "Wed", "목": "Thu", "금": "Fri", "토": "Sat", "일": "Sun"}
+AVAIL_SLOT_LABELS = {"오전": ("06:00", "12:00"), "오후": ("12:00", "18:00"), "저녁": ("18:00", "22:00")}
+
+
+def _availability_slot(slot: Any) -> Tuple[str, str]:
+    """슬롯 하나 → (시작, 종료) 문자열. ["HH:MM", "HH:MM"] 또는 시간대 이름("오전"/"오후"/"저녁")"""
+    if isinstance(slot, str):
+        if slot not in AVAIL_SLOT_LABELS:
+            raise ValueError(f"알 수 없는 시간대: {slot!r}")
+        return AVAIL_SLOT_LABELS[slot]
+    return slot[0], slot[1]
+
+
+def compile_availability(availability_json: Dict[str, List[Any]]) -> AvailabilityProfile:
+    """
+    availability_json → AvailabilityProfile. 요일 키는 "Mon"… 또는 한글("월"…),
+    슬롯은 ["HH:MM", "HH:MM"] 또는 시간대 이름(AVAIL_SLOT_LABELS). 알 수 없는 요일 키는 무시.
+    JSON 문자열로 저장된 값(회원가입 화면의 JSON.stringify)도 받는다.
+    """
+    if isinstance(availability_json, str):
+        availability_json = json.loads(availability_json) if availability_json.strip() else {}
+    by_day: Dict[str, List[Any]] = {}
+    for key, day_slots in (availability_json or {}).items():
+        by_day.setdefault(AVAIL_DAY_ALIASES.get(key, key), []).extend(day_slots or [])
+    slots: List[List[Tuple[int, int]]] = [[] for _ in WEEKDAYS]
+    for i, day in enumerate(WEEKDAYS):
+        for slot in by_day.get(day, []):
+            start, end = _availability_slot(slot)
+            s = min(parse_time_to_min(start[:5]), DAY_MIN); e = min(parse_time_to_min(end[:5]), DAY_MIN)
+            if e > s:
+                slots[i].append((s, e))
+            elif e < s:
+                # 자정 넘김: 당일 꼬리 + 다음 요일 머리로 분할
+                slots[i].append((s, DAY_MIN))
+                if e > 0:
+                    slots[(i + 1) % 7].append((0, e))
+    return AvailabilityProfile(slots)
+
+
 def compute_time_overlap_metrics(availability_json: Dict[str, List[List[str]]],
                                  work_days_bits: str, start_time: str, end_time: str) -> Dict[str, float]:
     """
@@ -76,8 +170,20 @@ def compute_time_overlap_metrics(availability_json: Dict[str, List[List[str]]],
       - time_fit: composite score combining the three (geometric mean for balance)
 
     Supports overnight shifts (e.g., 22:00–02:00), counting overlap against the start day and the next day.
+    When scoring many candidates for one user, compile the availability once with compile_availability()
+    and call time_overlap_metrics_from_profile() (or the batch version) instead.
     """
-    cand_days = parse_work_days(work_days_bits)
+    return time_overlap_metrics_from_profile(compile_availability(availability_json),
+                                             work_days_bits, start_time, end_time)
+
+
+def time_overlap_metrics_from_profile(profile: AvailabilityProfile,
+                                      work_days_bits: str, start_time: str, end_time: str) -> Dict[str, float]:
+    """compute_time_overlap_metrics와 같은 지표를 미리 컴파일된 AvailabilityProfile로 계산."""
+    bits = (work_days_bits or "").strip()
+    if len(bits) != 7 or not set(bits) <= {"0","1"}:
+        return {"job_norm": 0.0, "intersection_norm": 0.0, "user_fit_ratio": 0.0, "time_fit": 0.0}
+    cand_days = [i for i, ch in enumerate(bits) if ch == "1"]
     if not cand_days:
         return {"job_norm": 0.0, "intersection_norm": 0.0, "user_fit_ratio": 0.0, "time_fit": 0.0}
 
@@ -87,62 +193,34 @@ def compute_time_overlap_metrics(availability_json: Dict[str, List[List[str]]],
     overnight = False
     if c_end <= c_start:
         # Treat as overnight: end on next day
-        c_end += 24*60
+        c_end += DAY_MIN
         overnight = True
     day_sched = c_end - c_start  # per day
 
-    # Precompute user availability per weekday in minutes and total
-    def slots_minutes(slots: List[List[str]]) -> int:
-        total = 0
-        for slot in slots or []:
-            s = parse_time_to_min(slot[0][:5]); e = parse_time_to_min(slot[1][:5])
-            if e <= s:
-                # Skip user overnight slots for now; recommend splitting into two slots if needed
-                continue
-            total += (e - s)
-        return total
-
-    user_total_min = 0
-    user_min_by_day = {}
-    for day in WEEKDAYS:
-        mins = slots_minutes(availability_json.get(day, []))
-        user_min_by_day[day] = mins
-        user_total_min += mins
-
-    # Overlap for a shift that STARTS on `day`
-    def overlap_with_day(day: str) -> int:
+    def overlap_slots(slots: Tuple[Tuple[int, int], ...], seg_start: int, seg_end: int) -> int:
         olap = 0
-        # Segment A: [c_start, min(c_end, 1440)) on `day`
-        segA_start, segA_end = c_start, min(c_end, 1440)
-        if segA_end > segA_start:
-            for slot in availability_json.get(day, []):
-                s = parse_time_to_min(slot[0][:5]); e = parse_time_to_min(slot[1][:5])
-                if e > s:
-                    olap += interval_overlap_min(segA_start, segA_end, s, e)
-        # Segment B: if overnight, [0, c_end-1440) on next day
-        if overnight and c_end > 1440:
-            next_idx = (WEEKDAYS.index(day) + 1) % 7
-            next_day = WEEKDAYS[next_idx]
-            segB_start, segB_end = 0, c_end - 1440
-            if segB_end > segB_start:
-                for slot in availability_json.get(next_day, []):
-                    s = parse_time_to_min(slot[0][:5]); e = parse_time_to_min(slot[1][:5])
-                    if e > s:
-                        olap += interval_overlap_min(segB_start, segB_end, s, e)
+        for s, e in slots:
+            if s >= seg_end: break  # 정렬되어 있으므로 이후 슬롯은 겹치지 않음
+            olap += interval_overlap_min(seg_start, seg_end, s, e)
         return olap
 
     overlap_min = 0
     intersection_days = 0
-    for day in cand_days:
-        overlap_d = overlap_with_day(day)
+    for d in cand_days:
+        nxt = (d + 1) % 7
+        # Segment A: [c_start, min(c_end, 1440)) on the start day
+        olap = overlap_slots(profile.slots[d], c_start, min(c_end, DAY_MIN))
+        # Segment B: if overnight, [0, c_end-1440) on the next day
+        if overnight and c_end > DAY_MIN:
+            olap += overlap_slots(profile.slots[nxt], 0, c_end - DAY_MIN)
         # Cap per-day overlap by the daily schedule minutes
-        overlap_min += min(overlap_d, day_sched)
+        overlap_min += min(olap, day_sched)
         # Count "intersection-eligible" days
-        next_day = WEEKDAYS[(WEEKDAYS.index(day)+1) % 7]
-        if user_min_by_day.get(day, 0) > 0 or (overnight and user_min_by_day.get(next_day, 0) > 0):
+        if profile.min_by_day[d] > 0 or (overnight and profile.min_by_day[nxt] > 0):
             intersection_days += 1
 
     job_total_min = day_sched * len(cand_days)
+    user_total_min = profile.total_min
 
     # Metrics
     job_norm = (overlap_min / job_total_min) if job_total_min > 0 else 0.0
@@ -165,6 +243,104 @@ def compute_time_overlap_metrics(availability_json: Dict[str, List[List[str]]],
     }
 
 
+# ---------------- 시간 겹침 배치 엔진 (NumPy, 주간 분 단위 비트맵) ----------------
+def encode_availability_week(profile: AvailabilityProfile) -> np.ndarray:
+    """컴파일된 가용 시간을 (7, 1440) 분 단위 bool 배열(주간 비트맵)로 인코딩."""
+    week = np.zeros((7, DAY_MIN), dtype=bool)
+    for i, day_slots in enumerate(profile.slots):
+        for s, e in day_slots:
+            week[i, s:e] = True
+    return week
+
+
+def encode_work_days(work_days_list: List[str]) -> np.ndarray:
+    """work_days 7비트 문자열 목록 -> (N, 7) bool 마스크. 형식이 잘못된 행은 전부 False."""
+    mask = np.zeros((len(work_days_list), 7), dtype=bool)
+    for n, bits in enumerate(work_days_list):
+        bits = (bits or "").strip()
+        if len(bits) == 7 and set(bits) <= {"0","1"}:
+            mask[n] = [ch == "1" for ch in bits]
+    return mask
+
+
+def compute_time_overlap_metrics_batch(availability,
+                                       work_days_list: List[str],
+                                       start_times: List[str],
+                                       end_times: List[str]) -> List[Dict[str, float]]:
+    """
+    compute_time_overlap_metrics의 배치 버전. 후보 N개의 결과 dict 목록을 입력 순서대로 반환하며,
+    값은 후보별로 compute_time_overlap_metrics를 호출한 결과와 정확히 같다.
+    availability: availability_json(dict) 또는 compile_availability()로 만든 AvailabilityProfile.
+
+    사용자 가용 시간은 (7, 1440) 비트맵으로 한 번만 인코딩하고, 주 2회분을 이어 붙인 누적합으로
+    (후보 × 시작 요일)마다 근무 구간의 겹침 분을 O(1)에 구한다(일→월 자정 넘김 포함).
+    근무 시각은 00:00~24:00 범위를 가정한다.
+    """
+    n = len(work_days_list)
+    if n == 0:
+        return []
+
+    profile = availability if isinstance(availability, AvailabilityProfile) else compile_availability(availability)
+    week = encode_availability_week(profile)
+    user_min_by_day = np.array(profile.min_by_day, dtype=np.int64)
+    user_total_min = profile.total_min
+
+    flat = week.ravel().astype(np.int64)
+    prefix = np.concatenate(([0], np.cumsum(np.concatenate((flat, flat)))))
+
+    day_mask = encode_work_days(work_days_list)
+    c_start = np.array([parse_time_to_min(t) for t in start_times], dtype=np.int64)
+    c_end = np.array([parse_time_to_min(t) for t in end_times], dtype=np.int64)
+    overnight = c_end <= c_start
+    c_end = np.where(overnight, c_end + DAY_MIN, c_end)
+    day_sched = c_end - c_start
+
+    day_off = (np.arange(7, dtype=np.int64) * DAY_MIN)[None, :]          # (1, 7)
+    # Segment A: 시작 요일의 [c_start, min(c_end, 1440))
+    a_lo = np.minimum(c_start, DAY_MIN)[:, None]
+    a_hi = np.maximum(np.minimum(c_end, DAY_MIN)[:, None], a_lo)
+    seg_a = prefix[day_off + a_hi] - prefix[day_off + a_lo]
+    # Segment B: 자정을 넘기면 다음 요일의 [0, c_end-1440)
+    b_hi = np.where(overnight, np.clip(c_end - DAY_MIN, 0, DAY_MIN), 0)[:, None]
+    seg_b = prefix[day_off + DAY_MIN + b_hi] - prefix[day_off + DAY_MIN]
+    # 요일별 겹침은 하루 근무분으로 상한
+    per_day = np.minimum(seg_a + seg_b, day_sched[:, None])
+    overlap_min = np.where(day_mask, per_day, 0).sum(axis=1)
+
+    has_user = user_min_by_day > 0
+    eligible = has_user[None, :] | (overnight[:, None] & np.roll(has_user, -1)[None, :])
+    intersection_days = (eligible & day_mask).sum(axis=1)
+    job_days = day_mask.sum(axis=1)
+    job_total_min = day_sched * job_days
+    inter_den = day_sched * np.maximum(intersection_days, 1)
+
+    ov = overlap_min.astype(np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        job_norm = np.where(job_total_min > 0, ov / job_total_min, 0.0)
+        intersection_norm = np.where(inter_den > 0, ov / inter_den, 0.0)
+        user_fit_ratio = ov / user_total_min if user_total_min > 0 else np.zeros(n)
+
+    # 합성/반올림은 스칼라 함수와 비트 단위로 같도록 파이썬 float 연산으로 마무리
+    eps = 1e-6
+    out: List[Dict[str, float]] = []
+    for i in range(n):
+        if job_days[i] == 0:
+            out.append({"job_norm": 0.0, "intersection_norm": 0.0, "user_fit_ratio": 0.0, "time_fit": 0.0})
+            continue
+        jn, inn, uf = float(job_norm[i]), float(intersection_norm[i]), float(user_fit_ratio[i])
+        time_fit = ((jn+eps) * (inn+eps) * (uf+eps)) ** (1/3) - eps
+        out.append({
+            "job_norm": round(jn, 2),
+            "intersection_norm": round(inn, 2),
+            "user_fit_ratio": round(uf, 2),
+            "time_fit": round(time_fit, 2),
+            "overlap_min": int(overlap_min[i]),
+            "job_total_min": int(job_total_min[i]),
+            "user_total_min": user_total_min,
+        })
+    return out
+
+
 def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     R = 6371.0088
     phi1, phi2 = math.radians(lat1), math.radians(lat2)
@@ -180,6 +356,52 @@ def estimate_travel_min(distance_km: float) -> int:
     minutes = (distance_km / max(speed_kmh, 1e-6)) * 60 + penalty
     return int(round(minutes))
 
+# 후보 수가 이 값 이상이면 거리/이동시간을 NumPy 배열 연산으로 한 번에 계산
+GEO_BATCH_MIN = 32
+
+def haversine_km_batch(lat1: float, lon1: float, lats2, lons2) -> np.ndarray:
+    """haversine_km의 배열 버전: 사용자 좌표 1개 × 일자리 좌표 열(lat/lon 배열) -> 거리(km) 배열."""
+    R = 6371.0088
+    lats2 = np.asarray(lats2, dtype=np.float64); lons2 = np.asarray(lons2, dtype=np.float64)
+    phi1, phi2 = math.radians(lat1), np.radians(lats2)
+    dphi = phi2 - phi1; dlmb = np.radians(lons2 - lon1)
+    a = np.sin(dphi/2)**2 + math.cos(phi1)*np.cos(phi2)*np.sin(dlmb/2)**2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
+    return R * c
+
+def estimate_travel_min_batch(distance_km) -> np.ndarray:
+    """estimate_travel_min의 배열 버전 (도보/대중교통/차량 구간별 속도·패널티 동일)."""
+    d = np.asarray(distance_km, dtype=np.float64)
+    speed_kmh = np.where(d <= 1.5, 4.5, np.where(d <= 10, 18.0, 30.0))
+    penalty = np.where(d <= 1.5, 0, np.where(d <= 10, 10, 8))
+    minutes = (d / speed_kmh) * 60 + penalty
+    return np.rint(minutes).astype(np.int64)  # round()와 같은 짝수 반올림
+
+def compute_distance_travel(home_lat, home_lon, cands: List[Dict[str, Any]]) -> List[Tuple[Optional[float], Optional[int]]]:
+    """
+    후보별 (distance_km(소수 2자리), travel_min). 좌표가 하나라도 없으면 (None, None).
+    후보가 GEO_BATCH_MIN개 이상이면 배열 버전으로 계산(결과는 스칼라 버전과 동일).
+    """
+    def is_num(x): return isinstance(x, (int,float))
+    out: List[Tuple[Optional[float], Optional[int]]] = [(None, None)] * len(cands)
+    if not (is_num(home_lat) and is_num(home_lon)):
+        return out
+    idx = [i for i, c in enumerate(cands) if is_num(c.get("job_latitude")) and is_num(c.get("job_longitude"))]
+    if len(idx) < GEO_BATCH_MIN:
+        for i in idx:
+            c = cands[i]
+            distance_km = round(haversine_km(home_lat, home_lon, c["job_latitude"], c["job_longitude"]), 2)
+            out[i] = (distance_km, estimate_travel_min(distance_km))
+        return out
+    dist = haversine_km_batch(home_lat, home_lon,
+                              [cands[i]["job_latitude"] for i in idx],
+                              [cands[i]["job_longitude"] for i in idx])
+    dist_r = [round(float(x), 2) for x in dist]  # 파이썬 round와 같은 반올림 유지
+    travel = estimate_travel_min_batch(dist_r)
+    for j, i in enumerate(idx):
+        out[i] = (dist_r[j], int(travel[j]))
+    return out
+
 def percentile(sorted_vals: List[float], p: float) -> float:
     if not sorted_vals: return 0.0
     k = (len(sorted_vals)-1) * (p/100.0)
@@ -187,16 +409,145 @@ def percentile(sorted_vals: List[float], p: float) -> float:
     if f == c: return sorted_vals[int(k)]
     return sorted_vals[f]*(c-k) + sorted_vals[c]*(k-f)
 
-def compute_pay_norm(cands_in_region: List[Dict[str, Any]], wage: float) -> float:
-    wages = sorted([c.get("hourly_wage", 0) for c in cands_in_region if c.get("hourly_wage") is not None])
-    if len(wages) < 4:  # 지역 데이터가 적으면 전체 후보로 대체
-        wages = sorted([c.get("hourly_wage", 0) for c in cands_in_region if c.get("hourly_wage") is not None])
-    if not wages: return 0.0
-    p25, p75 = percentile(wages, 25), percentile(wages, 75)
+PAY_MIN_PLACE_SAMPLES = 4  # 지역 시급 표본이 이보다 적으면 전체 분포로 대체
+
+def pay_norm_from_quartiles(wage: float, p25: float, p75: float) -> float:
     if p75 <= p25: return 0.5
     norm = (wage - p25) / (p75 - p25)
     return float(min(1.0, max(0.0, round(norm, 2))))
 
+def compute_pay_norm(cands_in_region: List[Dict[str, Any]], wage: float,
+                     all_cands: Optional[List[Dict[str, Any]]] = None) -> float:
+    wages = sorted([c.get("hourly_wage", 0) for c in cands_in_region if c.get("hourly_wage") is not None])
+    if len(wages) < PAY_MIN_PLACE_SAMPLES and all_cands is not None:  # 지역 데이터가 적으면 전체 후보로 대체
+        wages = sorted([c.get("hourly_wage", 0) for c in all_cands if c.get("hourly_wage") is not None])
+    if not wages: return 0.0
+    return pay_norm_from_quartiles(wage, percentile(wages, 25), percentile(wages, 75))
+
+
+class WagePercentileIndex:
+    """
+    지역(place)별 시급 분포 인덱스. 정렬된 시급 목록과 p25/p75를 보관해 후보마다 pay_norm을 O(1)로 조회.
+    - 지역 표본이 min_place_samples 미만이면 전체(global) 분포의 p25/p75를 사용
+    - add/remove로 공고 추가·삭제를 반영 (해당 지역과 전체 분위수만 다시 계산)
+    - job_id가 있는 공고는 (place, wage)를 기억해 add_job을 다시 해도 중복 집계하지 않고 바뀐 값만 갱신
+    - save/load로 실행 간 재사용 가능 (JSON)
+    """
+
+    def __init__(self, min_place_samples: int = PAY_MIN_PLACE_SAMPLES):
+        self.min_place_samples = min_place_samples
+        self._by_place: Dict[str, List[float]] = {}
+        self._all: List[float] = []
+        self._jobs: Dict[str, Tuple[str, float]] = {}  # str(job_id) -> (place, wage)
+        self._quartiles: Dict[Optional[str], Tuple[float, float]] = {}  # None = 전체
+
+    @classmethod
+    def from_candidates(cls, cands: Iterable[Dict[str, Any]], min_place_samples: int = PAY_MIN_PLACE_SAMPLES):
+        idx = cls(min_place_samples)
+        for c in cands:
+            idx.add_job(c)
+        return idx
+
+    # ---- 증분 갱신 ----
+    def add(self, place: Optional[str], wage: Optional[float]) -> None:
+        if wage is None: return
+        place = place or ""
+        bisect.insort(self._by_place.setdefault(place, []), wage)
+        bisect.insort(self._all, wage)
+        self._quartiles.pop(place, None); self._quartiles.pop(None, None)
+
+    def remove(self, place: Optional[str], wage: Optional[float]) -> bool:
+        """해당 지역의 시급 값 하나를 제거. 없으면 False."""
+        if wage is None: return False
+        place = place or ""
+        wages = self._by_place.get(place, [])
+        i = bisect.bisect_left(wages, wage)
+        if i >= len(wages) or wages[i] != wage:
+            return False
+        del wages[i]
+        if not wages:
+            del self._by_place[place]
+        del self._all[bisect.bisect_left(self._all, wage)]
+        self._quartiles.pop(place, None); self._quartiles.pop(None, None)
+        return True
+
+    def add_job(self, cand: Dict[str, Any]) -> bool:
+        """
+        공고 하나를 반영 (job_id 기준 upsert). 이미 같은 (place, wage)로 들어 있으면 그대로,
+        값이 바뀌었으면 이전 값을 빼고 새 값을 넣는다. 반환: 인덱스가 바뀌었는지 여부.
+        """
+        place, wage = cand.get("place") or "", cand.get("hourly_wage")
+        jid = cand.get("job_id")
+        if jid is None:
+            self.add(place, wage)
+            return wage is not None
+        key = str(jid)
+        old = self._jobs.get(key)
+        if old == (place, wage) or (old is None and wage is None):
+            return False
+        if old is not None:
+            self.remove(*old)
+            del self._jobs[key]
+        if wage is not None:
+            self.add(place, wage)
+            self._jobs[key] = (place, wage)
+        return True
+
+    def remove_job(self, cand: Dict[str, Any]) -> bool:
+        jid = cand.get("job_id")
+        if jid is None:
+            return self.remove(cand.get("place"), cand.get("hourly_wage"))
+        old = self._jobs.pop(str(jid), None)
+        return old is not None and self.remove(*old)
+
+    def upsert_jobs(self, cands: Iterable[Dict[str, Any]]) -> int:
+        """여러 공고를 add_job으로 반영하고 바뀐 공고 수를 반환 (저장된 인덱스를 현재 입력으로 갱신할 때)."""
+        return sum(1 for c in cands if self.add_job(c))
+
+    # ---- 조회 ----
+    def quartiles(self, place: Optional[str]) -> Optional[Tuple[float, float]]:
+        """place의 (p25, p75). 표본 부족 시 전체 분포, 전체도 비면 None."""
+        place = place or ""
+        key: Optional[str] = place if len(self._by_place.get(place, [])) >= self.min_place_samples else None
+        q = self._quartiles.get(key)
+        if q is None:
+            wages = self._by_place[place] if key is not None else self._all
+            if not wages:
+                return None
+            q = self._quartiles[key] = (percentile(wages, 25), percentile(wages, 75))
+        return q
+
+    def pay_norm(self, place: Optional[str], wage: Optional[float]) -> float:
+        q = self.quartiles(place)
+        if q is None or wage is None:
+            return 0.0
+        return pay_norm_from_quartiles(wage, *q)
+
+    # ---- 저장/복원 ----
+    def to_dict(self) -> Dict[str, Any]:
+        # by_place는 job_id 없는 값까지 포함한 전체 분포, jobs는 그중 job_id로 추적하는 공고
+        return {"min_place_samples": self.min_place_samples, "by_place": self._by_place,
+                "jobs": {jid: [place, wage] for jid, (place, wage) in self._jobs.items()}}
+
+    @classmethod
+    def from_dict(cls, obj: Dict[str, Any]):
+        idx = cls(int(obj.get("min_place_samples", PAY_MIN_PLACE_SAMPLES)))
+        for place, wages in (obj.get("by_place") or {}).items():
+            idx._by_place[place] = sorted(wages)
+            idx._all.extend(wages)
+        idx._all.sort()
+        idx._jobs = {jid: (place, wage) for jid, (place, wage) in (obj.get("jobs") or {}).items()}
+        return idx
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
 # ---------------- LLM 호출 (배치 구조화 추출) ----------------
 SYSTEM_PROMPT = """\
 당신은 채용 공고 텍스트를 구조화하는 도우미입니다.
@@ -230,10 +581,22 @@ SYSTEM_PROMPT = """\
 def chunked(seq: List[Any], n: int) -> List[List[Any]]:
     return [seq[i:i+n] for i in range(0, len(seq), n)]
 
-def llm_enrich_batch(cands_batch: List[Dict[str, Any]], user_pref_keywords: List[str]) -> Dict[int, Dict[str, Any]]:
+def llm_enrich_batch(cands_batch: List[Dict[str, Any]], user_pref_keywords: List[str],
+                     timeout: Optional[float] = None, retry: int = 0) -> Dict[int, Dict[str, Any]]:
     """
     후보 묶음을 LLM에 보내 구조화 응답(JSON)으로 받음.
     실패하더라도 항상 dict를 반환(빈 dict 가능).
+    timeout(초)을 주면 해당 요청에만 HTTP 타임아웃을 적용(초과 시 빈 dict).
+    retry는 이분 재시도 깊이 (계측용, 0=첫 요청).
+    """
+    return _enrich_request(cands_batch, user_pref_keywords, timeout, retry)[0]
+
+
+def _enrich_request(cands_batch: List[Dict[str, Any]], user_pref_keywords: List[str],
+                    timeout: Optional[float] = None, retry: int = 0) -> Tuple[Dict[int, Dict[str, Any]], bool]:
+    """
+    llm_enrich_batch 본체. 반환: (job_id -> 결과, 응답을 받았는지)
+    응답을 받았는지=False는 타임아웃/429/연결 오류처럼 요청 자체가 실패한 경우 (나눠 보내도 나아지지 않음).
     """
     payload = {
         "user_pref_keywords": user_pref_keywords,
@@ -245,20 +608,30 @@ def llm_enrich_batch(cands_batch: List[Dict[str, Any]], user_pref_keywords: List
             } for c in cands_batch
         ]
     }
+    extra = {"timeout": timeout} if timeout else {}
+    # 시간 제한이 있으면 SDK 자동 재시도를 끔 (재시도하면 한 요청이 timeout의 몇 배까지 늘어남)
+    llm = without_retries(get_client()) if timeout else get_client()
+    replied = False
     try:
-        resp = client.chat.completions.create(
-            model=MODEL,
-            temperature=0.2,
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "system", "content": "reply only with a json object."},  # 소문자 json 센티넬
-                {"role": "user", "content": json.dumps(payload, ensure_ascii=False)}
-            ],
-        )
-        txt = resp.choices[0].message.content
-        obj = json.loads(txt)
-        items = obj.get("items", [])
+        with TELEMETRY.call("producer", "enrich", retry=retry) as rec:
+            resp = llm.chat.completions.create(
+                model=MODEL,
+                temperature=0.2,
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "system", "content": "reply only with a json object."},  # 소문자 json 센티넬
+                    {"role": "user", "content": json.dumps(payload, ensure_ascii=False)}
+                ],
+                **extra,
+            )
+            replied = True
+            rec.usage(resp)
+            # 파싱도 계측 블록 안에서: 깨진 JSON/객체가 아닌 응답은 parse_error로 기록
+            obj = parse_json_object(resp.choices[0].message.content)
+            items = obj.get("items", [])
+            if sum(1 for it in items if it.get("job_id") is not None) < len(cands_batch):
+                rec.outcome = "partial"
     except Exception:
         # 호출/파싱 실패 시 안전 폴백
         items = []
@@ -273,13 +646,229 @@ def llm_enrich_batch(cands_batch: List[Dict[str, Any]], user_pref_keywords: List
             "desc": it.get("desc") or "",
             "features": it.get("features") or {}
         }
-    return out  # 반드시 dict
+    return out, replied
+
+
+def enrich_item_tokens(cand: Dict[str, Any]) -> int:
+    """후보 1건이 배치에 더하는 예상 토큰 (입력 JSON 항목 + 응답 항목)."""
+    text = (cand.get("title") or "") + (cand.get("description") or cand.get("desc") or "")
+    return estimate_tokens(text) + ENRICH_ITEM_OUTPUT_TOKENS
+
+
+def plan_enrich_batches(cands: List[Dict[str, Any]], max_batch: int,
+                        token_budget: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+    """
+    입력 순서를 유지한 채 후보를 배치로 묶음.
+    배치당 후보 수는 max_batch 이하, 예상 토큰(시스템 프롬프트 포함)은 token_budget 이하.
+    설명이 짧으면 max_batch까지 꽉 채우고, 긴 설명은 더 작은 배치로 나뉜다.
+    예산을 혼자 넘는 후보는 단독 배치.
+    """
+    budget = ENRICH_TOKEN_BUDGET if token_budget is None else token_budget
+    max_batch = max(1, max_batch)
+    if budget <= 0:
+        return chunked(cands, max_batch)
+    base = estimate_tokens(SYSTEM_PROMPT)
+    batches: List[List[Dict[str, Any]]] = []
+    cur: List[Dict[str, Any]] = []
+    used = base
+    for c in cands:
+        t = enrich_item_tokens(c)
+        if cur and (len(cur) >= max_batch or used + t > budget):
+            batches.append(cur)
+            cur, used = [], base
+        cur.append(c)
+        used += t
+    if cur:
+        batches.append(cur)
+    return batches
+
+
+def llm_enrich_with_retry(cands_batch: List[Dict[str, Any]], user_pref_keywords: List[str],
+                          timeout: Optional[float] = None,
+                          max_depth: Optional[int] = None, _depth: int = 0,
+                          _deadline: Optional[float] = None,
+                          retry_stats: Optional[Dict[str, int]] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    llm_enrich_batch + 이분 재시도.
+    응답은 왔지만 일부 job_id가 빠졌거나 파싱할 수 없으면, 누락 후보만 반으로 나눠 다시 보낸다.
+    → 문제 있는 설명 하나 때문에 배치 전체가 폴백되는 것을 막는다.
+    타임아웃/429/연결 오류처럼 응답 자체가 없으면 나누지 않는다 (작게 나눠도 같은 이유로 실패).
+    timeout(초)은 재시도를 모두 합친 시간: 첫 요청 시각부터의 마감을 재귀 호출이 같이 쓰고 남은 시간만 준다.
+    분할 깊이는 max_depth(기본 ENRICH_MAX_SPLIT_DEPTH)로 제한, 끝까지 누락된 후보는 폴백 값 사용.
+    retry_stats를 주면 재요청한 후보 수(retry_items)와 배치 전체를 다시 보냈을 때의 후보 수
+    (full_resend_items)를 더한다 (이분 재시도로 아낀 재요청 = 두 값의 차).
+    """
+    max_depth = ENRICH_MAX_SPLIT_DEPTH if max_depth is None else max_depth
+    if timeout and _deadline is None:
+        _deadline = time.time() + timeout
+    remaining = _deadline - time.time() if _deadline is not None else None
+    if remaining is not None and remaining <= 0:
+        return {}
+    out, replied = _enrich_request(cands_batch, user_pref_keywords, remaining, retry=_depth)
+    missing = [c for c in cands_batch if int(c["job_id"]) not in out]
+    if not missing or not replied or _depth >= max_depth:
+        return out
+    if retry_stats is not None:
+        retry_stats["retry_items"] += len(missing)
+        retry_stats["full_resend_items"] += len(cands_batch)
+    if len(missing) == 1:
+        halves = [missing]  # 단건은 한 번 더 단독 재시도
+    else:
+        mid = len(missing) // 2
+        halves = [missing[:mid], missing[mid:]]
+    for part in halves:
+        got = llm_enrich_with_retry(part, user_pref_keywords, timeout, max_depth, _depth + 1, _deadline,
+                                    retry_stats)
+        out.update({jid: v for jid, v in got.items() if jid not in out})
+    return out
+
+
+def new_retry_stats() -> Dict[str, int]:
+    return {"retry_items": 0, "full_resend_items": 0}
+
+
+def run_enrich_batches(batches: List[List[Dict[str, Any]]], user_pref_keywords: List[str],
+                       concurrency: int = 1, batch_timeout: Optional[float] = None,
+                       retry_stats: Optional[Dict[str, int]] = None,
+                       max_depth: Optional[int] = None) -> Dict[int, Dict[str, Any]]:
+    """
+    여러 배치를 llm_enrich_with_retry로 보내고 결과를 입력(배치) 순서대로 병합.
+    concurrency > 1 이면 최대 concurrency개 배치를 동시에 전송(스레드 풀).
+    batch_timeout(초)은 배치 하나의 재시도까지 합친 시간 제한. 넘긴 배치는 재시도 없이 폴백 값을 쓴다.
+    retry_stats를 주면 배치별 재요청 통계(new_retry_stats 형식)를 합산해 더한다.
+    max_depth: 이분 재시도 최대 깊이 (None=ENRICH_MAX_SPLIT_DEPTH).
+    """
+    per_batch = [new_retry_stats() for _ in batches]  # 배치마다 따로 세서 스레드 간 공유 없음
+    if concurrency <= 1 or len(batches) <= 1:
+        maps = [llm_enrich_with_retry(b, user_pref_keywords, batch_timeout, max_depth, retry_stats=st)
+                for b, st in zip(batches, per_batch)]
+    else:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(batches))) as pool:
+            futures = [pool.submit(llm_enrich_with_retry, b, user_pref_keywords, batch_timeout, max_depth,
+                                   retry_stats=st)
+                       for b, st in zip(batches, per_batch)]
+            maps = [f.result() for f in futures]  # 제출 순서 = 입력 순서
 
+    if retry_stats is not None:
+        for st in per_batch:
+            for key in st:
+                retry_stats[key] += st[key]
+    results: Dict[int, Dict[str, Any]] = {}
+    for enrich_map in maps:
+        if isinstance(enrich_map, dict):
+            results.update(enrich_map)
+    return results
 
-def llm_his_short(work_history: str) -> str:
+
+def enrich_cache_key(cand: Dict[str, Any], user_pref_keywords: List[str], model: str = None) -> str:
+    """llm_enrich_batch 결과를 좌우하는 입력(제목/설명/선호 키워드)과 모델로 만든 캐시 키."""
+    return make_key(
+        "enrich", model or MODEL,
+        cand.get("title"),
+        cand.get("description") or cand.get("desc") or "",
+        list(user_pref_keywords or []),
+    )
+
+
+def enrich_with_cache(cands: List[Dict[str, Any]], user_pref_keywords: List[str], batch_size: int,
+                      cache: Optional[LLMCache] = None, concurrency: int = 1,
+                      batch_timeout: Optional[float] = None, token_budget: Optional[int] = None,
+                      max_split_depth: Optional[int] = None) -> Tuple[Dict[int, Dict[str, Any]], Dict[str, int]]:
+    """
+    캐시에 있는 후보는 재사용하고, 미스 후보만 LLM 배치로 보낸 뒤 결과를 캐시에 채운다.
+    token_budget/max_split_depth는 plan_enrich_batches/llm_enrich_with_retry로 (None=모듈 기본값).
+    반환: (job_id -> 보강 결과, {"hits", "misses", "retry_items", "full_resend_items"})
+    """
+    retry_stats = new_retry_stats()
+    if cache is None:
+        results = run_enrich_batches(plan_enrich_batches(cands, batch_size, token_budget), user_pref_keywords,
+                                     concurrency=concurrency, batch_timeout=batch_timeout, retry_stats=retry_stats,
+                                     max_depth=max_split_depth)
+        return results, {"hits": 0, "misses": len(cands), **retry_stats}
+
+    keys = {c["job_id"]: enrich_cache_key(c, user_pref_keywords) for c in cands}
+    with TRACER.span("cache.get", cat="producer", n=len(keys)):
+        found = cache.get_many(keys.values())
+    results: Dict[int, Dict[str, Any]] = {}
+    misses: List[Dict[str, Any]] = []
+    for c in cands:
+        hit = found.get(keys[c["job_id"]])
+        if hit is not None:
+            results[c["job_id"]] = hit
+        else:
+            misses.append(c)
+
+    if misses:
+        fresh = run_enrich_batches(plan_enrich_batches(misses, batch_size, token_budget), user_pref_keywords,
+                                   concurrency=concurrency, batch_timeout=batch_timeout, retry_stats=retry_stats,
+                                   max_depth=max_split_depth)
+        # LLM이 실제로 돌려준 항목만 저장 (실패/누락 후보는 다음 실행에서 다시 시도)
+        with TRACER.span("cache.put", cat="producer"):
+            cache.put_many((keys[c["job_id"]], fresh[c["job_id"]]) for c in misses if c["job_id"] in fresh)
+        results.update(fresh)
+    return results, {"hits": len(cands) - len(misses), "misses": len(misses), **retry_stats}
+
+
+def resolve_rule_threshold(rule_threshold: Optional[float] = None) -> Optional[float]:
+    """실행별 규칙 태거 임계값: 인자가 있으면 그 값, 없으면 ENRICH_RULE_THRESHOLD 기본값 (None=규칙 태거 끔)"""
+    return rule_threshold if rule_threshold is not None else RULE_THRESHOLD
+
+
+@traced("enrich", cat="producer")
+def enrich_candidates(cands: List[Dict[str, Any]], user_pref_keywords: List[str], batch_size: int,
+                      cache: Optional[LLMCache] = None, concurrency: int = 1,
+                      batch_timeout: Optional[float] = None, token_budget: Optional[int] = None,
+                      max_split_depth: Optional[int] = None,
+                      rule_threshold: Optional[float] = None) -> Tuple[Dict[int, Dict[str, Any]], Dict[str, int]]:
+    """
+    규칙 태거(rule_threshold, 없으면 RULE_THRESHOLD가 있을 때) → 캐시 → LLM 순으로 후보를 보강.
+    반환: (job_id -> 보강 결과, {"hits", "misses", "retry_items", "full_resend_items", "rule_bypass"})
+    """
+    rule_results: Dict[int, Dict[str, Any]] = {}
+    rest = cands
+    threshold = resolve_rule_threshold(rule_threshold)
+    if threshold is not None:
+        with TRACER.span("rules", cat="producer", n=len(cands)):
+            rule_results, rest = split_by_rules(cands, threshold)
+    results, stats = enrich_with_cache(rest, user_pref_keywords, batch_size, cache=cache,
+                                       concurrency=concurrency, batch_timeout=batch_timeout,
+                                       token_budget=token_budget, max_split_depth=max_split_depth)
+    results.update(rule_results)
+    TELEMETRY.incr("producer.enrich_cache_hits", stats["hits"])
+    TELEMETRY.incr("producer.enrich_cache_misses", stats["misses"])
+    TELEMETRY.incr("producer.rule_bypass", len(rule_results))
+    TELEMETRY.incr("producer.enrich_retry_items", stats["retry_items"])
+    TELEMETRY.incr("producer.enrich_full_resend_items", stats["full_resend_items"])
+    return results, {**stats, "rule_bypass": len(rule_results)}
+
+
+def attach_enrich_stats(meta_out: Dict[str, Any], stats: Dict[str, int], n_cands: int,
+                        cache: Optional[LLMCache] = None, rule_threshold: Optional[float] = None) -> Dict[str, Any]:
+    """
+    보강 통계를 meta에 기록: 캐시 사용 시 cache, 규칙 태거 사용 시 rule_bypass_ratio,
+    재요청이 있었으면 retry_savings {retry_items, full_resend_items, saved_items}
+    (누락 후보만 다시 보낸 수 vs 배치 전체를 다시 보냈을 때의 수).
+    """
+    if cache is not None:
+        meta_out["cache"] = {"hits": stats["hits"], "misses": stats["misses"]}
+    if resolve_rule_threshold(rule_threshold) is not None:
+        meta_out["rule_bypass_ratio"] = round(stats.get("rule_bypass", 0) / n_cands, 3) if n_cands else 0.0
+    if stats.get("full_resend_items"):
+        meta_out["retry_savings"] = {"retry_items": stats["retry_items"],
+                                     "full_resend_items": stats["full_resend_items"],
+                                     "saved_items": stats["full_resend_items"] - stats["retry_items"]}
+    return meta_out
+
+
+def his_cache_key(work_history: str, model: str = None) -> str:
+    """작업 이력 요약 캐시 키: 원문 work_history + 모델."""
+    return make_key("his_short", model or MODEL, work_history)
+
+
+def _llm_his_summary(work_history: str) -> Optional[str]:
     """
     JSON 모드 강제 호환: messages 안에 소문자 'json'을 명시하고,
-    response_format=json_object로 받는다. 실패 시 원문 일부로 폴백.
+    response_format=json_object로 받는다. 실패하거나 빈 요약이면 None.
     """
     system_msg = (
         "너는 한국어 요약가이자 json 전용 응답기다. "
@@ -292,82 +881,132 @@ def llm_his_short(work_history: str) -> str:
         f"원문: {work_history}"
     )
     try:
-        resp = client.chat.completions.create(
-            model=MODEL,
-            temperature=0.2,
-            response_format={"type": "json_object"},
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "system", "content": "reply only with a json object."},  # 소문자 json 센티넬
-                {"role": "user", "content": user_msg},
-            ],
-        )
-        obj = json.loads(resp.choices[0].message.content)
-        return str(obj.get("summary", "")).strip()[:60] or work_history[:60]
+        with TELEMETRY.call("producer", "his_summary") as rec:
+            resp = get_client().chat.completions.create(
+                model=MODEL,
+                temperature=0.2,
+                response_format={"type": "json_object"},
+                messages=[
+                    {"role": "system", "content": system_msg},
+                    {"role": "system", "content": "reply only with a json object."},  # 소문자 json 센티넬
+                    {"role": "user", "content": user_msg},
+                ],
+            )
+            rec.usage(resp)
+            obj = parse_json_object(resp.choices[0].message.content)
+        return str(obj.get("summary", "")).strip()[:60] or None
     except Exception:
-        return work_history[:60]
+        return None
 
 
+def llm_his_short(work_history: str, store: Optional[LLMCache] = None) -> str:
+    """
+    작업 이력 1문장 요약. 실패 시 원문 일부로 폴백.
+    store가 있으면 호출 전에 조회하고, LLM이 실제로 요약한 결과만 저장한다(폴백은 저장 안 함).
+    """
+    key = his_cache_key(work_history) if store is not None else None
+    if store is not None:
+        hit = store.get(key)
+        if hit:
+            return hit
+    summary = _llm_his_summary(work_history)
+    if summary and store is not None:
+        store.put(key, summary)
+    return summary or work_history[:60]
 
-# ---------------- 메인 변환 (LLM + 결정론) ----------------
-def enrich_factpack_with_llm(data: Dict[str, Any], top_k: int = 20, batch_size: int = 20) -> Dict[str, Any]:
-    user = data.get("user", {}) or {}
-    cands: List[Dict[str, Any]] = data.get("candidates", []) or []
-    meta_in = data.get("meta", {}) or {}
 
-    # 사용자 컨텍스트
+def warm_his_short_store(users: Iterable[Dict[str, Any]], store: LLMCache,
+                         concurrency: int = 1) -> Dict[str, int]:
+    """
+    his_short 없이 work_history만 있는 사용자들의 요약을 미리 채워 둔다(중복 이력은 한 번만 호출).
+    반환: {"hits": 이미 있던 수, "misses": 새로 요청한 수}
+    """
+    histories = list(dict.fromkeys(
+        u["work_history"] for u in users if u.get("work_history") and not u.get("his_short")
+    ))
+    keys = {h: his_cache_key(h) for h in histories}
+    found = store.get_many(keys.values())
+    todo = [h for h in histories if keys[h] not in found]
+    if todo:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(todo)))) as pool:
+            summaries = list(pool.map(_llm_his_summary, todo))
+        store.put_many((keys[h], s) for h, s in zip(todo, summaries) if s)
+    return {"hits": len(histories) - len(todo), "misses": len(todo)}
+
+
+
+# ---------------- 메인 변환 (LLM + 결정론) ----------------
+def pref_keywords_of(user: Dict[str, Any]) -> List[str]:
     interests = user.get("interests", []) or []
-    pref_keywords = interests[: min(2, len(interests))]
-    availability_json = user.get("availability_json", {}) or {}
-    age = user.get("age", 0)
+    return interests[: min(2, len(interests))]
 
-    # LLM로 Top-K 후보에 대해 요약/피처 추출
-    top_cands = cands[:top_k]
-    id2raw = {c["job_id"]: c for c in top_cands}
 
-    llm_results: Dict[int, Dict[str, Any]] = {}
-    for batch in chunked(top_cands, batch_size):
-        enrich_map = llm_enrich_batch(batch, pref_keywords) or {}
-        if not isinstance(enrich_map, dict):
-            enrich_map = {}
-        llm_results.update(enrich_map)
+def output_user(user: Dict[str, Any], pref_keywords: List[str]) -> Dict[str, Any]:
+    return {
+        "locale": user.get("locale", "ko-KR"),
+        "age": user.get("age", 0),
+        "pref_keywords": pref_keywords,
+        "availability": user.get("availability_json", {}) or {}
+    }
 
 
-    # 지역별 묶음(임금 분포)
-    by_place: Dict[str, List[Dict[str, Any]]] = {}
-    for c in cands:
-        by_place.setdefault(c.get("place",""), []).append(c)
+@traced("user_summary", cat="producer")
+def summarize_user(user: Dict[str, Any], his_store: Optional[LLMCache] = None) -> Tuple[Optional[str], Optional[str]]:
+    """(his_short, his_hash). his_short가 없고 work_history가 있으면 (캐시 확인 후) LLM으로 요약."""
+    his_short = user.get("his_short")
+    if not his_short and user.get("work_history"):
+        his_short = llm_his_short(user["work_history"], store=his_store)
+    his_hash = user.get("his_hash")
+    if his_short and not his_hash:
+        his_hash = hashlib.sha1(his_short.strip().encode("utf-8")).hexdigest()
+    return his_short, his_hash
+
+
+def build_meta(meta_in: Dict[str, Any], top_k: int) -> Dict[str, Any]:
+    kst = timezone(timedelta(hours=9))
+    return {
+        "query": meta_in.get("query"),
+        "k": int(top_k),
+        "computed_at": datetime.now(kst).isoformat()
+    }
+
+
+@traced("score", cat="producer")
+def score_candidates(user: Dict[str, Any], cands: List[Dict[str, Any]],
+                     llm_results: Dict[int, Dict[str, Any]],
+                     avail_profile: AvailabilityProfile,
+                     wage_index: WagePercentileIndex) -> List[Dict[str, Any]]:
+    """후보 묶음에 결정론 지표(시간 겹침/거리/임금)를 배치로 계산하고 LLM 결과를 병합해 출력 형식으로 만든다."""
+    # 시간 겹침: 컴파일된 가용 시간으로 전체 후보를 한꺼번에 계산
+    time_metrics_all = compute_time_overlap_metrics_batch(
+        avail_profile,
+        [c.get("work_days","0000000") for c in cands],
+        [c.get("start_time","09:00:00") for c in cands],
+        [c.get("end_time","18:00:00") for c in cands],
+    )
+
+    # 거리/이동
+    geo_all = compute_distance_travel(user.get("home_latitude"), user.get("home_longitude"), cands)
 
     out_cands: List[Dict[str, Any]] = []
-    for c in top_cands:
+    for c, time_metrics, (distance_km, travel_min) in zip(cands, time_metrics_all, geo_all):
         jid = c.get("job_id")
         start_time = c.get("start_time","09:00:00")
         end_time   = c.get("end_time","18:00:00")
         work_bits  = c.get("work_days","0000000")
 
-        # 거리/이동
-        home_lat, home_lon = user.get("home_latitude"), user.get("home_longitude")
-        job_lat, job_lon   = c.get("job_latitude"), c.get("job_longitude")
-        distance_km = travel_min = None
-        if all(isinstance(x, (int,float)) for x in [home_lat, home_lon, job_lat, job_lon]):
-            distance_km = round(haversine_km(home_lat, home_lon, job_lat, job_lon), 2)
-            travel_min  = estimate_travel_min(distance_km)
-
         # 시간 겹침
-        time_metrics = compute_time_overlap_metrics(availability_json, work_bits, start_time, end_time)
         time_ov = time_metrics['job_norm']  # 기존 time_overlap 역호환 유지
 
-
         # 임금 정규화
-        region_list = by_place.get(c.get("place",""), []) or cands
         pay = c.get("hourly_wage", 0)
-        pay_norm = compute_pay_norm(region_list, pay)
+        pay_norm = wage_index.pay_norm(c.get("place"), pay)
 
         # LLM 결과 병합 (불일치/결측 시 폴백)
         llm_obj = llm_results.get(jid, {}) if jid is not None else {}
         org = llm_obj.get("org")
         desc = (llm_obj.get("desc") or (c.get("description") or ""))[:120]
-        feats = llm_obj.get("features") or {}
+        feats = dict(llm_obj.get("features") or {})  # 여러 사용자가 같은 보강 결과를 공유할 수 있어 복사
         # 최소 보정: english/physical 키가 빠졌을 때 기본값 보완
         feats.setdefault("english", None)
         feats.setdefault("physical", None)
@@ -375,6 +1014,9 @@ def enrich_factpack_with_llm(data: Dict[str, Any], top_k: int = 20, batch_size:
         feats.setdefault("indoor", None)
         feats.setdefault("warnings", [])
         feats.setdefault("tags", [])
+        # 보강 출처: rule(규칙 태거, confidence=규칙 신뢰도) | llm(LLM/캐시) | fallback(보강 결과 없음)
+        enrich = {"source": llm_obj.get("source") or ("llm" if llm_obj else "fallback"),
+                  "confidence": llm_obj.get("confidence")}
 
         out_cands.append({
             "job_id": jid,
@@ -394,32 +1036,55 @@ def enrich_factpack_with_llm(data: Dict[str, Any], top_k: int = 20, batch_size:
             "work_days": work_bits,
             "start_time": start_time,
             "end_time": end_time,
-            "features": feats
+            "features": feats,
+            "enrich": enrich
         })
+    return out_cands
+
+
+@traced("enrich_factpack", cat="producer")
+def enrich_factpack_with_llm(data: Dict[str, Any], top_k: int = 20, batch_size: int = 20,
+                             concurrency: int = 1, batch_timeout: Optional[float] = None,
+                             cache: Optional[LLMCache] = None,
+                             wage_index: Optional[WagePercentileIndex] = None,
+                             his_store: Optional[LLMCache] = None, token_budget: Optional[int] = None,
+                             max_split_depth: Optional[int] = None,
+                             rule_threshold: Optional[float] = None) -> Dict[str, Any]:
+    """
+    factpack 하나를 보강. token_budget/max_split_depth/rule_threshold는 이 실행에만 쓰는 보강 설정
+    (None=모듈 기본값, enrich_candidates 참고).
+    """
+    user = data.get("user", {}) or {}
+    cands: List[Dict[str, Any]] = data.get("candidates", []) or []
+    meta_in = data.get("meta", {}) or {}
+
+    # 사용자 컨텍스트
+    pref_keywords = pref_keywords_of(user)
+    availability_json = user.get("availability_json", {}) or {}
+
+    # LLM로 Top-K 후보에 대해 요약/피처 추출
+    top_cands = cands[:top_k]
+    llm_results, cache_stats = enrich_candidates(top_cands, pref_keywords, batch_size, cache=cache,
+                                                 concurrency=concurrency, batch_timeout=batch_timeout,
+                                                 token_budget=token_budget, max_split_depth=max_split_depth,
+                                                 rule_threshold=rule_threshold)
+
+    # 지역별 임금 분포 (주어지지 않으면 이 factpack의 전체 후보로 한 번만 구축)
+    if wage_index is None:
+        wage_index = WagePercentileIndex.from_candidates(cands)
+
+    # 사용자 가용 시간은 한 번만 컴파일해 전체 후보에 재사용
+    avail_profile = compile_availability(availability_json)
+    out_cands = score_candidates(user, top_cands, llm_results, avail_profile, wage_index)
 
     # 사용자 요약/해시
-    his_short = user.get("his_short")
-    if not his_short and user.get("work_history"):
-        his_short = llm_his_short(user["work_history"])
-    his_hash = user.get("his_hash")
-    if his_short and not his_hash:
-        his_hash = hashlib.sha1(his_short.strip().encode("utf-8")).hexdigest()
+    his_short, his_hash = summarize_user(user, his_store)
 
     # 메타
-    kst = timezone(timedelta(hours=9))
-    meta_out = {
-        "query": meta_in.get("query"),
-        "k": int(top_k),
-        "computed_at": datetime.now(kst).isoformat()
-    }
+    meta_out = attach_enrich_stats(build_meta(meta_in, top_k), cache_stats, len(top_cands), cache, rule_threshold)
 
     out = {
-        "user": {
-            "locale": user.get("locale", "ko-KR"),
-            "age": age,
-            "pref_keywords": pref_keywords,
-            "availability": availability_json
-        },
+        "user": output_user(user, pref_keywords),
         "candidates": out_cands,
         "meta": meta_out
     }
@@ -427,6 +1092,209 @@ def enrich_factpack_with_llm(data: Dict[str, Any], top_k: int = 20, batch_size:
         out["user_summary"] = {"his_short": his_short, "his_hash": his_hash}
     return out
 
+
+# ---------------- 다중 사용자 배치 ----------------
+def enrich_factpacks_batch(factpacks: List[Dict[str, Any]], top_k: int = 20, batch_size: int = 20,
+                           concurrency: int = 1, batch_timeout: Optional[float] = None,
+                           cache: Optional[LLMCache] = None,
+                           wage_index: Optional[WagePercentileIndex] = None,
+                           his_store: Optional[LLMCache] = None, token_budget: Optional[int] = None,
+                           max_split_depth: Optional[int] = None,
+                           rule_threshold: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    여러 사용자의 factpack을 한 번에 처리. 보강 프롬프트에는 사용자 선호 키워드가 들어가므로
+    선호 키워드(pref_keywords_of)가 같은 사용자끼리 묶고, 묶음마다 Top-K 후보를 job_id로 중복 제거해
+    고유 공고만 한 번씩 LLM으로 보강한다(호출 수 ∝ 묶음별 고유 공고 수). 결과는 같은 사용자를
+    enrich_factpack_with_llm으로 처리한 것과 같고, 사용자별 결정론 지표는 score_candidates(배치 엔진)로 계산한다.
+    반환 순서 = 입력 factpack 순서. wage_index가 없으면 factpack별 후보로 각각 구축.
+    his_store가 있으면 전체 사용자의 작업 이력 요약을 먼저 한꺼번에 채운다.
+    캐시/규칙 태거 통계는 배치 전체(보강한 (선호 키워드, 공고) 기준) 값이라 사용자별 meta.batch 아래에 기록한다.
+    token_budget/max_split_depth/rule_threshold는 enrich_factpack_with_llm과 같다.
+    """
+    if his_store is not None:
+        warm_his_short_store((fp.get("user", {}) or {} for fp in factpacks), his_store, concurrency=concurrency)
+
+    # 선호 키워드 묶음 -> (job_id -> 후보)
+    groups: Dict[Tuple[str, ...], Dict[Any, Dict[str, Any]]] = {}
+    job_ids = set()
+    slots = 0
+    for fp in factpacks:
+        group = groups.setdefault(tuple(pref_keywords_of(fp.get("user", {}) or {})), {})
+        for c in (fp.get("candidates", []) or [])[:top_k]:
+            group.setdefault(c["job_id"], c)
+            job_ids.add(c["job_id"])
+            slots += 1
+
+    results_by_group: Dict[Tuple[str, ...], Dict[int, Dict[str, Any]]] = {}
+    cache_stats: Dict[str, int] = {}
+    for keywords, group in groups.items():
+        results_by_group[keywords], stats = enrich_candidates(
+            list(group.values()), list(keywords), batch_size, cache=cache, concurrency=concurrency,
+            batch_timeout=batch_timeout, token_budget=token_budget, max_split_depth=max_split_depth,
+            rule_threshold=rule_threshold)
+        for key, n in stats.items():
+            cache_stats[key] = cache_stats.get(key, 0) + n
+    enriched = sum(len(g) for g in groups.values())
+
+    outs: List[Dict[str, Any]] = []
+    for fp in factpacks:
+        user = fp.get("user", {}) or {}
+        cands = fp.get("candidates", []) or []
+        pref_keywords = pref_keywords_of(user)
+        index = wage_index or WagePercentileIndex.from_candidates(cands)
+        avail_profile = compile_availability(user.get("availability_json", {}) or {})
+        out_cands = score_candidates(user, cands[:top_k], results_by_group[tuple(pref_keywords)], avail_profile,
+                                     index)
+
+        his_short, his_hash = summarize_user(user, his_store)
+        meta_out = build_meta(fp.get("meta", {}) or {}, top_k)
+        meta_out["batch"] = {"users": len(factpacks), "unique_jobs": len(job_ids), "keyword_groups": len(groups),
+                             "enriched_jobs": enriched, "candidate_slots": slots}
+        attach_enrich_stats(meta_out["batch"], cache_stats, enriched, cache, rule_threshold)
+        out = {"user": output_user(user, pref_keywords), "candidates": out_cands, "meta": meta_out}
+        if his_short or his_hash:
+            out["user_summary"] = {"his_short": his_short, "his_hash": his_hash}
+        outs.append(out)
+    return outs
+
+
+# ---------------- 스트리밍 (NDJSON) ----------------
+# 출력 레코드 (한 줄에 하나):
+#   {"type": "user", "user": {...}}                          # 항상 첫 줄
+#   {"type": "candidate", "rank": int, "candidate": {...}}   # 배치가 끝나는 대로 (rank = 입력 순서)
+#   {"type": "meta", "meta": {...}, "user_summary": {...}}   # 항상 마지막 줄
+# 입력 NDJSON factpack도 같은 형식: user(/meta) 레코드가 candidate 레코드보다 먼저 와야 한다.
+def iter_batches(items: Iterable[Dict[str, Any]], n: int) -> Iterator[Tuple[int, List[Dict[str, Any]]]]:
+    """(첫 항목의 순번, 묶음)을 n개씩 끊어서 지연 생성."""
+    batch: List[Dict[str, Any]] = []
+    start = 0
+    for i, it in enumerate(items):
+        if not batch:
+            start = i
+        batch.append(it)
+        if len(batch) >= n:
+            yield start, batch
+            batch = []
+    if batch:
+        yield start, batch
+
+
+def is_ndjson_path(path: str) -> bool:
+    return path.endswith((".ndjson", ".jsonl"))
+
+
+def open_factpack_stream(path: str) -> Tuple[Dict[str, Any], Dict[str, Any], Iterator[Dict[str, Any]]]:
+    """
+    factpack을 (user, meta, 후보 이터레이터)로 연다.
+    NDJSON이면 후보를 한 줄씩 지연해서 읽고, 일반 JSON이면 통째로 읽어 리스트를 순회한다.
+    """
+    if not is_ndjson_path(path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data.get("user", {}) or {}, data.get("meta", {}) or {}, iter(data.get("candidates", []) or [])
+
+    f = open(path, "r", encoding="utf-8")
+    user: Dict[str, Any] = {}
+    meta: Dict[str, Any] = {}
+    first_cand: Optional[Dict[str, Any]] = None
+    for line in f:
+        if not line.strip():
+            continue
+        rec = json.loads(line)
+        if rec.get("type") == "user":
+            user = rec.get("user", {}) or {}
+        elif rec.get("type") == "meta":
+            meta = rec.get("meta", {}) or {}
+        elif rec.get("type") == "candidate":
+            first_cand = rec.get("candidate") or {}
+            break
+
+    def cands() -> Iterator[Dict[str, Any]]:
+        with f:
+            if first_cand is None:
+                return
+            yield first_cand
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    if rec.get("type") == "candidate":
+                        yield rec.get("candidate") or {}
+    return user, meta, cands()
+
+
+def iter_enrich_stream(user: Dict[str, Any], cand_iter: Iterable[Dict[str, Any]],
+                       wage_index: WagePercentileIndex, meta_in: Optional[Dict[str, Any]] = None,
+                       top_k: int = 20, batch_size: int = 20, concurrency: int = 1,
+                       batch_timeout: Optional[float] = None,
+                       cache: Optional[LLMCache] = None,
+                       his_store: Optional[LLMCache] = None, token_budget: Optional[int] = None,
+                       max_split_depth: Optional[int] = None,
+                       rule_threshold: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    enrich_factpack_with_llm의 스트리밍 버전. 후보를 batch_size씩 읽어 LLM에 보내고,
+    배치가 끝나는 즉시 그 후보들의 출력 레코드를 yield 한다(끝나는 순서, rank로 원래 순서 복원 가능).
+    진행 중인 배치는 최대 concurrency개라 후보 수와 무관하게 메모리가 일정하다.
+    pay_norm은 전체 후보 분포가 필요하므로 wage_index를 미리 만들어 넘겨야 한다.
+    token_budget/max_split_depth/rule_threshold는 enrich_factpack_with_llm과 같다.
+    """
+    pref_keywords = pref_keywords_of(user)
+    avail_profile = compile_availability(user.get("availability_json", {}) or {})
+    cache_stats = {"hits": 0, "misses": 0, "rule_bypass": 0, **new_retry_stats()}
+    emitted = 0
+
+    yield {"type": "user", "user": output_user(user, pref_keywords)}
+
+    def work(batch: List[Dict[str, Any]]):
+        return enrich_candidates(batch, pref_keywords, len(batch), cache=cache, batch_timeout=batch_timeout,
+                                 token_budget=token_budget, max_split_depth=max_split_depth,
+                                 rule_threshold=rule_threshold)
+
+    def finish(fut, start: int, batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        llm_results, stats = fut.result()
+        for key in cache_stats:
+            cache_stats[key] += stats[key]
+        scored = score_candidates(user, batch, llm_results, avail_profile, wage_index)
+        return [{"type": "candidate", "rank": start + j, "candidate": c} for j, c in enumerate(scored)]
+
+    limit = max(1, concurrency)
+    with ThreadPoolExecutor(max_workers=limit) as pool:
+        pending: Dict[Any, Tuple[int, List[Dict[str, Any]]]] = {}
+        for start, batch in iter_batches(islice(cand_iter, top_k), batch_size):
+            pending[pool.submit(work, batch)] = (start, batch)
+            while len(pending) >= limit:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    for rec in finish(fut, *pending.pop(fut)):
+                        emitted += 1
+                        yield rec
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                for rec in finish(fut, *pending.pop(fut)):
+                    emitted += 1
+                    yield rec
+
+    his_short, his_hash = summarize_user(user, his_store)
+    meta_out = build_meta(meta_in or {}, top_k)
+    meta_out["count"] = emitted
+    attach_enrich_stats(meta_out, cache_stats, emitted, cache, rule_threshold)
+    tail: Dict[str, Any] = {"type": "meta", "meta": meta_out}
+    if his_short or his_hash:
+        tail["user_summary"] = {"his_short": his_short, "his_hash": his_hash}
+    yield tail
+
+
+def build_wage_index_from_path(path: str, index: Optional[WagePercentileIndex] = None) -> WagePercentileIndex:
+    """
+    입력 factpack 전체 후보로 시급 인덱스 구축 (NDJSON은 한 줄씩 읽어 메모리 일정).
+    index를 주면 새로 만들지 않고 그 인덱스에 후보를 upsert 한다.
+    """
+    _, _, cands = open_factpack_stream(path)
+    idx = index if index is not None else WagePercentileIndex()
+    idx.upsert_jobs(cands)
+    return idx
+
+
 # ---------------- CLI ----------------
 def main():
     ap = argparse.ArgumentParser()
@@ -437,19 +1305,114 @@ def main():
         help="factpack.v1.1 JSON path (default: sample/be_input.json)"
     )    
     ap.add_argument("-k","--top_k", type=int, default=3)
-    ap.add_argument("-b","--batch_size", type=int, default=5, help="LLM batch size")
+    ap.add_argument("-b","--batch_size", type=int, default=5, help="LLM batch size (최대값, 토큰 예산에 따라 더 작아질 수 있음)")
+    ap.add_argument("--token_budget", type=int, default=ENRICH_TOKEN_BUDGET,
+                    help="보강 배치당 예상 토큰 상한 (0=배치 크기만 사용)")
+    ap.add_argument("--max_split_depth", type=int, default=ENRICH_MAX_SPLIT_DEPTH,
+                    help="실패/누락 배치 이분 재시도 최대 깊이 (0=재시도 안 함)")
+    ap.add_argument("-c","--concurrency", type=int, default=1,
+                    help="동시에 보낼 LLM 배치 수 (1=순차)")
+    ap.add_argument("--batch_timeout", type=float, default=None,
+                    help="배치별 LLM 요청 타임아웃(초). 초과한 배치의 후보는 폴백 값 사용")
+    ap.add_argument("--fast_path", action="store_true",
+                    help="규칙 태거 빠른 경로: 키워드 규칙 신뢰도가 높은 공고는 LLM 보강 생략 (meta.rule_bypass_ratio 기록)")
+    ap.add_argument("--rule_threshold", type=float, default=RULE_THRESHOLD or DEFAULT_RULE_THRESHOLD,
+                    help="빠른 경로 신뢰도 임계값 0~1 (높을수록 LLM으로 더 많이 보냄)")
+    ap.add_argument("--cache_db", default=None,
+                    help="보강 결과/작업 이력 요약 SQLite 캐시 경로 (예: .cache/masil_llm.sqlite). 미지정 시 캐시 미사용")
+    ap.add_argument("--cache_ttl_days", type=float, default=DEFAULT_TTL_SEC / 86400,
+                    help="캐시 항목 유효 기간(일)")
+    ap.add_argument("--cache_max_entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                    help="캐시 최대 항목 수 (초과 시 LRU 삭제)")
+    ap.add_argument("--wage_index", default=None,
+                    help="지역별 시급 분포 인덱스(JSON) 경로. 있으면 불러와 입력 후보를 job_id 기준으로 반영(upsert)하고, "
+                         "없으면 입력 후보로 만들어 저장")
+    ap.add_argument("--stream", action="store_true",
+                    help="NDJSON 스트리밍 출력: 배치가 끝나는 대로 후보를 한 줄씩 쓰고 마지막 줄에 meta 기록 "
+                         "(입력이 .ndjson/.jsonl이면 후보도 한 줄씩 읽음)")
+    ap.add_argument("--batch", action="store_true",
+                    help="다중 사용자 배치: 입력은 factpack JSONL(한 줄에 사용자 1명), 출력도 JSONL. "
+                         "사용자 간 중복 공고는 한 번만 LLM 보강")
+    ap.add_argument("--metrics", default=None,
+                    help="LLM 호출 계측(지연 p50/p95/p99, 토큰, 재시도, 결과) 저장 경로. .prom/.txt 면 Prometheus 텍스트, 그 외 JSON")
+    ap.add_argument("--trace", default=None,
+                    help="구간(LLM 배치/규칙/캐시/점수 계산/입출력) 기록을 Chrome trace JSON으로 저장 (chrome://tracing, Perfetto)")
     ap.add_argument("-o","--output_json", default="ai_1_output.json",
                 help="저장할 출력 파일 경로")
     args = ap.parse_args()
+    # 구간 기록은 가장 먼저 켠다 (인덱스/캐시 로드 등 이후 준비 단계도 기록)
+    if args.trace:
+        TRACER.enable("producer")
+
+    # 보강 설정은 인자로만 넘긴다 (모듈 전역을 바꾸면 같은 프로세스에서 import한 쪽에 값이 남음)
+    enrich_opts = {"token_budget": args.token_budget, "max_split_depth": args.max_split_depth,
+                   "rule_threshold": args.rule_threshold if args.fast_path else None}
+
+    wage_index = None
+    if args.wage_index and os.path.exists(args.wage_index):
+        with TRACER.span("io.read", cat="io", path=args.wage_index):
+            wage_index = WagePercentileIndex.load(args.wage_index)
+
+    cache = his_store = None
+    if args.cache_db:
+        cache = LLMCache(args.cache_db, table="enrich", ttl_sec=args.cache_ttl_days * 86400,
+                         max_entries=args.cache_max_entries)
+        his_store = LLMCache(args.cache_db, table="his_short", ttl_sec=args.cache_ttl_days * 86400,
+                             max_entries=args.cache_max_entries)
+
+    if args.batch:
+        with TRACER.span("io.read", cat="io", path=args.input_json), open(args.input_json, "r", encoding="utf-8") as f:
+            factpacks = [json.loads(line) for line in f if line.strip()]
+        if args.wage_index:
+            # 전체 사용자의 후보를 인덱스에 upsert해 저장 (공고는 job_id로 한 번만 집계)
+            wage_index = wage_index or WagePercentileIndex()
+            for fp in factpacks:
+                wage_index.upsert_jobs(fp.get("candidates", []) or [])
+            wage_index.save(args.wage_index)
+        outs = enrich_factpacks_batch(factpacks, top_k=args.top_k, batch_size=args.batch_size,
+                                      concurrency=args.concurrency, batch_timeout=args.batch_timeout,
+                                      cache=cache, wage_index=wage_index, his_store=his_store, **enrich_opts)
+        with TRACER.span("io.write", cat="io", path=args.output_json), open(args.output_json, "w", encoding="utf-8") as f:
+            for out in outs:
+                f.write(json.dumps(out, ensure_ascii=False) + "\n")
+    elif args.stream:
+        # 1차 패스: 시급 분포만 수집 (후보 본문은 메모리에 두지 않음). 불러온 인덱스가 있으면 현재 후보를 upsert
+        wage_index = build_wage_index_from_path(args.input_json, wage_index)
+        if args.wage_index:
+            wage_index.save(args.wage_index)
+        user, meta_in, cand_iter = open_factpack_stream(args.input_json)
+        with open(args.output_json, "w", encoding="utf-8") as f:
+            for rec in iter_enrich_stream(user, cand_iter, wage_index, meta_in=meta_in,
+                                          top_k=args.top_k, batch_size=args.batch_size,
+                                          concurrency=args.concurrency, batch_timeout=args.batch_timeout,
+                                          cache=cache, his_store=his_store, **enrich_opts):
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                f.flush()  # Consumer가 쓰는 도중에 읽을 수 있도록 줄 단위로 내보냄
+    else:
+        with TRACER.span("io.read", cat="io", path=args.input_json), open(args.input_json, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if args.wage_index:
+            # 저장된 인덱스에 현재 입력 후보를 upsert(job_id 기준, 중복 집계 없음)한 뒤 점수 계산 전에 저장
+            wage_index = wage_index or WagePercentileIndex()
+            wage_index.upsert_jobs(data.get("candidates", []) or [])
+            wage_index.save(args.wage_index)
 
-    with open(args.input_json, "r", encoding="utf-8") as f:
-        data = json.load(f)
+        enriched = enrich_factpack_with_llm(data, top_k=args.top_k, batch_size=args.batch_size,
+                                            concurrency=args.concurrency, batch_timeout=args.batch_timeout,
+                                            cache=cache, wage_index=wage_index, his_store=his_store, **enrich_opts)
 
-    enriched = enrich_factpack_with_llm(data, top_k=args.top_k, batch_size=args.batch_size)
+        with TRACER.span("io.write", cat="io", path=args.output_json), open(args.output_json, "w", encoding="utf-8") as f:
+            json.dump(enriched, f, ensure_ascii=False, indent=2)
 
-    with open(args.output_json, "w", encoding="utf-8") as f:
-        json.dump(enriched, f, ensure_ascii=False, indent=2)
+    if cache is not None:
+        cache.close()
+        his_store.close()
 
+    if args.metrics:
+        TELEMETRY.write(args.metrics)
+    if args.trace:
+        TRACER.write(args.trace)
     print(f"✅ wrote {args.output_json}")
 
 if __name__ == "__main__":
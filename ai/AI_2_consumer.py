@@ -5,10 +5,14 @@
 import json
 import hashlib
 import time
-from openai import OpenAI
-from tqdm import tqdm
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import os
 from dotenv import load_dotenv
+from llm_backend import shared_client, without_retries, parse_json_object
+from llm_cache import LLMCache, make_key, DEFAULT_TTL_SEC, DEFAULT_MAX_ENTRIES
+from telemetry import TELEMETRY, classify_error
+from tracing import TRACER, traced
 # ===============================
 # 1️⃣ 환경 변수 / 클라이언트
 # ===============================
@@ -19,7 +23,17 @@ from dotenv import load_dotenv
 load_dotenv()
 
 MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")  # 가성비형 모델 기본값
-client = OpenAI()  # 환경변수 OPENAI_API_KEY 사용
+# LLM 클라이언트는 첫 호출 때 만든다 (get_client). 여기에 직접 넣으면 그 클라이언트를 사용 (테스트/주입용)
+client = None
+
+
+def get_client():
+    """LLM 클라이언트 접근자: 주입된 client, 없으면 프로세스 공용 클라이언트 (첫 사용 시 생성.
+    환경변수 OPENAI_API_KEY 사용, MASIL_LLM_BACKEND=fake|record|replay 로 대체 가능)"""
+    return client if client is not None else shared_client()
+
+# 설명 캐시 키에 포함 → 프롬프트(지시문/스키마)를 바꾸면 올려서 기존 캐시를 무효화
+PROMPT_VERSION = "explain-prompt.v1"
 # ===============================
 # 2️⃣ 유틸 함수
 # ===============================
@@ -28,20 +42,188 @@ def hash_str(s):
     """문자열 해시 생성 (캐시 키용)"""
     return hashlib.md5(s.encode("utf-8")).hexdigest()
 
+def explain_cache_key(candidate, user_info, model=None, variant=""):
+    """프롬프트에 들어가는 후보/사용자 필드 + 모델 + 프롬프트 버전(+변형)으로 설명 캐시 키 생성"""
+    return make_key("explain", model or MODEL, PROMPT_VERSION + (f"+{variant}" if variant else ""),
+                    candidate, user_info)
+
 def load_factpack(file_path):
     """Producer가 만든 JSON 불러오기"""
-    with open(file_path, "r", encoding="utf-8") as f:
+    with TRACER.span("io.read", cat="io", path=file_path), open(file_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def build_prompt(candidate, user_info):
-    """LLM 호출용 프롬프트 생성"""
+DEFAULT_FOLLOW_TIMEOUT = 60.0
+
+
+def _wait_for_fresh_file(file_path, since, follow_timeout, poll_sec):
+    """since(time.time()) 이후에 쓰인 파일이 생길 때까지 대기. 이전 실행이 남긴 파일은 새로 쓰일 때까지 무시."""
+    waited_from = time.time()
+    while True:
+        try:
+            if os.path.getmtime(file_path) >= since:
+                return
+        except OSError:
+            pass
+        if follow_timeout is not None and time.time() - waited_from > follow_timeout:
+            state = "이전 실행의 파일만 있음" if os.path.exists(file_path) else "파일 없음"
+            raise TimeoutError(f"--follow: {follow_timeout}s 동안 새 출력이 없음 ({state}): {file_path}")
+        time.sleep(poll_sec)
+
+
+def iter_ndjson_records(file_path, follow=False, poll_sec=0.2, follow_timeout=DEFAULT_FOLLOW_TIMEOUT, since=None):
+    """
+    NDJSON 레코드를 한 줄씩 읽기.
+    follow=True면 Producer(--stream)가 아직 쓰는 중인 파일을 tail 하듯 따라 읽고,
+    마지막 meta 레코드를 만나면 종료한다.
+      - since(기본: 호출 시각) 이전에 마지막으로 쓰인 파일은 이전 실행이 남긴 것으로 보고,
+        Producer가 새로 쓸 때까지 기다린다(파일이 아직 없을 때도 마찬가지)
+      - follow_timeout(초) 동안 새 줄이 없으면 TimeoutError (None이면 무한 대기)
+      - 읽는 도중 파일이 잘리거나(크기 감소) 다른 파일로 바뀌면 RuntimeError
+    """
+    if follow:
+        _wait_for_fresh_file(file_path, time.time() if since is None else since, follow_timeout, poll_sec)
+    with open(file_path, "r", encoding="utf-8") as f:
+        buf = ""
+        idle_from = time.time()
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    break
+                st = os.fstat(f.fileno())
+                try:
+                    replaced = os.stat(file_path).st_ino != st.st_ino
+                except OSError:
+                    replaced = True
+                if replaced or st.st_size < f.tell():
+                    raise RuntimeError(f"--follow: 읽는 도중 Producer 출력이 잘리거나 교체됨: {file_path}")
+                if follow_timeout is not None and time.time() - idle_from > follow_timeout:
+                    raise TimeoutError(f"--follow: {follow_timeout}s 동안 새 줄이 없음 (meta 레코드 전): {file_path}")
+                time.sleep(poll_sec)
+                continue
+            idle_from = time.time()
+            buf += line
+            if not buf.endswith("\n"):
+                continue  # 아직 다 써지지 않은 줄
+            rec, buf = buf, ""
+            if not rec.strip():
+                continue
+            rec = json.loads(rec)
+            yield rec
+            if follow and rec.get("type") == "meta":
+                break
+
+
+def load_factpack_stream(file_path, follow=False, follow_timeout=DEFAULT_FOLLOW_TIMEOUT):
+    """
+    Producer의 NDJSON 출력을 factpack 형태로 연다. candidates는 rank(입력 순서)대로 내보내는 이터레이터라
+    Producer가 끝나기 전에도 앞 순위 후보부터 처리할 수 있다. follow/follow_timeout은 iter_ndjson_records 참고.
+    """
+    records = iter_ndjson_records(file_path, follow=follow, follow_timeout=follow_timeout)
+    factpack = {"user": {}, "meta": {}}
+    for rec in records:
+        if rec.get("type") == "user":
+            factpack["user"] = rec.get("user", {})
+            break
+
+    def candidates():
+        pending, next_rank = {}, 0
+        for rec in records:
+            if rec.get("type") == "candidate":
+                pending[rec.get("rank", next_rank)] = rec.get("candidate", {})
+                while next_rank in pending:
+                    yield pending.pop(next_rank)
+                    next_rank += 1
+            elif rec.get("type") == "meta":
+                factpack["meta"] = rec.get("meta", {})
+                if rec.get("user_summary"):
+                    factpack["user_summary"] = rec["user_summary"]
+        for rank in sorted(pending):  # 빠진 rank가 있으면 남은 것을 순서대로
+            yield pending[rank]
+
+    factpack["candidates"] = candidates()
+    return factpack
+
+
+# 프롬프트 투영: 설명에 필요한 최소 필드만 짧은 키로 (compact 모드)
+# (짧은 키, 원래 필드). 수치 필드는 score_breakdown 복사 대상이라 반드시 포함
+CAND_PROJECTION = [
+    ("id", "job_id"), ("t", "title"), ("org", "org"), ("d", "desc"),
+    ("sim", "sim_interest"), ("tov", "time_overlap"), ("tfit", "time_fit"),
+    ("pay", "pay_norm"), ("wage", "hourly_wage"), ("tm", "travel_min"), ("km", "distance_km"),
+    ("days", "work_days"),
+]
+FEATURE_PROJECTION = [("in", "indoor"), ("ph", "physical"), ("ia", "interaction"), ("en", "english"),
+                      ("w", "warnings"), ("tg", "tags")]
+SHORT_TO_FIELD = {short: field for short, field in CAND_PROJECTION + [("hrs", "start_time/end_time"),
+                                                                      ("f", "features")]}
+PROMPT_LEGEND = ("- 키 약어: id=job_id, t=title, d=desc, sim=sim_interest, tov=time_overlap, tfit=time_fit, "
+                 "pay=pay_norm, wage=hourly_wage, tm=travel_min, km=distance_km, days=work_days(월~일 1/0), "
+                 "hrs=근무시간, f=features(in=실내여부, ph=신체강도1~5, ia=대인응대1~3, en=영어, w=주의, tg=태그). "
+                 "출력 키(score_breakdown/used_fields)는 원래 이름 사용\n")
+
+
+def project_candidate(c):
+    """후보 → 최소 필드·짧은 키 dict (값이 없는 필드는 생략)"""
+    out = {}
+    for short, field in CAND_PROJECTION:
+        v = c.get(field)
+        if v is not None and v != "":
+            out[short] = v
+    if c.get("start_time") and c.get("end_time"):
+        out["hrs"] = f"{c['start_time'][:5]}-{c['end_time'][:5]}"
+    feats = c.get("features") or {}
+    f = {short: feats[field] for short, field in FEATURE_PROJECTION if feats.get(field) not in (None, [], "")}
+    if f:
+        out["f"] = f
+    return out
+
+
+def project_user(u):
+    """사용자 → 설명에 쓰는 필드만 (원본 가용 시간표는 후보의 tov/tfit에 이미 반영되어 제외)"""
+    out = {}
+    if u.get("pref_keywords"):
+        out["kw"] = u["pref_keywords"]
+    if u.get("age"):
+        out["age"] = u["age"]
+    return out
+
+
+def prompt_parts(candidate_or_list, user_info, compact=False):
+    """프롬프트에 넣을 (cand JSON, user JSON, 키 약어 안내 줄). compact=False면 원본 그대로"""
+    dumps = lambda o: json.dumps(o, ensure_ascii=False, separators=(",", ":") if compact else None)
+    if not compact:
+        return dumps(candidate_or_list), dumps(user_info), ""
+    if isinstance(candidate_or_list, list):
+        cands = [project_candidate(c) for c in candidate_or_list]
+    else:
+        cands = project_candidate(candidate_or_list)
+    return dumps(cands), dumps(project_user(user_info)), PROMPT_LEGEND
+
+
+def expand_used_fields(output_json):
+    """compact 모드에서 모델이 짧은 키로 답한 used_fields를 원래 필드명으로"""
+    fields = output_json.get("used_fields")
+    if isinstance(fields, list):
+        output_json["used_fields"] = [SHORT_TO_FIELD.get(f, f) if isinstance(f, str) else f for f in fields]
+    return output_json
+
+
+def build_prompt(candidate, user_info, inject_scores=False, compact=False):
+    """
+    LLM 호출용 프롬프트 생성 (inject_scores=True면 score_breakdown 없이 문장 필드만 요청,
+    compact=True면 후보/사용자를 최소 필드·짧은 키로 투영)
+    """
+    if inject_scores:
+        return build_prose_prompt(candidate, user_info, compact)
+    cand_json, user_json, legend = prompt_parts(candidate, user_info, compact)
     # score_breakdown에 반드시 있는 키: sim_interest, time_overlap, pay_norm, travel_min, distance_km
     # 수치는 후보의 값을 '그대로' 복사 (반올림/추정 금지)
     prompt = f"""
 아래 후보(cand)와 사용자(user)를 보고 추천 이유를 한국어 2문장 이하로 요약하세요.
 
 규칙:
-- cand의 수치와 키워드만 사용 (추정/과장 금지)
+{legend}- cand의 수치와 키워드만 사용 (추정/과장 금지)
 - score_breakdown은 cand의 해당 필드를 '정확히 그대로' 복사
 - 출력은 오직 JSON (코드블럭 금지)
 - JSON 스키마:
@@ -60,30 +242,131 @@ def build_prompt(candidate, user_info):
     }}
   }}
 
-cand: {json.dumps(candidate, ensure_ascii=False)}
-user: {json.dumps(user_info, ensure_ascii=False)}
+cand: {cand_json}
+user: {user_json}
+""".strip()
+    return prompt
+
+def build_prose_prompt(candidate, user_info, compact=False):
+    """score_breakdown 주입 모드용 프롬프트: 수치 복사 없이 문장 필드만 생성"""
+    cand_json, user_json, legend = prompt_parts(candidate, user_info, compact)
+    prompt = f"""
+아래 후보(cand)와 사용자(user)를 보고 추천 이유를 한국어 2문장 이하로 요약하세요.
+
+규칙:
+{legend}- cand의 수치와 키워드만 사용 (추정/과장 금지)
+- 출력은 오직 JSON (코드블럭 금지)
+- JSON 스키마:
+  {{
+    "job_id": <int>,
+    "why_short": <string>,      # 2문장 이내
+    "highlights": [<string>],   # 0~5개
+    "warnings": [<string>],     # 0~3개
+    "used_fields": [<string>]   # cand에서 실제로 참조한 필드명
+  }}
+
+cand: {cand_json}
+user: {user_json}
 """.strip()
     return prompt
 
-def call_llm(prompt, model=MODEL):
-    """LLM 호출 (JSON만 허용)"""
+def build_batch_prompt(candidates, user_info, inject_scores=False, compact=False):
+    """여러 후보를 한 번에 설명하는 프롬프트 (user/지시문은 한 번만, 응답은 items 배열)"""
+    if inject_scores:
+        return build_batch_prose_prompt(candidates, user_info, compact)
+    cand_json, user_json, legend = prompt_parts(candidates, user_info, compact)
+    prompt = f"""
+아래 후보 목록(cands)의 각 후보마다 사용자(user)를 보고 추천 이유를 한국어 2문장 이하로 요약하세요.
+
+규칙:
+{legend}- 각 후보의 수치와 키워드만 사용 (추정/과장 금지)
+- score_breakdown은 그 후보의 해당 필드를 '정확히 그대로' 복사
+- cands의 모든 후보에 대해 job_id가 같은 항목을 하나씩 작성
+- 출력은 오직 JSON (코드블럭 금지)
+- JSON 스키마:
+  {{
+    "items": [
+      {{
+        "job_id": <int>,
+        "why_short": <string>,      # 2문장 이내
+        "highlights": [<string>],   # 0~5개
+        "warnings": [<string>],     # 0~3개
+        "used_fields": [<string>],  # 후보에서 실제로 참조한 필드명
+        "score_breakdown": {{
+          "sim_interest": <number>,
+          "time_overlap": <number>,
+          "pay_norm": <number>,
+          "travel_min": <number>,
+          "distance_km": <number>
+        }}
+      }}
+    ]
+  }}
+
+cands: {cand_json}
+user: {user_json}
+""".strip()
+    return prompt
+
+def build_batch_prose_prompt(candidates, user_info, compact=False):
+    """score_breakdown 주입 모드용 묶음 프롬프트: 후보별 문장 필드만 생성"""
+    cand_json, user_json, legend = prompt_parts(candidates, user_info, compact)
+    prompt = f"""
+아래 후보 목록(cands)의 각 후보마다 사용자(user)를 보고 추천 이유를 한국어 2문장 이하로 요약하세요.
+
+규칙:
+{legend}- 각 후보의 수치와 키워드만 사용 (추정/과장 금지)
+- cands의 모든 후보에 대해 job_id가 같은 항목을 하나씩 작성
+- 출력은 오직 JSON (코드블럭 금지)
+- JSON 스키마:
+  {{
+    "items": [
+      {{
+        "job_id": <int>,
+        "why_short": <string>,      # 2문장 이내
+        "highlights": [<string>],   # 0~5개
+        "warnings": [<string>],     # 0~3개
+        "used_fields": [<string>]   # 후보에서 실제로 참조한 필드명
+      }}
+    ]
+  }}
+
+cands: {cand_json}
+user: {user_json}
+""".strip()
+    return prompt
+
+def call_llm(prompt, model=None, timeout=None, op="explain", retry=0):
+    """
+    LLM 호출 (JSON만 허용). 반환: (응답 JSON dict, 지연 ms, prompt 토큰)
+    응답 파싱도 계측 블록 안에서 해 깨진 JSON/객체가 아닌 응답은 parse_error로 기록되고 JSONDecodeError를 던진다.
+    timeout(초)을 주면 해당 요청에만 HTTP 타임아웃 적용
+    (SDK 자동 재시도는 끔 → 한 호출이 timeout을 넘지 않음, 검증 실패 재요청은 호출 측이 남은 시간으로).
+    model을 안 주면 호출 시점의 MODEL (오케스트레이터 --inproc에서 바꿀 수 있음).
+    op/retry는 계측(TELEMETRY) 구분용: 호출 종류, 재요청 여부(0=첫 요청).
+    """
+    extra = {"timeout": timeout} if timeout else {}
+    llm = without_retries(get_client()) if timeout else get_client()
     start_time = time.time()
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=0,
-        # JSON만 허용하도록 system 지도
-        messages=[
-            {"role": "system", "content": "You are a careful data-to-text generator. Output ONLY valid JSON without code fences."},
-            {"role": "user", "content": prompt},
-        ],
-        # 일부 모델만 지원하지만, 지원되는 경우 JSON 형식 강제
-        response_format={"type": "json_object"}
-    )
+    with TELEMETRY.call("consumer", op, retry=retry) as rec:
+        resp = llm.chat.completions.create(
+            model=model or MODEL,
+            temperature=0,
+            # JSON만 허용하도록 system 지도
+            messages=[
+                {"role": "system", "content": "You are a careful data-to-text generator. Output ONLY valid JSON without code fences."},
+                {"role": "user", "content": prompt},
+            ],
+            # 일부 모델만 지원하지만, 지원되는 경우 JSON 형식 강제
+            response_format={"type": "json_object"},
+            **extra,
+        )
+        rec.usage(resp)
+        obj = parse_json_object(resp.choices[0].message.content)
     end_time = time.time()
     latency_ms = int((end_time - start_time) * 1000)
-    content = resp.choices[0].message.content
     prompt_tokens = getattr(resp.usage, "prompt_tokens", 0)
-    return content, latency_ms, prompt_tokens
+    return obj, latency_ms, prompt_tokens
 
 
 
@@ -106,24 +389,105 @@ def validate_output(output_json, candidate):
         print(f"Validation error: {e}")
         return False
 
+SCORE_FIELDS = ["sim_interest", "time_overlap", "pay_norm", "travel_min", "distance_km"]
+
+def score_breakdown_of(candidate):
+    """후보 수치로 score_breakdown 생성 (폴백/주입 모드 공용)"""
+    return {f: _to_num(candidate.get(f, 0)) for f in SCORE_FIELDS}
+
+def render_template_explanation(candidate):
+    """
+    LLM 없이 후보 수치/특징만으로 만드는 결정론 설명 (폴백/마감 초과용).
+    Producer가 만든 features, time_fit, travel_min, pay_norm 을 문장/하이라이트/주의사항으로 바꾼다.
+    반환: (why_short, highlights, warnings, used_fields)
+    """
+    feats = candidate.get("features") or {}
+    good, warns, used = [], [], []
+
+    time_fit = candidate.get("time_fit")
+    if time_fit is None:
+        time_fit = candidate.get("time_overlap")
+        time_key = "time_overlap"
+    else:
+        time_key = "time_fit"
+    if time_fit is not None:
+        used.append(time_key)
+        tf = _to_num(time_fit)
+        if tf >= 0.7:
+            good.append(f"가능 시간과 근무 시간이 잘 맞음(적합도 {tf:.2f})")
+        elif tf >= 0.3:
+            good.append(f"가능 시간과 근무 시간이 일부 겹침(적합도 {tf:.2f})")
+        else:
+            warns.append("가능 시간과 겹치는 근무 시간이 적음")
+
+    travel = candidate.get("travel_min")
+    if travel is not None:
+        used.append("travel_min")
+        tm = int(_to_num(travel))
+        if tm <= 20:
+            good.append(f"이동 {tm}분으로 가까움")
+        elif tm <= 40:
+            good.append(f"이동 {tm}분")
+        elif tm > 60:
+            warns.append(f"이동 시간 {tm}분")
+
+    pay = candidate.get("pay_norm")
+    if pay is not None:
+        used.append("pay_norm")
+        pn = _to_num(pay)
+        if pn >= 0.7:
+            good.append("지역 대비 시급이 높은 편")
+        elif pn <= 0.3:
+            warns.append("지역 대비 시급이 낮은 편")
+
+    if feats:
+        used.append("features")
+    indoor = feats.get("indoor")
+    if indoor == "indoor":
+        good.append("실내 근무")
+    elif indoor == "outdoor":
+        good.append("야외 근무")
+    physical = feats.get("physical")
+    if isinstance(physical, (int, float)):
+        if physical <= 2:
+            good.append("신체 부담이 적은 편")
+        elif physical >= 4:
+            warns.append("체력 부담이 큰 편")
+    if feats.get("interaction") == 3:
+        good.append("사람 응대가 많은 일")
+    if feats.get("english") is True:
+        warns.append("영어 사용 필요")
+    for w in feats.get("warnings") or []:
+        if w not in warns:
+            warns.append(w)
+
+    title = candidate.get("title") or "이 일자리"
+    if candidate.get("title"):
+        used.insert(0, "title")
+    if good:
+        why = f"{title}: " + ", ".join(good[:3]) + "."
+    else:
+        why = f"{title}: 기본 조건 정보만 정리했습니다."
+    if warns:
+        why += f" 다만 {warns[0]}."
+    return why, good[:5], warns[:3], used
+
+
+@traced("fallback", cat="consumer")
 def generate_fallback(candidate):
-    """LLM 실패 시 폴백 JSON (스펙 일치)"""
+    """LLM 실패/마감 초과 시 폴백 JSON (스펙 일치, 템플릿 설명 사용)"""
     job_id = candidate.get("job_id", -1)
+    why_short, highlights, warnings, used_fields = render_template_explanation(candidate)
     return {
         "job_id": job_id,
-        "why_short": "추천 이유 생성 실패: 기본 정보만 제공합니다.",
-        "highlights": [],
-        "warnings": [],
-        "used_fields": [],
-        "score_breakdown": {
-            "sim_interest": _to_num(candidate.get("sim_interest", 0)),
-            "time_overlap": _to_num(candidate.get("time_overlap", 0)),
-            "pay_norm": _to_num(candidate.get("pay_norm", 0)),
-            "travel_min": _to_num(candidate.get("travel_min", 0)),
-            "distance_km": _to_num(candidate.get("distance_km", 0)),
-        },
+        "why_short": why_short,
+        "highlights": highlights,
+        "warnings": warnings,
+        "used_fields": used_fields,
+        "score_breakdown": score_breakdown_of(candidate),
         "fallback": True,
-        "confidence": 0.0
+        "templated": True,
+        "confidence": 0.5  # 수치 기반 결정론 문장 (LLM 문장보다 낮게)
     }
 
 
@@ -155,102 +519,403 @@ def validate_output(output_json, candidate):
 # 3️⃣ Consumer 파이프라인
 # ===============================
 
-def consumer_pipeline(factpack_json, top_k=5):
-    user_info = factpack_json.get("user", {})
-    candidates = (factpack_json.get("candidates") or [])[:top_k]
-    results, total_latency_ms, total_prompt_tokens = [], 0, 0
-    errors = []
-
-    for c in tqdm(candidates, desc="Processing candidates"):
-        prompt = build_prompt(c, user_info)
-        output_json, raw_output = None, ""
-        latency_ms = prompt_tokens = 0
+def parse_llm_json(raw_output):
+    """LLM 응답 문자열 → dict (코드펜스 대비: response_format이 작동 못하는 모델일 경우)"""
+    return parse_json_object(raw_output)
+
+
+def fill_defaults(output_json, candidate):
+    """기본 필드 보강"""
+    output_json.setdefault("job_id", candidate.get("job_id"))
+    output_json.setdefault("highlights", [])
+    output_json.setdefault("warnings", [])
+    output_json.setdefault("used_fields", [])
+    output_json.setdefault("score_breakdown", {})
+    output_json.setdefault("fallback", False)
+    output_json.setdefault("confidence", 0.9)  # 기본 신뢰도
+    return output_json
+
+
+def parse_output(out, compact=False):
+    """call_llm이 파싱한 단건 응답 (compact 모드면 used_fields 약어를 원래 이름으로)"""
+    return expand_used_fields(out) if compact else out
+
+
+@traced("validate", cat="consumer")
+def finalize_output(output_json, candidate, inject_scores=False):
+    """
+    기본 필드 보강 후 검증. inject_scores=True면 score_breakdown을 후보 값으로 채워 수치 검증이 항상 통과.
+    반환: (output_json, 통과 여부)
+    주입 모드가 줄인 재요청 수는 두 모드의 consumer.validation_failed 계측(--metrics)을 비교해 확인한다.
+    """
+    fill_defaults(output_json, candidate)
+    if not inject_scores:
+        ok = validate_output(output_json, candidate)
+        if not ok:
+            TELEMETRY.incr("consumer.validation_failed")
+        return output_json, ok
+    output_json["score_breakdown"] = score_breakdown_of(candidate)
+    return output_json, True
+
+
+def explain_candidate(c, user_info, timeout=None, inject_scores=False, compact=False):
+    """
+    후보 1건 설명 생성 (검증 실패 시 1회 재시도, 그래도 실패하면 폴백).
+    timeout(초)은 후보 1건에 주는 전체 시간: 첫 호출에 그대로, 재시도에는 남은 시간만 준다.
+    inject_scores=True면 모델은 문장 필드만 만들고 score_breakdown은 후보 값으로 채움(수치 불일치 재시도 없음).
+    compact=True면 투영된 짧은 키 프롬프트 사용 (project_candidate).
+    반환: dict(output, latency_ms, prompt_tokens, error, retries, timed_out)
+    timed_out=1: 시간 제한 때문에 폴백 (호출 타임아웃, 또는 재시도할 시간이 남지 않음)
+    """
+    prompt = build_prompt(c, user_info, inject_scores, compact)
+    res = {"output": None, "latency_ms": 0, "prompt_tokens": 0, "error": None, "retries": 0, "timed_out": 0}
+    deadline = time.time() + timeout if timeout else None
 
-        try:
-            raw_output, latency_ms, prompt_tokens = call_llm(prompt)
-            # 코드펜스 대비 (response_format이 작동 못하는 모델일 경우)
-            raw = raw_output.strip()
-            if raw.startswith("```"):
-                # ```json ... ``` 또는 ``` ... ```
-                first = raw.find("\n")
-                last = raw.rfind("```")
-                json_str = raw[first:last].strip() if (first != -1 and last != -1) else raw
+    try:
+        resp_json, res["latency_ms"], res["prompt_tokens"] = call_llm(prompt, timeout=timeout)
+        output_json, ok = finalize_output(parse_output(resp_json, compact), c, inject_scores)
+
+        # 검증
+        if not ok:
+            # 1회 재시도 (시간이 남았을 때만)
+            remaining = deadline - time.time() if deadline else None
+            if remaining is not None and remaining <= 0:
+                res["output"], res["timed_out"] = generate_fallback(c), 1
+                return res
+            res["retries"] = 1
+            retry_json, lat_retry, tok_retry = call_llm(prompt, timeout=remaining, retry=1)
+            out2, ok2 = finalize_output(parse_output(retry_json, compact), c, inject_scores)
+
+            if not ok2:
+                output_json = generate_fallback(c)
             else:
-                json_str = raw
-            output_json = json.loads(json_str)
-
-            # 기본 필드 보강
-            output_json.setdefault("job_id", c.get("job_id"))
-            output_json.setdefault("highlights", [])
-            output_json.setdefault("warnings", [])
-            output_json.setdefault("used_fields", [])
-            output_json.setdefault("score_breakdown", {})
-            output_json.setdefault("fallback", False)
-            output_json.setdefault("confidence", 0.9)  # 기본 신뢰도
-
-            # 검증
-            if not validate_output(output_json, c):
-                # 1회 재시도
-                raw_retry, lat_retry, tok_retry = call_llm(prompt)
-                raw2 = raw_retry.strip()
-                if raw2.startswith("```"):
-                    first = raw2.find("\n")
-                    last = raw2.rfind("```")
-                    json_str2 = raw2[first:last].strip() if (first != -1 and last != -1) else raw2
-                else:
-                    json_str2 = raw2
-                out2 = json.loads(json_str2)
-
-                out2.setdefault("job_id", c.get("job_id"))
-                out2.setdefault("highlights", [])
-                out2.setdefault("warnings", [])
-                out2.setdefault("used_fields", [])
-                out2.setdefault("score_breakdown", {})
-                out2.setdefault("fallback", False)
-                out2.setdefault("confidence", 0.9)
-
-                if not validate_output(out2, c):
-                    output_json = generate_fallback(c)
-                else:
-                    output_json = out2
-                    latency_ms = lat_retry
-                    prompt_tokens = tok_retry
+                output_json = out2
+                res["latency_ms"] = lat_retry
+                res["prompt_tokens"] = tok_retry
+        res["output"] = output_json
 
+    except json.JSONDecodeError as e:
+        res["output"], res["error"] = generate_fallback(c), f"JSONDecodeError: {e}"
+    except Exception as e:
+        res["output"], res["error"] = generate_fallback(c), f"LLM/Processing error: {e}"
+        res["timed_out"] = int(classify_error(e) == "timeout")
+    return res
+
+
+def explain_batch(cands, user_info, timeout=None, inject_scores=False, compact=False):
+    """
+    후보 여러 건을 한 번의 요청으로 설명. 응답 items를 job_id로 맞춰 항목별 검증,
+    실패/누락 항목만 모아 1회 재요청하고 그래도 실패하면 폴백.
+    timeout(초)은 묶음 전체에 주는 시간 (재요청에는 남은 시간만).
+    반환: dict(outputs(후보 순서), latency_ms 합, prompt_tokens 합, errors, retries, timed_out)
+    timed_out: 시간 제한 때문에 폴백한 후보 수 (마지막 호출 타임아웃, 또는 재요청할 시간이 남지 않음)
+    """
+    outputs = [None] * len(cands)
+    res = {"outputs": outputs, "latency_ms": 0, "prompt_tokens": 0, "errors": [], "retries": 0, "timed_out": 0}
+    deadline = time.time() + timeout if timeout else None
+    todo = list(range(len(cands)))
+    out_of_time = False
+
+    for attempt in range(2):
+        remaining = deadline - time.time() if deadline else None
+        if not todo:
+            break
+        if remaining is not None and remaining <= 0:
+            out_of_time = True
+            break
+        if attempt:
+            res["retries"] += len(todo)
+        items = []
+        try:
+            prompt = build_batch_prompt([cands[i] for i in todo], user_info, inject_scores, compact)
+            resp_json, lat, tok = call_llm(prompt, timeout=remaining, op="explain_batch", retry=attempt)
+            res["latency_ms"] += lat
+            res["prompt_tokens"] += tok
+            items = resp_json.get("items") or []
+            out_of_time = False
         except json.JSONDecodeError as e:
-            errors.append(f"JSONDecodeError: {e}")
-            output_json = generate_fallback(c)
+            res["errors"].append(f"JSONDecodeError: {e}")
+            out_of_time = False
         except Exception as e:
-            errors.append(f"LLM/Processing error: {e}")
-            output_json = generate_fallback(c)
-
-        results.append(output_json)
-        total_latency_ms += latency_ms
-        total_prompt_tokens += prompt_tokens
-
-    fallback_count = sum(1 for r in results if r.get("fallback"))
-    total_candidates = len(results) or 1
-    fallback_ratio = fallback_count / total_candidates
+            res["errors"].append(f"LLM/Processing error: {e}")
+            out_of_time = classify_error(e) == "timeout"
+
+        by_id = {}
+        for pos, it in enumerate(items):
+            if not isinstance(it, dict):
+                continue
+            jid = it.get("job_id", it.get("id"))  # compact 모드에서 짧은 키로 답해도 대응
+            if jid is None and pos < len(todo):  # job_id를 빠뜨리면 위치로 대응
+                jid = cands[todo[pos]].get("job_id")
+            by_id.setdefault(str(jid), it)
+
+        failed = []
+        for i in todo:
+            it = by_id.get(str(cands[i].get("job_id")))
+            if it is None:
+                failed.append(i)
+                continue
+            if compact:
+                expand_used_fields(it)
+            it, ok = finalize_output(it, cands[i], inject_scores)
+            if ok:
+                outputs[i] = it
+            else:
+                failed.append(i)
+        todo = failed
+
+    for i in todo:
+        outputs[i] = generate_fallback(cands[i])
+    if out_of_time:
+        res["timed_out"] = len(todo)
+    return res
+
+
+def iter_chunks(items, n):
+    """이터러블을 n개씩 묶어 지연 생성 (스트리밍 입력도 필요한 만큼만 읽음)"""
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, n))
+        if not chunk:
+            return
+        yield chunk
+
+
+@traced("explain.unit", cat="consumer")
+def explain_unit(unit, user_info, batch_size=1, timeout=None, cache=None, inject_scores=False, compact=False):
+    """
+    처리 단위(후보 1건 또는 묶음)를 설명해 dict(outputs, latency_ms, prompt_tokens, errors,
+    cache_hits, retries, timed_out)로 통일.
+    cache가 있으면 캐시에 있는 후보는 재사용하고 나머지만 LLM으로 보낸 뒤, 검증을 통과한 결과만 저장(폴백 제외).
+    """
+    cands = unit if batch_size > 1 else [unit]
+    outputs = [None] * len(cands)
+    keys = []
+    if cache is not None:
+        variant = "+".join(v for v, on in (("inject", inject_scores), ("compact", compact)) if on)
+        keys = [explain_cache_key(c, user_info, variant=variant) for c in cands]
+        with TRACER.span("cache.get", cat="consumer", n=len(keys)):
+            found = cache.get_many(keys)
+        for i, k in enumerate(keys):
+            outputs[i] = found.get(k)
+    todo = [i for i, o in enumerate(outputs) if o is None]
+    res = {"outputs": outputs, "latency_ms": 0, "prompt_tokens": 0, "errors": [],
+           "cache_hits": len(cands) - len(todo), "retries": 0, "timed_out": 0}
+
+    if todo:
+        if batch_size > 1:
+            got = explain_batch([cands[i] for i in todo], user_info, timeout, inject_scores, compact)
+            fresh = got["outputs"]
+        else:
+            got = explain_candidate(cands[0], user_info, timeout, inject_scores, compact)
+            fresh = [got["output"]]
+            got["errors"] = [got["error"]] if got["error"] else []
+        for k in ("latency_ms", "prompt_tokens", "errors", "retries", "timed_out"):
+            res[k] = got[k]
+        for i, out in zip(todo, fresh):
+            outputs[i] = out
+        if cache is not None:
+            with TRACER.span("cache.put", cat="consumer"):
+                cache.put_many((keys[i], outputs[i]) for i in todo if not outputs[i].get("fallback"))
+    return res
+
+
+def template_unit(unit, batch_size=1):
+    """마감까지 LLM 결과가 없는 단위를 템플릿 설명으로 채운 explain_unit 형식 결과"""
+    cands = unit if batch_size > 1 else [unit]
+    return {"outputs": [generate_fallback(c) for c in cands], "latency_ms": 0, "prompt_tokens": 0, "errors": [],
+            "cache_hits": 0, "retries": 0, "timed_out": 0, "deadline_missed": len(cands)}
+
+
+def _collect_done(pending, deadline, batch_size):
+    """진행 중 단위 중 끝난 것을 yield. 마감이 지나면 남은 단위를 모두 템플릿으로 내보내고 비운다."""
+    left = None if deadline is None else max(0.0, deadline - time.time())
+    done, _ = wait(pending, timeout=left, return_when=FIRST_COMPLETED)
+    if not done:
+        for fut, (i, u) in list(pending.items()):
+            fut.cancel()
+            yield i, template_unit(u, batch_size)
+        pending.clear()
+        return
+    for fut in done:
+        i, _ = pending.pop(fut)
+        yield i, fut.result()
+
+
+def iter_explained(units, user_info, concurrency=1, batch_size=1, timeout=None, cache=None, inject_scores=False,
+                   deadline=None, compact=False):
+    """
+    (순번, explain_unit 결과)를 끝나는 순서대로 생성.
+    concurrency > 1 이면 최대 concurrency개 단위를 동시에 처리(스레드 풀, 진행 중 개수 제한이라
+    스트리밍 이터레이터도 필요한 만큼만 읽는다).
+    deadline(time.time() 기준 시각)이 있으면 각 단위의 LLM 시간 제한을 남은 시간으로 줄이고,
+    마감까지 끝나지 않은/시작하지 못한 단위는 기다리지 않고 템플릿 설명으로 채운다.
+    시간 제한이 마감으로 정해진 단위가 시간 초과로 폴백하면 그 후보도 deadline_missed로 센다.
+    """
+    def run_unit(u):
+        unit_timeout, by_deadline = timeout, False
+        if deadline is not None:
+            left = deadline - time.time()
+            by_deadline = not timeout or left <= timeout
+            unit_timeout = left if by_deadline else timeout
+        res = explain_unit(u, user_info, batch_size, unit_timeout, cache, inject_scores, compact)
+        if by_deadline:
+            res["deadline_missed"] = res["timed_out"]
+        return res
+
+    def expired():
+        return deadline is not None and time.time() >= deadline
+
+    if concurrency <= 1:
+        for i, u in enumerate(units):
+            if expired():
+                yield i, template_unit(u, batch_size)
+            else:
+                yield i, run_unit(u)
+        return
 
-    # 입력 요약 해시 (재현성/로깅용)
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    pending = {}
+    try:
+        for i, u in enumerate(units):
+            if expired():
+                yield i, template_unit(u, batch_size)
+                continue
+            fut = pool.submit(run_unit, u)
+            pending[fut] = (i, u)
+            while len(pending) >= concurrency:
+                yield from _collect_done(pending, deadline, batch_size)
+        while pending:
+            yield from _collect_done(pending, deadline, batch_size)
+    finally:
+        # 마감 모드에서는 늦은 호출을 기다리지 않음 (각 호출은 남은 시간 제한이 걸려 곧 끝남)
+        pool.shutdown(wait=deadline is None, cancel_futures=True)
+
+
+def iter_explain_stream(factpack_json, top_k=5, concurrency=1, candidate_timeout=None, explain_batch_size=1,
+                        cache=None, inject_scores=False, deadline_ms=None, compact_prompt=False, progress=True):
+    """
+    후보별 추천 이유를 검증이 끝나는 대로 레코드로 생성 (끝나는 순서, rank로 입력 순서 복원 가능).
+      {"type": "item", "rank": int, "item": {...}}                       # 후보마다
+      {"type": "meta", "version": "explain.v1.1", "meta": {...}}         # 항상 마지막
+    concurrency > 1 이면 후보를 동시에 처리.
+    explain_batch_size > 1 이면 후보를 그 개수씩 묶어 한 번의 요청으로 설명(explain_batch),
+    이때 candidate_timeout은 묶음 단위 시간 제한.
+    cache(LLMCache)가 있으면 같은 후보/사용자/모델/프롬프트 버전의 검증된 설명을 재사용 (meta.cache에 hit/miss).
+    inject_scores=True면 score_breakdown을 모델 대신 후보 값으로 채움 (meta.score_injection).
+    deadline_ms가 있으면 요청 시작부터 그 시간 안에 끝나지 않은 후보는 템플릿 설명(templated=True)으로 채움.
+    compact_prompt=True면 후보/사용자를 설명에 필요한 필드만 짧은 키로 넣어 프롬프트 토큰을 줄임 (meta.compact_prompt).
+    meta.latency_ms = 호출별 지연 합, meta.wall_ms = 실제 경과 시간, meta.retries = 검증 실패 재요청 수.
+    """
+    wall_start = time.time()
+    deadline = wall_start + deadline_ms / 1000.0 if deadline_ms else None
+    user_info = factpack_json.get("user", {})
+    cands_src = factpack_json.get("candidates") or []
+    # 리스트뿐 아니라 스트리밍 이터레이터(load_factpack_stream)도 받는다
+    candidates = cands_src[:top_k] if isinstance(cands_src, list) else islice(cands_src, top_k)
+    total = min(top_k, len(cands_src)) if isinstance(cands_src, list) else None
+    # 실제로 설명한 후보의 job_id (facts_hash용, 실행 모드와 무관하게 같은 값)
+    explained_ids = []
+
+    def tracked(cs):
+        for c in cs:
+            explained_ids.append(c.get("job_id"))
+            yield c
+    candidates = tracked(candidates)
+    batch_size = max(1, explain_batch_size)
+    units = iter_chunks(candidates, batch_size) if batch_size > 1 else candidates
+    if total is not None and batch_size > 1:
+        total = -(-total // batch_size)
+
+    total_latency_ms = total_prompt_tokens = 0
+    errors = []
+    count = fallback_count = templated = 0
+    cache_hits = retries = deadline_missed = 0
+    stream = iter_explained(units, user_info, concurrency, batch_size, candidate_timeout, cache,
+                            inject_scores, deadline, compact_prompt)
+    if progress:
+        from tqdm import tqdm  # 진행 표시할 때만 import (기동 시간 절약)
+        stream = tqdm(stream, total=total, desc="Processing candidates")
+    for i, res in stream:
+        for j, out in enumerate(res["outputs"]):
+            count += 1
+            fallback_count += bool(out.get("fallback"))
+            templated += bool(out.get("templated"))
+            yield {"type": "item", "rank": i * batch_size + j, "item": out}
+        errors.extend(res["errors"])
+        total_latency_ms += res["latency_ms"]
+        total_prompt_tokens += res["prompt_tokens"]
+        cache_hits += res["cache_hits"]
+        retries += res["retries"]
+        deadline_missed += res.get("deadline_missed", 0)
+
+    fallback_ratio = fallback_count / (count or 1)
+    for name, n in (("items", count), ("fallback", fallback_count), ("templated", templated),
+                    ("cache_hits", cache_hits), ("deadline_missed", deadline_missed)):
+        TELEMETRY.incr(f"consumer.{name}", n)
+
+    # 입력 요약 해시 (재현성/로깅용): 사용자 + 설명한 후보 job_id 순서
+    # (스트리밍 입력은 마지막 meta를 읽기 전에 끝나므로 전체 후보 수 대신 실제 처리한 후보로 계산)
     facts_hash = hash_str(json.dumps({
         "user": factpack_json.get("user", {}),
-        "candidates_len": len(factpack_json.get("candidates", []))
+        "job_ids": explained_ids
     }, ensure_ascii=False)[:1000])
 
+    meta = {
+        "llm_model": MODEL,
+        "latency_ms": total_latency_ms,
+        "wall_ms": int((time.time() - wall_start) * 1000),
+        "concurrency": max(1, concurrency),
+        "explain_batch_size": batch_size,
+        "prompt_tokens": total_prompt_tokens,
+        "fallback_ratio": fallback_ratio,
+        "facts_hash": facts_hash,
+        "errors": errors,
+        "retries": retries,
+        "templated": templated,
+    }
+    if deadline_ms:
+        meta["deadline_ms"] = deadline_ms
+        meta["deadline_missed"] = deadline_missed
+    if inject_scores:
+        meta["score_injection"] = {"enabled": True}
+    if compact_prompt:
+        meta["compact_prompt"] = True
+    if cache is not None:
+        meta["cache"] = {"hits": cache_hits, "misses": count - cache_hits}
+    yield {"type": "meta", "version": "explain.v1.1", "meta": meta}
+
+
+@traced("consumer_pipeline", cat="consumer")
+def consumer_pipeline(factpack_json, top_k=5, **kwargs):
+    """
+    iter_explain_stream을 끝까지 모아 explain.json 형식으로 반환 (items는 입력 순서).
+    옵션(concurrency, candidate_timeout, explain_batch_size, cache, inject_scores, deadline_ms, compact_prompt)은
+    iter_explain_stream 참고.
+    """
+    items, meta = {}, {}
+    for rec in iter_explain_stream(factpack_json, top_k=top_k, **kwargs):
+        if rec["type"] == "item":
+            items[rec["rank"]] = rec["item"]
+        else:
+            meta = rec["meta"]
     return {
         "version": "explain.v1.1",
-        "items": results,
-        "meta": {
-            "llm_model": MODEL,
-            "latency_ms": total_latency_ms,
-            "prompt_tokens": total_prompt_tokens,
-            "fallback_ratio": fallback_ratio,
-            "facts_hash": facts_hash,
-            "errors": errors,
-        }
+        "items": [items[r] for r in sorted(items)],
+        "meta": meta
     }
 
 
+def sse_events(records):
+    """
+    iter_explain_stream 레코드를 Server-Sent Events 문자열로 변환 (event: item|meta, data: JSON).
+    백엔드에서 예) FastAPI:
+        StreamingResponse(sse_events(iter_explain_stream(factpack, top_k=5, progress=False)),
+                          media_type="text/event-stream")
+    """
+    for rec in records:
+        yield f"event: {rec['type']}\ndata: {json.dumps(rec, ensure_ascii=False)}\n\n"
+
 
 # ===============================
 # 4️⃣ 실행 예제
@@ -262,15 +927,71 @@ if __name__ == "__main__":
     ap.add_argument("-i","--input", default="./sample/ai_1_output.json", help="Producer 출력(JSON)")
     ap.add_argument("-o","--output", default="explain.json", help="저장할 결과(JSON)")
     ap.add_argument("-k","--top_k", type=int, default=3, help="Top-K candidates to process")
+    ap.add_argument("-c","--concurrency", type=int, default=1,
+                    help="동시에 처리할 후보 수 (1=순차). 결과 순서는 입력 순서 유지")
+    ap.add_argument("--candidate_timeout", type=float, default=None,
+                    help="후보 1건당 LLM 시간 제한(초, 재시도 포함). 초과 시 폴백")
+    ap.add_argument("--explain_batch_size", type=int, default=1,
+                    help="한 번의 LLM 요청으로 설명할 후보 수 (1=후보별 요청). 검증 실패 항목만 재요청")
+    ap.add_argument("--inject_scores", action="store_true",
+                    help="score_breakdown을 LLM이 복사하지 않고 후보 값으로 채움 (문장 필드만 생성, 수치 불일치 재시도 없음)")
+    ap.add_argument("--compact_prompt", action="store_true",
+                    help="후보/사용자를 설명에 필요한 필드만 짧은 키로 넣어 프롬프트 토큰 절감 (bench_prompt.py로 비교)")
+    ap.add_argument("--deadline_ms", type=int, default=None,
+                    help="요청 전체 마감(ms). 그때까지 LLM 설명이 끝나지 않은 후보는 템플릿 설명으로 채움")
+    ap.add_argument("--cache_db", default=None,
+                    help="설명 결과 SQLite 캐시 경로 (예: .cache/masil_llm.sqlite). 미지정 시 캐시 미사용")
+    ap.add_argument("--cache_ttl_days", type=float, default=DEFAULT_TTL_SEC / 86400,
+                    help="캐시 항목 유효 기간(일)")
+    ap.add_argument("--cache_max_entries", type=int, default=DEFAULT_MAX_ENTRIES,
+                    help="캐시 최대 항목 수 (초과 시 LRU 삭제)")
+    ap.add_argument("--follow", action="store_true",
+                    help="Producer --stream 출력(NDJSON)을 쓰는 도중부터 따라 읽으며 처리 "
+                         "(Consumer 시작 전에 마지막으로 쓰인 파일은 새로 쓰일 때까지 기다림)")
+    ap.add_argument("--follow_timeout", type=float, default=DEFAULT_FOLLOW_TIMEOUT,
+                    help="--follow 유휴 제한(초): 이 시간 동안 새 줄이 없으면(Producer 중단 등) 오류로 종료. 0=무제한")
+    ap.add_argument("--metrics", default=None,
+                    help="LLM 호출 계측(지연 p50/p95/p99, 토큰, 재시도, 결과) 저장 경로. .prom/.txt 면 Prometheus 텍스트, 그 외 JSON")
+    ap.add_argument("--trace", default=None,
+                    help="구간(LLM 호출/검증/폴백/캐시/입출력) 기록을 Chrome trace JSON으로 저장 (chrome://tracing, Perfetto)")
+    ap.add_argument("--stream", action="store_true",
+                    help="NDJSON 스트리밍 출력: 설명이 끝나는 대로 {type:item, rank, item}을 한 줄씩 쓰고 마지막 줄에 meta")
     args = ap.parse_args()
+    if args.trace:
+        TRACER.enable("consumer")
 
+    cache = None
+    if args.cache_db:
+        cache = LLMCache(args.cache_db, table="explain", ttl_sec=args.cache_ttl_days * 86400,
+                         max_entries=args.cache_max_entries)
     try:
-        factpack = load_factpack(args.input)
-        output = consumer_pipeline(factpack, top_k=args.top_k)
-        with open(args.output, "w", encoding="utf-8") as f:
-            json.dump(output, f, ensure_ascii=False, indent=2)
+        if args.follow or args.input.endswith((".ndjson", ".jsonl")):
+            factpack = load_factpack_stream(args.input, follow=args.follow,
+                                            follow_timeout=args.follow_timeout or None)
+        else:
+            factpack = load_factpack(args.input)
+        opts = dict(top_k=args.top_k, concurrency=args.concurrency, candidate_timeout=args.candidate_timeout,
+                    explain_batch_size=args.explain_batch_size, cache=cache,
+                    inject_scores=args.inject_scores, deadline_ms=args.deadline_ms,
+                    compact_prompt=args.compact_prompt)
+        if args.stream:
+            with open(args.output, "w", encoding="utf-8") as f:
+                for rec in iter_explain_stream(factpack, **opts):
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                    f.flush()  # 읽는 쪽이 바로 볼 수 있게
+        else:
+            output = consumer_pipeline(factpack, **opts)
+            with TRACER.span("io.write", cat="io", path=args.output), open(args.output, "w", encoding="utf-8") as f:
+                json.dump(output, f, ensure_ascii=False, indent=2)
         print(f"✅ 완료: {args.output}")
     except FileNotFoundError:
         print(f"❌ 입력 파일 없음: {args.input} (먼저 Producer 실행 필요)")
     except Exception as e:
         print(f"❌ 오류: {e}")
+    finally:
+        if cache is not None:
+            cache.close()
+        if args.metrics:
+            TELEMETRY.write(args.metrics)
+        if args.trace:
+            TRACER.write(args.trace)
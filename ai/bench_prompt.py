@@ -0,0 +1,120 @@
+# bench_prompt.py
+# Consumer 프롬프트 크기/지연 벤치마크: 원본(full) vs 투영(compact) × 후보별(single) vs 묶음(batch)
+# - 토큰 수: tiktoken이 있으면 모델 인코딩으로, 없으면 llm_backend.estimate_tokens 근사치
+# - --call N: 변형별로 후보 N건을 실제 LLM(call_llm)으로 호출해 지연 p50/p95와 usage.prompt_tokens 보고
+# - 입력이 Producer 입력(ai_1_input 형식, pay_norm/features 없음)이면 먼저 Producer 보강을 돌린다
+# 사용 예:
+#   MASIL_LLM_BACKEND=fake python bench_prompt.py sample/ai_1_input.json
+#   MASIL_LLM_BACKEND=fake python bench_prompt.py ai_1_output.json --call 5 --batch 3 -o bench.json
+
+import json, time
+import argparse
+from typing import Any, Dict, List
+
+from llm_backend import estimate_tokens
+from telemetry import quantile
+import AI_2_consumer as consumer
+
+try:
+    import tiktoken
+except ImportError:  # 선택 의존성
+    tiktoken = None
+
+
+def token_counter(model: str):
+    """(토큰 수 함수, 방식 이름)"""
+    if tiktoken is None:
+        return estimate_tokens, "estimate(len/2)"
+    try:
+        enc = tiktoken.encoding_for_model(model)
+    except KeyError:
+        enc = tiktoken.get_encoding("o200k_base")
+    return (lambda s: len(enc.encode(s))), f"tiktoken({enc.name})"
+
+
+def load_factpack(path: str, top_k: int) -> Dict[str, Any]:
+    """Producer 출력이면 그대로, Producer 입력이면 보강해서 반환"""
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    cands = data.get("candidates") or []
+    if cands and "pay_norm" not in cands[0]:
+        from AI_1_producer import enrich_factpack_with_llm
+        data = enrich_factpack_with_llm(data, top_k=top_k)
+    data["candidates"] = (data.get("candidates") or [])[:top_k]
+    return data
+
+
+def prompts_for(cands: List[Dict[str, Any]], user: Dict[str, Any], compact: bool, batch: int) -> List[str]:
+    if batch <= 1:
+        return [consumer.build_prompt(c, user, compact=compact) for c in cands]
+    return [consumer.build_batch_prompt(chunk, user, compact=compact) for chunk in consumer.iter_chunks(cands, batch)]
+
+
+def measure_calls(prompts: List[str], n: int, op: str) -> Dict[str, Any]:
+    """앞쪽 프롬프트 n개를 실제로 호출해 지연/usage 토큰 요약"""
+    lat, tok, errors = [], [], []
+    for p in prompts[:n]:
+        try:
+            _, ms, pt = consumer.call_llm(p, op=op)
+            lat.append(ms)
+            tok.append(pt)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+    lat.sort()
+    return {"calls": len(lat), "errors": errors,
+            "latency_ms": {"p50": round(quantile(lat, 0.5), 1), "p95": round(quantile(lat, 0.95), 1)},
+            "usage_prompt_tokens_avg": round(sum(tok) / (len(tok) or 1), 1)}
+
+
+def bench_file(path: str, top_k: int, batch: int, calls: int, count) -> Dict[str, Any]:
+    fp = load_factpack(path, top_k)
+    cands, user = fp["candidates"], fp.get("user", {})
+    rows = []
+    for compact in (False, True):
+        for b in ([1, batch] if batch > 1 else [1]):
+            prompts = prompts_for(cands, user, compact, b)
+            toks = [count(p) for p in prompts]
+            row = {"variant": f"{'compact' if compact else 'full'}/{'single' if b == 1 else f'batch{b}'}",
+                   "prompts": len(prompts),
+                   "tokens_total": sum(toks),
+                   "tokens_per_candidate": round(sum(toks) / (len(cands) or 1), 1)}
+            if calls:
+                row.update(measure_calls(prompts, calls, "explain" if b == 1 else "explain_batch"))
+            rows.append(row)
+    base = rows[0]["tokens_total"] or 1
+    for r in rows:
+        r["vs_full_single"] = round(r["tokens_total"] / base, 3)
+    return {"file": path, "candidates": len(cands), "variants": rows}
+
+
+def print_report(res: Dict[str, Any]) -> None:
+    print(f"\n== {res['file']} (후보 {res['candidates']}건)")
+    print(f"{'variant':<16}{'prompts':>8}{'tokens':>9}{'tok/cand':>10}{'ratio':>7}{'p50ms':>9}{'p95ms':>9}")
+    for r in res["variants"]:
+        lat = r.get("latency_ms") or {}
+        print(f"{r['variant']:<16}{r['prompts']:>8}{r['tokens_total']:>9}{r['tokens_per_candidate']:>10}"
+              f"{r['vs_full_single']:>7}{lat.get('p50', '-'):>9}{lat.get('p95', '-'):>9}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Consumer 프롬프트 투영(compact) 전후 토큰 수/LLM 지연 비교")
+    ap.add_argument("inputs", nargs="*", default=["sample/ai_1_input.json"],
+                    help="팩트팩 경로들 (Producer 출력 또는 입력)")
+    ap.add_argument("-k", "--top_k", type=int, default=10, help="파일당 비교할 후보 수")
+    ap.add_argument("--batch", type=int, default=3, help="묶음 프롬프트 크기 (1이면 묶음 비교 생략)")
+    ap.add_argument("--call", type=int, default=0, help="변형별 실제 LLM 호출 수 (0=토큰 수만)")
+    ap.add_argument("-o", "--output", default=None, help="결과 JSON 저장 경로")
+    args = ap.parse_args()
+
+    count, method = token_counter(consumer.MODEL)
+    print(f"토큰 계산: {method}, 모델: {consumer.MODEL}")
+    started = time.time()
+    results = [bench_file(p, args.top_k, args.batch, args.call, count) for p in args.inputs]
+    for r in results:
+        print_report(r)
+    print(f"\n⏱ {time.time() - started:.1f}s")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"token_method": method, "model": consumer.MODEL, "results": results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"✅ 저장: {args.output}")
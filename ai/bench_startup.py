@@ -0,0 +1,169 @@
+# bench_startup.py
+# 기동(import) 시간 벤치마크: python -X importtime 으로 스크립트 모듈의 import 시간을 재고 예산과 비교
+# - 오케스트레이터 하위 프로세스 모드/스풀 워커/백엔드 워커가 뜰 때마다 내는 비용
+# - 기본 LLM 백엔드(openai) 설정으로 재서 import 시점에 클라이언트/무거운 모듈을 만드는 회귀를 잡는다
+# - 예산은 이 저장소 모듈(*.py)의 self 시간 합에만 적용 (stdlib/서드파티 import 시간은 기계마다 크게 달라 참고용)
+# - FORBIDDEN 모듈(openai/supabase/tqdm)이 기동 시 import 되면 실패 (첫 사용 시 import 해야 함)
+# - 예산 초과나 금지 모듈이 있으면 종료 코드 1 (CI에서 사용), 모듈별 가장 무거운 하위 import도 함께 출력
+# 사용 예:
+#   python bench_startup.py                 # 전체 대상, 5회 중앙값
+#   python bench_startup.py -n 9 AI_2_consumer --json startup.json
+
+import os, sys, json, argparse, statistics, subprocess, time
+from typing import Any, Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.join(HERE, "..", "masilProject", "local-backend")
+
+# 대상 모듈 → (import 경로에 추가할 디렉터리, 저장소 모듈 self 시간 합 예산 ms)
+# 예산은 느린 CI 머신 측정치의 약 3배 (load_dotenv() 등 모듈 최상위에서 실행되는 코드 포함)
+TARGETS: Dict[str, Tuple[str, float]] = {
+    "llm_backend": (HERE, 40),
+    "AI_1_producer": (HERE, 120),
+    "AI_2_consumer": (HERE, 90),
+    "orchestrator": (HERE, 45),
+    "pipeline": (HERE, 15),
+    "spool": (HERE, 20),
+    "main": (BACKEND_DIR, 150),  # local-backend (fastapi/supabase 미설치 시 건너뜀)
+}
+
+# 기동 시 import 되면 안 되는 최상위 패키지 (LLM/Supabase 클라이언트, 진행 표시)
+FORBIDDEN = ("openai", "supabase", "tqdm")
+
+
+def own_modules(path: str) -> set:
+    """이 저장소 모듈 이름: 대상 디렉터리와 ai/ 디렉터리의 *.py"""
+    names = set()
+    for d in {path, HERE}:
+        names.update(f[:-3] for f in os.listdir(d) if f.endswith(".py"))
+    return names
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, int, int, str]]:
+    """-X importtime 출력 → [(들여쓰기 깊이, self us, cumulative us, 모듈)] (출력 순서 = import 완료 순서)"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+        raw = parts[2].rstrip()
+        name = raw.strip()
+        depth = (len(raw) - len(raw.lstrip()) - 1) // 2
+        rows.append((depth, int(parts[0]), int(parts[1]), name))
+    return rows
+
+
+def find_module(rows: List[Tuple[int, int, int, str]], module: str) -> Optional[int]:
+    """최상위(깊이 0)로 import된 대상 모듈의 위치"""
+    for i, (depth, _, _, name) in enumerate(rows):
+        if depth == 0 and name == module:
+            return i
+    return None
+
+
+def own_self_ms(rows: List[Tuple[int, int, int, str]], own: set) -> float:
+    """저장소 모듈들의 self 시간 합(ms). 하위 stdlib/서드파티 import 시간은 제외"""
+    return sum(self_us for _, self_us, _, name in rows if name.split(".")[0] in own) / 1000
+
+
+def forbidden_imports(rows: List[Tuple[int, int, int, str]]) -> List[str]:
+    """FORBIDDEN 패키지 중 import된 것"""
+    return sorted({name.split(".")[0] for _, _, _, name in rows if name.split(".")[0] in FORBIDDEN})
+
+
+def measure_once(module: str, path: str) -> Tuple[Optional[float], float, List[Tuple[int, int, int, str]], str]:
+    """(누적 import ms 또는 실패 시 None, 인터프리터 포함 전체 ms, importtime 표, 오류)"""
+    env = {k: v for k, v in os.environ.items() if k not in ("MASIL_LLM_BACKEND", "OPENAI_API_KEY")}
+    code = f"import sys; sys.path.insert(0, {path!r}); import {module}"
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, cwd=path,
+                          capture_output=True, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    rows = parse_importtime(proc.stderr)
+    i = find_module(rows, module)
+    if proc.returncode != 0 or i is None:
+        err = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit={proc.returncode}"
+        return None, wall_ms, rows, err
+    return rows[i][2] / 1000, wall_ms, rows, ""
+
+
+def heaviest(rows: List[Tuple[int, int, int, str]], module: str, n: int = 3) -> List[Tuple[str, float]]:
+    """대상 모듈이 직접 import한 모듈 중 누적 시간이 큰 n개 (자식은 부모 줄 바로 앞에 출력된다)"""
+    i = find_module(rows, module)
+    children = []
+    for depth, _, cum, name in reversed(rows[:i or 0]):
+        if depth == 0:
+            break
+        if depth == 1:
+            children.append((name, cum / 1000))
+    return sorted(children, key=lambda r: -r[1])[:n]
+
+
+def bench(modules: List[str], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for module in modules:
+        path, budget = TARGETS[module]
+        own = own_modules(path)
+        imports, owns, walls, rows, err = [], [], [], [], ""
+        forbidden: set = set()
+        for _ in range(repeat):
+            ms, wall, rows, err = measure_once(module, path)
+            if ms is None:
+                break
+            imports.append(ms)
+            owns.append(own_self_ms(rows, own))
+            walls.append(wall)
+            forbidden.update(forbidden_imports(rows))
+        row: Dict[str, Any] = {"module": module, "budget_ms": budget}
+        if not imports:
+            row.update(status="skipped", error=err)
+        else:
+            own_med = statistics.median(owns)
+            status = "forbidden" if forbidden else ("ok" if own_med <= budget else "over")
+            row.update(status=status, own_ms=round(own_med, 1), import_ms=round(statistics.median(imports), 1),
+                       wall_ms=round(statistics.median(walls), 1), forbidden=sorted(forbidden),
+                       heaviest=[{"module": m, "ms": round(v, 1)} for m, v in heaviest(rows, module)])
+        results.append(row)
+    return results
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print(f"{'module':<16}{'own_ms':>8}{'budget':>8}{'import_ms':>10}{'wall_ms':>9}  status     heaviest imports")
+    for r in results:
+        if r["status"] == "skipped":
+            print(f"{r['module']:<16}{'-':>8}{r['budget_ms']:>8}{'-':>10}{'-':>9}  skipped    ({r['error']})")
+            continue
+        heavy = ", ".join(f"{h['module']} {h['ms']:.0f}" for h in r["heaviest"])
+        if r["forbidden"]:
+            heavy = f"금지 import: {', '.join(r['forbidden'])} | {heavy}"
+        print(f"{r['module']:<16}{r['own_ms']:>8}{r['budget_ms']:>8}{r['import_ms']:>10}{r['wall_ms']:>9}"
+              f"  {r['status']:<9}  {heavy}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="스크립트/백엔드 모듈 import 시간 측정 (-X importtime), "
+                                             "저장소 모듈 self 시간 예산 및 금지 import 확인")
+    ap.add_argument("modules", nargs="*", default=list(TARGETS), help=f"대상 모듈 (기본 전체: {', '.join(TARGETS)})")
+    ap.add_argument("-n", "--repeat", type=int, default=5, help="반복 횟수 (중앙값 사용)")
+    ap.add_argument("--json", default=None, help="결과 JSON 저장 경로")
+    ap.add_argument("--no-fail", action="store_true", help="예산 초과/금지 import가 있어도 종료 코드 0")
+    args = ap.parse_args()
+
+    unknown = [m for m in args.modules if m not in TARGETS]
+    if unknown:
+        sys.exit(f"❌ 알 수 없는 대상: {unknown}")
+    results = bench(args.modules, max(1, args.repeat))
+    print_report(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+    over = [r["module"] for r in results if r["status"] == "over"]
+    banned = [f"{r['module']}({', '.join(r['forbidden'])})" for r in results if r["status"] == "forbidden"]
+    if over:
+        print(f"\n⚠️ 예산 초과: {', '.join(over)}")
+    if banned:
+        print(f"\n❌ 기동 시 금지 모듈 import: {', '.join(banned)}")
+    if (over or banned) and not args.no_fail:
+        sys.exit(1)
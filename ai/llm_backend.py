@@ -0,0 +1,407 @@
+# llm_backend.py
+# LLM 클라이언트 공급자 (Producer / Consumer 공용)
+# 환경변수 MASIL_LLM_BACKEND 로 선택:
+#   openai (기본) : 실제 OpenAI 클라이언트
+#   fake          : 네트워크 없이 동작하는 로컬 대역 (지연 분포/오류율/고정 응답 설정 가능)
+#   record        : 실제 OpenAI 호출 + 요청/응답을 MASIL_LLM_TAPE(JSONL)에 기록
+#   replay        : MASIL_LLM_TAPE에 기록된 응답을 재생 (네트워크 없음)
+#
+# fake 설정 (환경변수):
+#   MASIL_FAKE_LATENCY    : 호출당 지연(ms) 분포. "fixed:200" | "uniform:100,400" | "normal:300,50"
+#                           | "lognormal:5.7,0.3" (ln ms 의 평균/표준편차). 기본 "fixed:0"
+#   MASIL_FAKE_ERROR_RATE : 0~1, 이 확률로 FakeLLMError 발생 (기본 0)
+#   MASIL_FAKE_CANNED     : 고정 응답 JSON 파일. {"<프롬프트에 포함된 문자열>": {...응답 JSON...}, "*": {...}}
+#                           일치하는 키가 없으면 내장 응답기(요청 형식을 보고 그럴듯한 JSON 생성) 사용.
+#                           값이 문자열이면 그 문자열을 응답 본문으로 그대로 돌려줌 (깨진 JSON 응답 흉내)
+#   MASIL_FAKE_SEED       : 지연/오류 난수 시드 (재현 가능한 벤치마크용)
+# replay 설정:
+#   MASIL_REPLAY_LATENCY  : "recorded" 이면 기록된 지연만큼 대기, 그 외에는 즉시 응답
+#   MASIL_REPLAY_MISS     : "fake" 이면 테이프에 없는 요청을 fake로 응답, 그 외에는 KeyError
+#
+# 사용 예:
+#   MASIL_LLM_BACKEND=fake MASIL_FAKE_LATENCY=lognormal:6.2,0.4 python orchestrator.py ...
+#   MASIL_LLM_BACKEND=record MASIL_LLM_TAPE=tape.jsonl python ai_2_consumer.py ...
+#   MASIL_LLM_BACKEND=replay MASIL_LLM_TAPE=tape.jsonl MASIL_REPLAY_LATENCY=recorded python ai_2_consumer.py ...
+
+import os, re, json, math, time, random, hashlib, threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from llm_cache import make_key
+
+BACKENDS = ("openai", "fake", "record", "replay")
+
+
+class FakeLLMError(Exception):
+    """fake 백엔드가 MASIL_FAKE_ERROR_RATE 확률로 일으키는 오류 (API 오류 흉내)."""
+
+
+class FakeLLMTimeout(FakeLLMError):
+    """요청의 timeout(초)보다 지연이 길 때 (timeout만큼 기다린 뒤 발생, APITimeoutError 흉내)."""
+
+
+# ---------------- 응답 객체 (openai 응답과 같은 속성 경로) ----------------
+def _chat_response(content: str, prompt_tokens: int, completion_tokens: int, model: str):
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(index=0, finish_reason="stop",
+                                 message=SimpleNamespace(role="assistant", content=content))],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens,
+                              total_tokens=prompt_tokens + completion_tokens),
+    )
+
+
+def _embedding_response(vectors: List[List[float]], model: str, prompt_tokens: int):
+    return SimpleNamespace(
+        model=model,
+        data=[SimpleNamespace(index=i, embedding=v) for i, v in enumerate(vectors)],
+        usage=SimpleNamespace(prompt_tokens=prompt_tokens, total_tokens=prompt_tokens),
+    )
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 (한국어 ~1.5자/토큰, 영문 ~4자/토큰 절충)."""
+    return max(1, int(len(text or "") / 2))
+
+
+# ---------------- 지연 분포 ----------------
+def parse_json_object(text: Optional[str]) -> Dict[str, Any]:
+    """
+    LLM 응답 본문 → dict. 코드펜스(```json ... ```)는 벗겨 낸다.
+    JSON이 아니거나 객체가 아니면 json.JSONDecodeError (계측에서 parse_error로 분류되도록 호출 블록 안에서 쓴다).
+    """
+    raw = (text or "").strip()
+    if raw.startswith("```"):
+        first = raw.find("\n")
+        last = raw.rfind("```")
+        raw = raw[first:last].strip() if (first != -1 and last != -1) else raw
+    obj = json.loads(raw)
+    if not isinstance(obj, dict):
+        raise json.JSONDecodeError(f"expected a JSON object, got {type(obj).__name__}", raw, 0)
+    return obj
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """"kind:a,b" 형식 -> rng를 받아 지연(ms)을 돌려주는 함수."""
+    kind, _, args = (spec or "fixed:0").partition(":")
+    vals = [float(x) for x in args.split(",") if x.strip()] or [0.0]
+    if kind == "fixed":
+        return lambda rng: vals[0]
+    if kind == "uniform":
+        return lambda rng: rng.uniform(vals[0], vals[1])
+    if kind == "normal":
+        return lambda rng: max(0.0, rng.gauss(vals[0], vals[1]))
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(vals[0], vals[1])
+    raise ValueError(f"unknown latency spec: {spec!r}")
+
+
+# ---------------- 내장 응답기 ----------------
+def _last_user_text(messages: List[Dict[str, Any]]) -> str:
+    for m in reversed(messages or []):
+        if m.get("role") == "user":
+            return str(m.get("content") or "")
+    return ""
+
+
+def _respond_enrich(text: str) -> Optional[Dict[str, Any]]:
+    """Producer llm_enrich_batch 요청: {"candidates": [...]} -> {"items": [...]}"""
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return None
+    if not isinstance(payload, dict) or "candidates" not in payload:
+        return None
+    items = []
+    for c in payload.get("candidates") or []:
+        title = c.get("title") or ""
+        items.append({
+            "job_id": c.get("job_id"),
+            "org": None,
+            "desc": f"{title} 업무입니다."[:80],
+            "features": {"indoor": None, "english": False, "physical": 2, "interaction": 2,
+                         "warnings": [], "tags": [t for t in re.split(r"\s+", title) if t][:3]},
+        })
+    return {"items": items}
+
+
+def _respond_summary(text: str) -> Optional[Dict[str, Any]]:
+    """Producer llm_his_short 요청 -> {"summary": ...}"""
+    if '{"summary": string}' not in text:
+        return None
+    src = text.split("원문:", 1)[-1].strip()
+    return {"summary": src[:60]}
+
+
+# Consumer compact 프롬프트의 짧은 키 (AI_2_consumer.CAND_PROJECTION과 같음)
+_SHORT_KEYS = {"job_id": "id", "title": "t", "sim_interest": "sim", "time_overlap": "tov",
+               "pay_norm": "pay", "travel_min": "tm", "distance_km": "km"}
+
+
+def _explain_for(cand: Dict[str, Any]) -> Dict[str, Any]:
+    get = lambda k: cand.get(k, cand.get(_SHORT_KEYS[k]))
+    return {
+        "job_id": get("job_id"),
+        "why_short": f"{get('title') or '이 일자리'}는 조건이 잘 맞습니다.",
+        "highlights": ["이동 시간 적당"],
+        "warnings": [],
+        "used_fields": ["title", "travel_min"],
+        "score_breakdown": {k: get(k) for k in
+                            ("sim_interest", "time_overlap", "pay_norm", "travel_min", "distance_km")},
+    }
+
+
+def _respond_explain(text: str) -> Optional[Dict[str, Any]]:
+    """Consumer build_prompt 요청 (cand: {...}) -> 후보 수치를 그대로 복사한 설명 JSON"""
+    m = re.search(r"^cand: (.*)$", text, re.M)
+    if not m:
+        return None
+    try:
+        cand = json.loads(m.group(1))
+    except ValueError:
+        return None
+    return _explain_for(cand)
+
+
+def _respond_explain_batch(text: str) -> Optional[Dict[str, Any]]:
+    """Consumer build_batch_prompt 요청 (cands: [...]) -> {"items": [후보별 설명 JSON]}"""
+    m = re.search(r"^cands: (.*)$", text, re.M)
+    if not m:
+        return None
+    try:
+        cands = json.loads(m.group(1))
+    except ValueError:
+        return None
+    return {"items": [_explain_for(c) for c in cands if isinstance(c, dict)]}
+
+
+RESPONDERS: List[Callable[[str], Optional[Dict[str, Any]]]] = [
+    _respond_enrich, _respond_summary, _respond_explain, _respond_explain_batch,
+]
+
+
+# ---------------- fake 클라이언트 ----------------
+class _FakeChatCompletions:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, model: str = "fake", messages: List[Dict[str, Any]] = None, **kwargs):
+        o = self._owner
+        o._sleep_and_maybe_fail(kwargs.get("timeout"))
+        text = _last_user_text(messages)
+        obj = o._canned_for(text)
+        if obj is None:
+            for responder in RESPONDERS:
+                obj = responder(text)
+                if obj is not None:
+                    break
+        content = obj if isinstance(obj, str) else json.dumps(obj if obj is not None else {}, ensure_ascii=False)
+        prompt_text = "".join(str(m.get("content") or "") for m in messages or [])
+        return _chat_response(content, estimate_tokens(prompt_text), estimate_tokens(content), model)
+
+
+class _FakeEmbeddings:
+    def __init__(self, owner: "FakeOpenAI"):
+        self._owner = owner
+
+    def create(self, input: Any = None, model: str = "fake-embedding", dimensions: int = 1536, **kwargs):
+        self._owner._sleep_and_maybe_fail(kwargs.get("timeout"))
+        texts = [input] if isinstance(input, str) else list(input or [])
+        vectors = []
+        for t in texts:
+            # 입력 문자열로 시드를 고정한 단위 벡터 (같은 입력 -> 같은 벡터)
+            rng = random.Random(hashlib.sha256(str(t).encode("utf-8")).digest())
+            v = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+            n = math.sqrt(sum(x * x for x in v)) or 1.0
+            vectors.append([x / n for x in v])
+        return _embedding_response(vectors, model, sum(estimate_tokens(str(t)) for t in texts))
+
+
+class FakeOpenAI:
+    """
+    OpenAI 클라이언트 대역: chat.completions.create / embeddings.create 만 구현.
+    네트워크 없이 설정된 지연 분포만큼 대기하고, 오류율에 따라 FakeLLMError를 던진다.
+    """
+
+    def __init__(self, latency: Optional[str] = None, error_rate: Optional[float] = None,
+                 canned: Optional[Dict[str, Any]] = None, seed: Optional[int] = None):
+        env = os.environ
+        self._latency = parse_latency(latency or env.get("MASIL_FAKE_LATENCY", "fixed:0"))
+        self.error_rate = float(error_rate if error_rate is not None else env.get("MASIL_FAKE_ERROR_RATE", 0))
+        if canned is None and env.get("MASIL_FAKE_CANNED"):
+            with open(env["MASIL_FAKE_CANNED"], "r", encoding="utf-8") as f:
+                canned = json.load(f)
+        self.canned: Dict[str, Any] = canned or {}
+        seed = seed if seed is not None else env.get("MASIL_FAKE_SEED")
+        self._rng = random.Random(int(seed) if seed is not None else None)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=_FakeChatCompletions(self))
+        self.embeddings = _FakeEmbeddings(self)
+
+    def _sleep_and_maybe_fail(self, timeout: Optional[float] = None) -> None:
+        with self._lock:  # 난수 순서를 스레드 간에도 재현 가능하게
+            delay_ms = self._latency(self._rng)
+            fail = self._rng.random() < self.error_rate
+        if timeout and delay_ms > timeout * 1000:
+            time.sleep(timeout)
+            raise FakeLLMTimeout(f"fake backend: request timed out after {timeout}s")
+        if delay_ms > 0:
+            time.sleep(delay_ms / 1000.0)
+        if fail:
+            raise FakeLLMError("fake backend: injected error")
+
+    def _canned_for(self, text: str) -> Optional[Any]:
+        for needle, obj in self.canned.items():
+            if needle != "*" and needle in text:
+                return obj
+        return self.canned.get("*")
+
+
+# ---------------- record / replay ----------------
+def _chat_key(kwargs: Dict[str, Any]) -> str:
+    return make_key("chat", kwargs.get("model"), kwargs.get("messages"),
+                    kwargs.get("response_format"), kwargs.get("temperature"))
+
+
+def _embed_key(kwargs: Dict[str, Any]) -> str:
+    return make_key("embeddings", kwargs.get("model"), kwargs.get("input"))
+
+
+class _RecordingEndpoint:
+    def __init__(self, owner: "RecordingClient", inner_create: Callable, kind: str):
+        self._owner, self._inner_create, self._kind = owner, inner_create, kind
+
+    def create(self, **kwargs):
+        start = time.time()
+        resp = self._inner_create(**kwargs)
+        latency_ms = int((time.time() - start) * 1000)
+        usage = getattr(resp, "usage", None)
+        rec = {
+            "kind": self._kind,
+            "latency_ms": latency_ms,
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        }
+        if self._kind == "chat":
+            rec["key"] = _chat_key(kwargs)
+            rec["content"] = resp.choices[0].message.content
+        else:
+            rec["key"] = _embed_key(kwargs)
+            rec["embeddings"] = [d.embedding for d in resp.data]
+        self._owner._append(rec)
+        return resp
+
+
+class RecordingClient:
+    """실제 클라이언트를 감싸 요청 키/응답/지연을 JSONL 테이프에 덧붙여 기록."""
+
+    def __init__(self, inner: Any, tape_path: str, lock: Optional[threading.Lock] = None):
+        self._inner = inner
+        self._tape_path = tape_path
+        self._lock = lock or threading.Lock()
+        self.chat = SimpleNamespace(completions=_RecordingEndpoint(self, inner.chat.completions.create, "chat"))
+        self.embeddings = _RecordingEndpoint(self, inner.embeddings.create, "embeddings")
+
+    def with_options(self, **kwargs) -> "RecordingClient":
+        """openai 클라이언트의 with_options와 같음 (같은 테이프/락에 기록). 감싼 클라이언트에 없으면 자신."""
+        if not hasattr(self._inner, "with_options"):
+            return self
+        return RecordingClient(self._inner.with_options(**kwargs), self._tape_path, self._lock)
+
+    def _append(self, rec: Dict[str, Any]) -> None:
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock, open(self._tape_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+class _ReplayEndpoint:
+    def __init__(self, owner: "ReplayClient", kind: str):
+        self._owner, self._kind = owner, kind
+
+    def create(self, **kwargs):
+        o = self._owner
+        key = _chat_key(kwargs) if self._kind == "chat" else _embed_key(kwargs)
+        rec = o.tape.get(key)
+        if rec is None:
+            if o.fallback is None:
+                raise KeyError(f"replay: no recorded response for {self._kind} request {key[:12]}")
+            target = o.fallback.chat.completions if self._kind == "chat" else o.fallback.embeddings
+            return target.create(**kwargs)
+        if o.replay_latency:
+            time.sleep(rec.get("latency_ms", 0) / 1000.0)
+        model = kwargs.get("model", "replay")
+        if self._kind == "chat":
+            return _chat_response(rec["content"], rec.get("prompt_tokens", 0), rec.get("completion_tokens", 0), model)
+        return _embedding_response(rec["embeddings"], model, rec.get("prompt_tokens", 0))
+
+
+class ReplayClient:
+    """record 테이프를 읽어 같은 요청에 같은 응답을 돌려주는 클라이언트 (같은 키가 여러 번이면 마지막 기록)."""
+
+    def __init__(self, tape_path: str, replay_latency: bool = False, fallback: Any = None):
+        self.tape: Dict[str, Dict[str, Any]] = {}
+        with open(tape_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    rec = json.loads(line)
+                    self.tape[rec["key"]] = rec
+        self.replay_latency = replay_latency
+        self.fallback = fallback
+        self.chat = SimpleNamespace(completions=_ReplayEndpoint(self, "chat"))
+        self.embeddings = _ReplayEndpoint(self, "embeddings")
+
+
+# ---------------- 공급자 ----------------
+def make_client(backend: Optional[str] = None) -> Any:
+    """MASIL_LLM_BACKEND(또는 backend 인자)에 맞는 클라이언트 생성."""
+    backend = (backend or os.getenv("MASIL_LLM_BACKEND") or "openai").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"MASIL_LLM_BACKEND must be one of {BACKENDS}, got {backend!r}")
+    if backend == "fake":
+        return FakeOpenAI()
+    tape = os.getenv("MASIL_LLM_TAPE", "llm_tape.jsonl")
+    if backend == "replay":
+        fallback = FakeOpenAI() if os.getenv("MASIL_REPLAY_MISS") == "fake" else None
+        return ReplayClient(tape, replay_latency=os.getenv("MASIL_REPLAY_LATENCY") == "recorded",
+                            fallback=fallback)
+    from openai import OpenAI
+    client = OpenAI()  # 환경변수 OPENAI_API_KEY 사용
+    if backend == "record":
+        return RecordingClient(client, tape)
+    return client
+
+
+def without_retries(client: Any) -> Any:
+    """
+    SDK 자동 재시도(openai 기본 max_retries=2)를 끈 클라이언트. 시간 제한/마감이 걸린 호출에 쓴다
+    (재시도하면 한 호출이 timeout의 약 3배 + 백오프까지 늘어난다). fake/replay는 재시도하지 않아 그대로 반환.
+    만든 클라이언트는 원래 클라이언트에 붙여 두고 재사용한다.
+    """
+    with_options = getattr(client, "with_options", None)
+    if with_options is None:
+        return client
+    cached = getattr(client, "_masil_no_retry", None)
+    if cached is None:
+        cached = with_options(max_retries=0)
+        try:
+            client._masil_no_retry = cached
+        except AttributeError:
+            pass
+    return cached
+
+
+_shared_client: Any = None
+_shared_lock = threading.Lock()
+
+
+def shared_client() -> Any:
+    """
+    프로세스 공용 클라이언트. 첫 호출 때 make_client()로 만들고 이후 재사용한다
+    (import 시점에 openai를 불러오지 않고, Producer/Consumer가 같은 HTTP 연결 풀을 쓴다).
+    """
+    global _shared_client
+    if _shared_client is None:
+        with _shared_lock:
+            if _shared_client is None:
+                _shared_client = make_client()
+    return _shared_client
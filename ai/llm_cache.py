@@ -0,0 +1,130 @@
+# llm_cache.py
+# LLM 결과 영속 캐시 (SQLite, 내용 주소 기반 키)
+# - 같은 입력(+모델)이면 같은 키 → 이전 LLM 결과 재사용
+# - TTL: 생성 후 ttl_sec 가 지난 항목은 미스로 취급하고 삭제
+# - LRU: 항목 수가 max_entries 를 넘으면 가장 오래 조회되지 않은 항목부터 삭제
+# 사용 예:
+#   cache = LLMCache(".cache/masil_llm.sqlite", table="enrich", ttl_sec=30*86400, max_entries=50000)
+#   key = make_key("enrich", model, title, description)
+#   hit = cache.get(key)        # 없으면 None
+#   cache.put(key, {"desc": ...})
+
+import os, json, time, sqlite3, hashlib, threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DEFAULT_TTL_SEC = 30 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 50000
+
+
+def make_key(*parts: Any) -> str:
+    """입력 조각들을 정규화(JSON, 키 정렬)한 뒤 sha256 해시로 캐시 키 생성."""
+    raw = json.dumps(parts, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """
+    key(str) -> JSON 직렬화 가능한 값 을 저장하는 SQLite 캐시.
+    스레드 풀(동시 배치)에서 같이 써도 되도록 연결 하나를 락으로 보호한다.
+    hits/misses 는 이 인스턴스가 만들어진 뒤의 누적 카운터.
+    """
+
+    def __init__(self, path: str, table: str = "cache",
+                 ttl_sec: Optional[float] = DEFAULT_TTL_SEC,
+                 max_entries: Optional[int] = DEFAULT_MAX_ENTRIES):
+        if not table.isidentifier():
+            raise ValueError(f"invalid table name: {table!r}")
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self.path = path
+        self.table = table
+        self.ttl_sec = ttl_sec
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)")
+        self._conn.commit()
+
+    # ---------------- 조회 ----------------
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """있는 키만 담은 dict 반환. 만료 항목은 삭제 후 미스로 센다."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        now = time.time()
+        found: Dict[str, Any] = {}
+        expired = []
+        with self._lock:
+            for i in range(0, len(keys), 500):  # SQLite 변수 개수 제한 회피
+                part = keys[i:i+500]
+                q = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM {self.table} WHERE key IN ({q})", part
+                ).fetchall()
+                for k, v, created_at in rows:
+                    if self.ttl_sec is not None and now - created_at > self.ttl_sec:
+                        expired.append(k)
+                        continue
+                    try:
+                        found[k] = json.loads(v)
+                    except ValueError:
+                        expired.append(k)
+            if expired:
+                self._conn.executemany(f"DELETE FROM {self.table} WHERE key = ?", [(k,) for k in expired])
+            if found:
+                self._conn.executemany(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                                       [(now, k) for k in found])
+            self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    # ---------------- 저장 ----------------
+    def put(self, key: str, value: Any) -> None:
+        self.put_many([(key, value)])
+
+    def put_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        now = time.time()
+        rows = [(k, json.dumps(v, ensure_ascii=False), now, now) for k, v in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """max_entries 초과분을 accessed_at 오래된 순으로 삭제 (락 안에서 호출)."""
+        if not self.max_entries:
+            return
+        (n,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        over = n - self.max_entries
+        if over > 0:
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN "
+                f"(SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)", (over,)
+            )
+
+    # ---------------- 기타 ----------------
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -12,18 +12,46 @@ Orchestrator 실행 옵션
 --skip-producer              : Producer 단계 건너뜀 (ai_1_output.json이 이미 있을 경우)
 --skip-consumer              : Consumer 단계 건너뜀
 --no-keep                    : Consumer 실행 후 중간 산출물(p_out) 삭제
+--llm-backend <name>         : LLM 백엔드 openai|fake|record|replay (MASIL_LLM_BACKEND, llm_backend.py 참고)
+--llm-tape <path>            : record/replay 테이프(JSONL) 경로 (MASIL_LLM_TAPE)
+--metrics <path>             : 두 단계의 LLM 호출 계측을 합쳐 저장 (.prom/.txt=Prometheus 텍스트, 그 외 JSON)
+--trace <path>               : 단계/LLM 배치/점수 계산/검증 재시도/폴백/입출력 구간을 Chrome trace JSON으로 저장
+                               (하위 프로세스 기록을 합침. --spool 모드는 미지원)
+--inproc                     : 하위 프로세스 없이 한 프로세스에서 실행 (모듈 import, 클라이언트/연결 풀 공유,
+                               중간 산출물은 --p-out을 줄 때만 저장)
+--pipeline                   : 한 프로세스에서 Producer가 보강한 후보를 큐로 바로 Consumer에 넘겨 두 단계를 겹쳐 실행
+                               (explain meta.pipeline.e2e_wall_ms, 한쪽이 실패하면 다른 쪽도 중단)
+--pipeline-queue <int>       : --pipeline 단계 사이 큐 크기(후보 수, 기본 8). 차면 Producer가 기다림
+
+[스풀(일괄/상주) 옵션]
+--spool <dir>                : 디렉터리의 factpack(*.json)을 프로세스 풀로 일괄 처리 (-i 대신, spool.py 참고)
+--spool-out <dir>            : 결과 디렉터리 (기본: <spool>/out, 파일명 <이름>.explain.json)
+--workers <int>              : 워커 프로세스 수 (기본 2). 워커는 모듈/클라이언트/캐시를 한 번만 만들어 재사용
+--watch                      : 처리 후에도 새 파일을 계속 기다림 (Ctrl-C로 종료)
+--poll-sec <sec>             : --watch 디렉터리 확인 주기 (기본 2초)
+--spool-keep-producer        : Producer 결과도 <이름>.ai_1_output.json으로 저장
 
 [Producer 옵션]
 --p-script <path>           : Producer 스크립트 경로 (기본: ai_1_producer.py)
---p-out <path>              : Producer 출력 파일 경로 (기본: ai_1_output.json)
+--p-out <path>              : Producer 출력 파일 경로 (기본: ai_1_output.json, --inproc에서는 지정 시에만 저장)
 --p-top-k <int>              : Producer 단계에서 후보를 상위 K개로 축약
 --p-model <str>              : Producer 전용 모델(OPENAI_MODEL 환경변수 override)
-# (ai_1_producer.py에서 batch_size 등을 지원한다면 여기에 --p-batch-size 추가 가능)
+--p-batch-size <int>         : Producer LLM 배치 크기
+--p-concurrency <int>        : Producer가 동시에 보낼 LLM 배치 수 (1=순차)
+--p-batch-timeout <sec>      : Producer 배치별 LLM 요청 타임아웃(초)
+--p-cache-db <path>          : Producer 보강 결과 SQLite 캐시 경로 (미지정 시 캐시 미사용)
 
 [Consumer 옵션]
 --c-script <path>           : Consumer 스크립트 경로 (기본: ai_2_consumer.py)
 --c-out <path>              : Consumer 출력 파일 경로 (기본: explain.json)
 --c-model <str>              : Consumer 전용 모델(OPENAI_MODEL 환경변수 override)
+--c-concurrency <int>        : Consumer가 동시에 처리할 후보 수 (1=순차, 결과 순서는 유지)
+--c-timeout <sec>            : Consumer 후보 1건당 LLM 시간 제한(초, 재시도 포함)
+--c-explain-batch-size <int> : Consumer가 한 번의 LLM 요청으로 설명할 후보 수 (1=후보별 요청)
+--c-cache-db <path>          : Consumer 설명 결과 SQLite 캐시 경로 (미지정 시 캐시 미사용)
+--c-inject-scores            : Consumer score_breakdown을 LLM 대신 후보 값으로 채움 (수치 불일치 재시도 제거)
+--c-deadline-ms <int>        : Consumer 전체 마감(ms). 마감까지 못 끝낸 후보는 템플릿 설명으로 채움
+--c-compact-prompt           : Consumer 프롬프트에 필요한 필드만 짧은 키로 넣음 (토큰 절감, bench_prompt.py 참고)
 
 [사용 예시]
 1) 기본 실행:
@@ -35,15 +63,50 @@ Orchestrator 실행 옵션
 3) Producer와 Consumer 모델 다르게 지정:
    python orchestrator.py --p-model gpt-4o-mini --c-model gpt-4o
 
+3-1) Producer 배치를 4개씩 동시에 전송 (배치당 30초 제한):
+   python orchestrator.py --p-top-k 20 --p-batch-size 5 --p-concurrency 4 --p-batch-timeout 30
+
+3-2) Consumer 후보 설명을 4개씩 동시에 생성 (후보당 20초 제한):
+   python orchestrator.py -k 10 --c-concurrency 4 --c-timeout 20
+
+3-3) Consumer 후보 5개씩 한 요청으로 설명 (user/지시문 중복 제거):
+   python orchestrator.py -k 10 --c-explain-batch-size 5
+
 4) Producer 건너뛰고 Consumer만 실행:
    python orchestrator.py --skip-producer -k 5 --c-out explain.json
 
 5) 실행 후 중간 산출물 삭제:
    python orchestrator.py --no-keep
+
+6) 네트워크 없이 파이프라인 자체 오버헤드 측정 (fake LLM, 호출당 200~400ms):
+   MASIL_FAKE_LATENCY=uniform:200,400 python orchestrator.py --llm-backend fake
+
+7) 실제 응답을 기록해 두고 이후 재생:
+   python orchestrator.py --llm-backend record --llm-tape tape.jsonl
+   python orchestrator.py --llm-backend replay --llm-tape tape.jsonl
+
+8) 호출 지연 p50/p95/p99·토큰·재시도 계측 (용량 산정용):
+   python orchestrator.py --metrics metrics.prom
+
+9) 한 프로세스에서 실행 (인터프리터 기동/중간 JSON 직렬화 생략, 작은 K에서 유리):
+   python orchestrator.py --inproc -k 3
+   python orchestrator.py --inproc --p-out ai_1_output.json   # 중간 산출물도 남길 때
+
+10) Producer/Consumer 겹쳐 실행 (종단 시간 ≈ max(Producer, Consumer)):
+   python orchestrator.py --pipeline --p-top-k 20 --p-batch-size 5 --p-concurrency 2 -k 20 --c-concurrency 4
+
+11) 스풀 디렉터리 일괄 처리 (워커 4개, 이미 최신 결과가 있는 입력은 건너뜀) / 상주 모드:
+   python orchestrator.py --spool spool/in --spool-out spool/out --workers 4
+   python orchestrator.py --spool spool/in --workers 4 --watch --pipeline
+
+12) 실행 구간 트레이스 (chrome://tracing 또는 https://ui.perfetto.dev 에서 trace.json 열기):
+   python orchestrator.py --trace trace.json
 """
 
-import argparse, os, sys, time, shlex, subprocess
+import argparse, os, sys, json, time, shlex, subprocess
 from pathlib import Path
+from telemetry import Telemetry, load_metrics, TELEMETRY
+from tracing import TRACER, load_trace
 
 def run(cmd, env=None):
     print(f"\n$ {shlex.join(cmd)}")
@@ -53,6 +116,163 @@ def run(cmd, env=None):
     print(f"↳ exit={proc.returncode} ({dur:.2f}s)")
     if proc.returncode != 0:
         sys.exit(proc.returncode)
+    return dur
+
+def run_inproc_stage(name, fn, *args, **kwargs):
+    """run()의 한 프로세스 버전: 함수를 실행하고 단계 소요 시간을 같은 형식으로 출력. 반환: (결과, 초)"""
+    print(f"\n$ [inproc] {name}")
+    start = time.time()
+    try:
+        with TRACER.span(f"stage.{name.split()[0]}", cat="orchestrator"):
+            result = fn(*args, **kwargs)
+    except Exception as e:
+        print(f"↳ error={e!r} ({time.time() - start:.2f}s)")
+        sys.exit(1)
+    dur = time.time() - start
+    print(f"↳ ok ({dur:.2f}s)")
+    return result, dur
+
+def load_stages(args):
+    """--inproc/--pipeline: Producer/Consumer 모듈 import, 클라이언트(HTTP 연결 풀) 공유, 단계별 모델 지정"""
+    import AI_1_producer as producer
+    import AI_2_consumer as consumer
+
+    # 두 모듈 모두 llm_backend.shared_client()를 첫 호출 때 만들어 같이 쓴다 (연결 풀 하나)
+    if args.p_model:
+        producer.MODEL = args.p_model
+    if args.c_model:
+        consumer.MODEL = args.c_model
+    return producer, consumer
+
+def producer_options(args):
+    """Producer CLI 기본값과 같은 보강 옵션 (cache/his_store는 호출 측에서 추가)"""
+    return dict(top_k=args.p_top_k, batch_size=args.p_batch_size or 5, concurrency=args.p_concurrency or 1,
+                batch_timeout=args.p_batch_timeout)
+
+def consumer_options(args):
+    """Consumer CLI 기본값과 같은 설명 옵션 (cache는 호출 측에서 추가)"""
+    return dict(top_k=args.top_k, concurrency=args.c_concurrency or 1, candidate_timeout=args.c_timeout,
+                explain_batch_size=args.c_explain_batch_size or 1, inject_scores=args.c_inject_scores,
+                deadline_ms=args.c_deadline_ms, compact_prompt=args.c_compact_prompt)
+
+def open_caches(args):
+    """(Producer 보강 캐시, 작업 이력 요약 캐시, Consumer 설명 캐시) — 지정 안 된 것은 None"""
+    from llm_cache import LLMCache
+    p_cache = his_store = c_cache = None
+    if args.p_cache_db:
+        p_cache = LLMCache(args.p_cache_db, table="enrich")
+        his_store = LLMCache(args.p_cache_db, table="his_short")
+    if args.c_cache_db:
+        c_cache = LLMCache(args.c_cache_db, table="explain")
+    return p_cache, his_store, c_cache
+
+def write_json(path, obj):
+    with TRACER.span("io.write", cat="io", path=str(path)), open(path, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+
+def run_inproc(args, in_path, p_out, c_out, telemetry):
+    """
+    Producer/Consumer를 모듈로 import해 한 프로세스에서 실행 (--inproc).
+    Producer 결과 dict를 그대로 Consumer에 넘기고, LLM 클라이언트(HTTP 연결 풀)는 하나를 같이 쓴다.
+    p_out은 --p-out을 준 경우(또는 Consumer를 건너뛰는 경우)에만 쓴다. 반환: p_out을 썼는지 여부
+    """
+    producer, consumer = load_stages(args)
+    p_cache, his_store, c_cache = open_caches(args)
+    try:
+        enriched, wrote_p_out = None, False
+        if not args.skip_producer:
+            if not in_path.exists():
+                sys.exit(f"❌ 입력 파일 없음: {in_path}")
+            with TRACER.span("io.read", cat="io", path=str(in_path)), open(in_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            enriched, dur = run_inproc_stage("producer", producer.enrich_factpack_with_llm, data,
+                                             cache=p_cache, his_store=his_store, **producer_options(args))
+            telemetry.stage("producer", dur)
+            if args.p_out or args.skip_consumer:
+                write_json(p_out, enriched)
+                wrote_p_out = True
+        else:
+            print("⏭️  Producer 단계 건너뜀 (--skip-producer)")
+            if not p_out.exists():
+                sys.exit(f"❌ Producer 출력이 존재하지 않습니다: {p_out}")
+            enriched = consumer.load_factpack(str(p_out))
+
+        if not args.skip_consumer:
+            output, dur = run_inproc_stage("consumer", consumer.consumer_pipeline, enriched,
+                                           cache=c_cache, **consumer_options(args))
+            telemetry.stage("consumer", dur)
+            write_json(c_out, output)
+        else:
+            print("⏭️  Consumer 단계 건너뜀 (--skip-consumer)")
+    finally:
+        for c in (p_cache, his_store, c_cache):
+            if c is not None:
+                c.close()
+
+    telemetry.merge(TELEMETRY.to_dict())
+    return wrote_p_out
+
+def run_pipeline(args, in_path, p_out, c_out, telemetry):
+    """
+    --pipeline: 한 프로세스에서 Producer가 보강한 후보를 제한 크기 큐로 바로 Consumer에 넘겨 두 단계를 겹쳐 실행.
+    explain meta.pipeline에 종단 시간(e2e_wall_ms) 기록. 반환: p_out을 썼는지 여부
+    """
+    from pipeline import run_pipelined
+
+    if args.skip_producer or args.skip_consumer:
+        sys.exit("❌ --pipeline은 --skip-producer/--skip-consumer와 같이 쓸 수 없습니다 (--inproc 사용)")
+    if not in_path.exists():
+        sys.exit(f"❌ 입력 파일 없음: {in_path}")
+    producer, consumer = load_stages(args)
+    with TRACER.span("io.read", cat="io", path=str(in_path)), open(in_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    p_cache, his_store, c_cache = open_caches(args)
+    try:
+        (enriched, output, timings), dur = run_inproc_stage(
+            f"pipeline (queue={args.pipeline_queue})", run_pipelined, producer, consumer, data,
+            p_opts=dict(producer_options(args), cache=p_cache, his_store=his_store),
+            c_opts=dict(consumer_options(args), cache=c_cache), queue_size=args.pipeline_queue)
+    finally:
+        for c in (p_cache, his_store, c_cache):
+            if c is not None:
+                c.close()
+    print(f"   producer {timings.get('producer_ms', 0) / 1000:.2f}s, consumer {timings.get('consumer_ms', 0) / 1000:.2f}s"
+          f" (겹쳐 실행)")
+    # 단계별 시간은 겹치므로 합이 종단 시간보다 크다
+    telemetry.stage("producer", timings.get("producer_ms", 0) / 1000)
+    telemetry.stage("consumer", timings.get("consumer_ms", 0) / 1000)
+    telemetry.stage("pipeline", dur)
+    write_json(c_out, output)
+    if args.p_out:
+        write_json(p_out, enriched)
+    telemetry.merge(TELEMETRY.to_dict())
+    return bool(args.p_out)
+
+def run_spool_mode(args, telemetry):
+    """--spool: 디렉터리의 factpack을 워커 프로세스 풀로 처리하고 처리량 요약 출력"""
+    from spool import run_spool
+
+    spool_dir = Path(args.spool)
+    if not spool_dir.is_dir():
+        sys.exit(f"❌ 스풀 디렉터리 없음: {spool_dir}")
+    out_dir = Path(args.spool_out or spool_dir / "out")
+    worker_opts = {
+        "p_opts": producer_options(args), "c_opts": consumer_options(args),
+        "p_model": args.p_model, "c_model": args.c_model,
+        "p_cache_db": args.p_cache_db, "c_cache_db": args.c_cache_db,
+        "pipeline": args.pipeline, "queue_size": args.pipeline_queue,
+        "keep_producer": args.spool_keep_producer,
+    }
+    print(f"\n$ [spool] {spool_dir} → {out_dir} (workers={args.workers}{', watch' if args.watch else ''})")
+    summary = run_spool(str(spool_dir), str(out_dir), worker_opts, workers=args.workers, watch=args.watch,
+                        poll_sec=args.poll_sec, telemetry=telemetry if args.metrics else None)
+    print("\n📊 처리량 요약")
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    if args.metrics:
+        telemetry.write(args.metrics)
+        print(f"📈 계측 저장: {args.metrics}")
+    if summary["failed"]:
+        sys.exit(1)
 
 def main():
     ap = argparse.ArgumentParser(description=(
@@ -62,11 +282,21 @@ def main():
             "  -k, --top_k   : Consumer 단계에서 처리할 Top-K\n"
             "  --skip-producer : Producer 단계 건너뜀\n"
             "  --skip-consumer : Consumer 단계 건너뜀\n"
-            "  --no-keep       : 중간 산출물 삭제\n\n"
+            "  --no-keep       : 중간 산출물 삭제\n"
+            "  --llm-backend, --llm-tape : LLM 백엔드(openai|fake|record|replay)/테이프 경로\n"
+            "  --metrics       : LLM 호출 계측 저장 (.prom/.txt 또는 JSON)\n"
+            "  --trace         : 구간 기록 저장 (Chrome trace JSON, --spool과 함께 쓸 수 없음)\n"
+            "  --inproc        : 한 프로세스에서 실행 (클라이언트 공유, 중간 파일은 --p-out 지정 시에만)\n"
+            "  --pipeline, --pipeline-queue : 한 프로세스에서 두 단계를 큐로 이어 겹쳐 실행\n"
+            "  --spool, --spool-out, --workers, --watch, --poll-sec, --spool-keep-producer\n"
+            "                  : 스풀 디렉터리 factpack을 프로세스 풀로 일괄/상주 처리\n\n"
             "[Producer]\n"
-            "  --p-script, --p-out, --p-top-k, --p-model\n"
+            "  --p-script, --p-out, --p-top-k, --p-model,\n"
+            "  --p-batch-size, --p-concurrency, --p-batch-timeout, --p-cache-db\n"
             "[Consumer]\n"
-            "  --c-script, --c-out, --c-model\n"
+            "  --c-script, --c-out, --c-model, --c-concurrency, --c-timeout,\n"
+            "  --c-explain-batch-size, --c-cache-db, --c-inject-scores, --c-deadline-ms,\n"
+            "  --c-compact-prompt\n"
         ),
         formatter_class=argparse.RawTextHelpFormatter
     )
@@ -77,26 +307,98 @@ def main():
     ap.add_argument("--skip-producer", action="store_true", help="Producer 단계 건너뛰기 (이미 ai_1_output.json이 있을 때)")
     ap.add_argument("--skip-consumer", action="store_true", help="Consumer 단계 건너뛰기")
     ap.add_argument("--no-keep", action="store_true", help="중간 산출물(p_out) 삭제")
+    ap.add_argument("--llm-backend", choices=["openai", "fake", "record", "replay"], default=None,
+                    help="LLM 백엔드 (MASIL_LLM_BACKEND override)")
+    ap.add_argument("--llm-tape", default=None, help="record/replay 테이프 경로 (MASIL_LLM_TAPE override)")
+    ap.add_argument("--metrics", default=None,
+                    help="두 단계 LLM 호출 계측을 합쳐 저장 (.prom/.txt=Prometheus 텍스트, 그 외 JSON)")
+    ap.add_argument("--trace", default=None,
+                    help="단계/LLM 호출/점수 계산/검증/입출력 구간을 Chrome trace JSON으로 저장 (하위 프로세스 기록 합침, --spool 미지원)")
+    ap.add_argument("--inproc", action="store_true",
+                    help="하위 프로세스 없이 한 프로세스에서 실행 (클라이언트 공유, 중간 파일은 --p-out 지정 시에만)")
+    ap.add_argument("--pipeline", action="store_true",
+                    help="한 프로세스에서 Producer 보강 결과를 큐로 바로 Consumer에 넘겨 두 단계를 겹쳐 실행")
+    ap.add_argument("--pipeline-queue", type=int, default=8,
+                    help="--pipeline 단계 사이 큐 크기(후보 수). 차면 Producer가 기다림")
+    ap.add_argument("--spool", default=None, help="factpack(*.json) 디렉터리를 프로세스 풀로 일괄 처리")
+    ap.add_argument("--spool-out", default=None, help="스풀 결과 디렉터리 (기본: <spool>/out)")
+    ap.add_argument("--workers", type=int, default=2, help="스풀 워커 프로세스 수")
+    ap.add_argument("--watch", action="store_true", help="스풀 디렉터리를 계속 감시 (Ctrl-C로 종료)")
+    ap.add_argument("--poll-sec", type=float, default=2.0, help="--watch 디렉터리 확인 주기(초)")
+    ap.add_argument("--spool-keep-producer", action="store_true",
+                    help="스풀 처리 시 Producer 결과도 <이름>.ai_1_output.json으로 저장")
 
     # Producer 옵션
     ap.add_argument("--p-script", default="ai_1_producer.py", help="Producer 스크립트 경로")
-    ap.add_argument("--p-out", default="ai_1_output.json", help="Producer 출력(JSON)")
+    ap.add_argument("--p-out", default=None, help="Producer 출력(JSON, 기본 ai_1_output.json)")
     ap.add_argument("--p-top-k", type=int, default=3, help="Producer가 후보를 상위 K로 축약할 때 사용")
     ap.add_argument("--p-model", default=None, help="Producer 전용 모델(OPENAI_MODEL override)")
-    # 필요 시: ap.add_argument("--p-batch-size", type=int, help="Producer 배치 크기(스크립트가 지원할 때만 전달)")
+    ap.add_argument("--p-batch-size", type=int, default=None, help="Producer LLM 배치 크기")
+    ap.add_argument("--p-concurrency", type=int, default=None, help="Producer가 동시에 보낼 LLM 배치 수 (1=순차)")
+    ap.add_argument("--p-batch-timeout", type=float, default=None, help="Producer 배치별 LLM 요청 타임아웃(초)")
+    ap.add_argument("--p-cache-db", default=None, help="Producer 보강 결과 SQLite 캐시 경로")
 
     # Consumer 옵션
     ap.add_argument("--c-script", default="ai_2_consumer.py", help="Consumer 스크립트 경로")
     ap.add_argument("--c-out", default="explain.json", help="Consumer 결과(JSON)")
     ap.add_argument("--c-model", default=None, help="Consumer 전용 모델(OPENAI_MODEL override)")
+    ap.add_argument("--c-concurrency", type=int, default=None, help="Consumer가 동시에 처리할 후보 수 (1=순차)")
+    ap.add_argument("--c-timeout", type=float, default=None, help="Consumer 후보 1건당 LLM 시간 제한(초)")
+    ap.add_argument("--c-explain-batch-size", type=int, default=None,
+                    help="Consumer가 한 번의 LLM 요청으로 설명할 후보 수 (1=후보별 요청)")
+    ap.add_argument("--c-cache-db", default=None, help="Consumer 설명 결과 SQLite 캐시 경로")
+    ap.add_argument("--c-inject-scores", action="store_true",
+                    help="Consumer score_breakdown을 LLM 대신 후보 값으로 채움")
+    ap.add_argument("--c-deadline-ms", type=int, default=None,
+                    help="Consumer 전체 마감(ms). 마감까지 못 끝낸 후보는 템플릿 설명")
+    ap.add_argument("--c-compact-prompt", action="store_true",
+                    help="Consumer 프롬프트에 필요한 필드만 짧은 키로 넣음 (토큰 절감)")
 
     args = ap.parse_args()
 
+    # 두 단계 모두에 적용할 LLM 백엔드 설정
+    if args.llm_backend:
+        os.environ["MASIL_LLM_BACKEND"] = args.llm_backend
+    if args.llm_tape:
+        os.environ["MASIL_LLM_TAPE"] = args.llm_tape
+
     # 경로 정규화
     in_path = Path(args.input)
-    p_out = Path(args.p_out)
+    p_out = Path(args.p_out or "ai_1_output.json")
     c_out = Path(args.c_out)
 
+    # 단계별 계측은 임시 JSON(원시 호출 기록 포함)으로 받아 마지막에 합침
+    stage_metrics = {}
+    if args.metrics:
+        stage_metrics = {name: Path(f"{args.metrics}.{name}.json") for name in ("producer", "consumer")}
+    telemetry = Telemetry()
+    # 구간 기록: 하위 프로세스는 각자 파일로 쓰고 마지막에 합침 (in-process 모드는 TRACER 하나에 모두 기록)
+    stage_traces = {}
+    if args.trace and args.spool:
+        # 스풀 워커는 별도 프로세스라 구간이 기록되지 않음 → 빈 트레이스를 쓰지 않고 거부
+        sys.exit("❌ --trace는 --spool 모드를 지원하지 않습니다 (워커 트레이스를 합치지 않음)")
+    if args.trace:
+        TRACER.enable("orchestrator")
+        stage_traces = {name: Path(f"{args.trace}.{name}.json") for name in ("producer", "consumer")}
+
+    if args.spool:
+        run_spool_mode(args, telemetry)
+        return
+
+    if args.inproc or args.pipeline:
+        wrote_p_out = (run_pipeline if args.pipeline else run_inproc)(args, in_path, p_out, c_out, telemetry)
+        if args.no_keep and wrote_p_out:
+            p_out.unlink()
+            print(f"🧹 중간 산출물 삭제: {p_out}")
+        if args.metrics:
+            telemetry.write(args.metrics)
+            print(f"📈 계측 저장: {args.metrics}")
+        if args.trace:
+            TRACER.write(args.trace)
+            print(f"🧭 트레이스 저장: {args.trace}")
+        print(f"\n✅ 파이프라인 완료 → {c_out.resolve()}")
+        return
+
     # Producer 실행
     if not args.skip_producer:
         if not in_path.exists():
@@ -110,11 +412,22 @@ def main():
             "-o", str(p_out),
             "-k", str(args.p_top_k),
         ]
-        # 스크립트가 지원할 때만 주석 해제해서 전달
-        # if args.p_batch_size:
-        #     cmd_prod += ["--batch_size", str(args.p_batch_size)]
+        if args.p_batch_size:
+            cmd_prod += ["--batch_size", str(args.p_batch_size)]
+        if args.p_concurrency:
+            cmd_prod += ["--concurrency", str(args.p_concurrency)]
+        if args.p_batch_timeout:
+            cmd_prod += ["--batch_timeout", str(args.p_batch_timeout)]
+        if args.p_cache_db:
+            cmd_prod += ["--cache_db", args.p_cache_db]
+        if stage_metrics:
+            cmd_prod += ["--metrics", str(stage_metrics["producer"])]
 
-        run(cmd_prod, env=env_prod)
+        if stage_traces:
+            cmd_prod += ["--trace", str(stage_traces["producer"])]
+        with TRACER.span("stage.producer", cat="orchestrator"):
+            dur = run(cmd_prod, env=env_prod)
+        telemetry.stage("producer", dur)
     else:
         print("⏭️  Producer 단계 건너뜀 (--skip-producer)")
 
@@ -133,7 +446,27 @@ def main():
             "-o", str(c_out),
             "-k", str(args.top_k),
         ]
-        run(cmd_cons, env=env_cons)
+        if args.c_concurrency:
+            cmd_cons += ["--concurrency", str(args.c_concurrency)]
+        if args.c_timeout:
+            cmd_cons += ["--candidate_timeout", str(args.c_timeout)]
+        if args.c_explain_batch_size:
+            cmd_cons += ["--explain_batch_size", str(args.c_explain_batch_size)]
+        if args.c_cache_db:
+            cmd_cons += ["--cache_db", args.c_cache_db]
+        if args.c_inject_scores:
+            cmd_cons += ["--inject_scores"]
+        if args.c_deadline_ms:
+            cmd_cons += ["--deadline_ms", str(args.c_deadline_ms)]
+        if args.c_compact_prompt:
+            cmd_cons += ["--compact_prompt"]
+        if stage_metrics:
+            cmd_cons += ["--metrics", str(stage_metrics["consumer"])]
+        if stage_traces:
+            cmd_cons += ["--trace", str(stage_traces["consumer"])]
+        with TRACER.span("stage.consumer", cat="orchestrator"):
+            dur = run(cmd_cons, env=env_cons)
+        telemetry.stage("consumer", dur)
     else:
         print("⏭️  Consumer 단계 건너뜀 (--skip-consumer)")
 
@@ -145,6 +478,22 @@ def main():
         except Exception as e:
             print(f"⚠️ 중간 산출물 삭제 실패: {e}")
 
+    if args.metrics:
+        for path in stage_metrics.values():
+            if path.exists():
+                telemetry.merge(load_metrics(str(path)))
+                path.unlink()
+        telemetry.write(args.metrics)
+        print(f"📈 계측 저장: {args.metrics}")
+
+    if args.trace:
+        for path in stage_traces.values():
+            if path.exists():
+                TRACER.extend(load_trace(str(path)))
+                path.unlink()
+        TRACER.write(args.trace)
+        print(f"🧭 트레이스 저장: {args.trace} (chrome://tracing 또는 https://ui.perfetto.dev)")
+
     print(f"\n✅ 파이프라인 완료 → {c_out.resolve()}")
 
 if __name__ == "__main__":
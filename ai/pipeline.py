@@ -0,0 +1,153 @@
+# pipeline.py
+# Producer → Consumer 파이프라인 실행 (한 프로세스, 두 LLM 단계를 겹쳐서 실행)
+# - Producer(iter_enrich_stream)는 별도 스레드에서 배치가 끝나는 대로 후보를 제한 크기 큐에 넣고
+#   Consumer(iter_explain_stream)는 큐에서 rank 순서대로 꺼내 바로 설명한다
+# - 큐가 차면 Producer가 기다림(backpressure), 한쪽이 실패하면 다른 쪽도 중단
+# - 종단 시간 ≈ max(Producer, Consumer) + 첫 배치 지연 (순차 실행은 Producer + Consumer)
+# 사용 예:
+#   import AI_1_producer as producer, AI_2_consumer as consumer
+#   fp_out, explain, timings = run_pipelined(producer, consumer, data,
+#                                            p_opts={"top_k": 10, "batch_size": 5},
+#                                            c_opts={"top_k": 5, "concurrency": 4}, queue_size=8)
+
+import queue, threading, time
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+DEFAULT_QUEUE_SIZE = 8
+_DONE = object()
+
+
+class PipelineCancelled(Exception):
+    """다른 단계가 실패해 이 단계를 중단함"""
+
+
+class _ProducerFailed(Exception):
+    def __init__(self, err: BaseException):
+        super().__init__(repr(err))
+        self.err = err
+
+
+def _produce(records: Iterator[Dict[str, Any]], q: "queue.Queue", cancel: threading.Event,
+             timings: Dict[str, float], poll_sec: float = 0.1) -> None:
+    """Producer 스레드: 레코드를 큐에 넣음. 큐가 차면 기다리고, cancel이 서면 생성기를 닫고 종료."""
+    start = time.time()
+    try:
+        for rec in records:
+            while True:
+                if cancel.is_set():
+                    records.close()  # 진행 중 배치를 마무리하고 스레드 풀 정리
+                    return
+                try:
+                    q.put(rec, timeout=poll_sec)
+                    break
+                except queue.Full:
+                    continue
+        q.put(_DONE)
+    except BaseException as e:
+        cancel.set()
+        q.put(_ProducerFailed(e))
+    finally:
+        timings["producer_ms"] = round((time.time() - start) * 1000, 2)
+
+
+def _take(q: "queue.Queue") -> Any:
+    item = q.get()
+    if isinstance(item, _ProducerFailed):
+        raise item.err
+    return item
+
+
+def _ranked_candidates(q: "queue.Queue", state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    큐의 candidate 레코드를 rank 순서대로 내보냄 (Producer는 배치가 끝나는 순서로 넣는다).
+    meta/user_summary와 전체 후보는 state에 모아 Producer 출력(factpack)을 다시 만들 수 있게 한다.
+    """
+    pending: Dict[int, Dict[str, Any]] = {}
+    next_rank = 0
+    while True:
+        rec = _take(q)
+        if rec is _DONE:
+            break
+        if rec.get("type") == "candidate":
+            rank = rec.get("rank", next_rank)
+            state["candidates"][rank] = rec.get("candidate", {})
+            pending[rank] = rec.get("candidate", {})
+            while next_rank in pending:
+                yield pending.pop(next_rank)
+                next_rank += 1
+        elif rec.get("type") == "meta":
+            state["meta"].update(rec.get("meta", {}))
+            if rec.get("user_summary"):
+                state["user_summary"] = rec["user_summary"]
+    for rank in sorted(pending):  # 빠진 rank가 있으면 남은 것을 순서대로
+        yield pending[rank]
+
+
+def run_pipelined(producer: Any, consumer: Any, data: Dict[str, Any],
+                  p_opts: Optional[Dict[str, Any]] = None, c_opts: Optional[Dict[str, Any]] = None,
+                  queue_size: int = DEFAULT_QUEUE_SIZE) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, float]]:
+    """
+    data(Producer 입력 factpack)를 보강하면서 동시에 설명까지 생성.
+    p_opts: iter_enrich_stream 옵션(top_k, batch_size, concurrency, batch_timeout, cache, his_store)
+    c_opts: iter_explain_stream 옵션(top_k, concurrency, explain_batch_size, ...)
+    반환: (Producer 출력 factpack, explain.json dict, 단계 시간 ms {producer_ms, consumer_ms, e2e_ms})
+    explain meta에는 pipeline {queue_size, producer_wall_ms, e2e_wall_ms}가 추가된다.
+    """
+    p_opts = dict(p_opts or {})
+    c_opts = dict(c_opts or {})
+    c_opts.setdefault("progress", False)
+    start = time.time()
+
+    user = data.get("user", {}) or {}
+    cands = data.get("candidates", []) or []
+    # pay_norm은 전체 후보 분포가 필요 → enrich_factpack_with_llm과 같은 인덱스를 먼저 만든다
+    wage_index = p_opts.pop("wage_index", None) or producer.WagePercentileIndex.from_candidates(cands)
+    records = producer.iter_enrich_stream(user, iter(cands), wage_index, meta_in=data.get("meta", {}) or {},
+                                          **p_opts)
+
+    q: "queue.Queue" = queue.Queue(maxsize=max(1, queue_size))
+    cancel = threading.Event()
+    timings: Dict[str, float] = {}
+    worker = threading.Thread(target=_produce, args=(records, q, cancel, timings), name="pipeline-producer",
+                              daemon=True)
+    worker.start()
+
+    state: Dict[str, Any] = {"candidates": {}, "meta": {}}
+    items: Dict[int, Dict[str, Any]] = {}
+    meta: Dict[str, Any] = {}
+    try:
+        first = _take(q)
+        if first is _DONE:
+            raise PipelineCancelled("Producer가 레코드 없이 종료")
+        out_user = first.get("user", {})
+        cand_stream = _ranked_candidates(q, state)
+        factpack = {"user": out_user, "candidates": cand_stream, "meta": state["meta"]}
+        c_start = time.time()
+        for rec in consumer.iter_explain_stream(factpack, **c_opts):
+            if rec["type"] == "item":
+                items[rec["rank"]] = rec["item"]
+            else:
+                meta = rec["meta"]
+        timings["consumer_ms"] = round((time.time() - c_start) * 1000, 2)
+        for _ in cand_stream:  # Consumer top_k가 더 작으면 남은 Producer 결과를 마저 받음
+            pass
+    except BaseException:
+        cancel.set()
+        while worker.is_alive():  # 큐에서 기다리는 Producer를 풀어 줌
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise
+    worker.join()
+
+    timings["e2e_ms"] = round((time.time() - start) * 1000, 2)
+    meta["pipeline"] = {"queue_size": q.maxsize, "producer_wall_ms": int(timings.get("producer_ms", 0)),
+                        "e2e_wall_ms": int(timings["e2e_ms"])}
+    fp_out: Dict[str, Any] = {"user": out_user,
+                              "candidates": [state["candidates"][r] for r in sorted(state["candidates"])],
+                              "meta": state["meta"]}
+    if state.get("user_summary"):
+        fp_out["user_summary"] = state["user_summary"]
+    explain = {"version": "explain.v1.1", "items": [items[r] for r in sorted(items)], "meta": meta}
+    return fp_out, explain, timings
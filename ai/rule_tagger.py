@@ -0,0 +1,139 @@
+# rule_tagger.py
+# 공고 제목/설명 키워드 규칙으로 features를 채우는 빠른 경로 (LLM 앞단)
+# - SYSTEM_PROMPT 태깅 가이드를 그대로 규칙화: "안내/접수/사무"⇒ physical 1–2, "실내/로비"⇒ indoor, 영어⇒ english=true ...
+# - 차원(indoor/physical/interaction/english)별 신뢰도를 가중 평균한 confidence를 함께 반환
+# - confidence가 임계값 이상인 공고만 LLM을 건너뛰고, 나머지는 기존대로 llm_enrich_batch로 보낸다
+# 사용 예:
+#   feats, conf = tag_job("시니어 사서도우미", "도서관 실내에서 도서 정리 및 대출 안내")
+#   # feats = {"indoor": "indoor", "physical": 2, "interaction": 3, "english": False, "warnings": [], "tags": [...]}
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_RULE_THRESHOLD = 0.8
+MAX_TAGS = 6
+
+# 강도별 키워드 (여러 단계가 잡히면 가장 높은 단계 채택)
+PHYSICAL_KEYWORDS = {
+    1: ["안내", "접수", "사무", "앉아서", "상담", "전화", "행정", "사서", "도서", "독서", "강의", "강사", "모니터링", "해설"],
+    2: ["서서", "이동", "정리", "진열", "돌봄", "순찰", "보조", "배식", "급식", "등하교", "교통", "주차", "지원단", "보안관"],
+    3: ["청소", "미화", "환경정비", "세척", "조리", "배달", "분리수거"],
+    4: ["운반", "상하차", "적재", "하역"],
+    5: ["예초", "벌목", "중량물", "건설"],
+}
+INDOOR_KEYWORDS = ["실내", "로비", "사무실", "문화센터", "도서관", "복지관", "경로당", "학교", "교실", "방과후",
+                   "늘봄", "센터", "시설", "사서", "청소년"]
+OUTDOOR_KEYWORDS = ["야외", "행사", "공원", "거리", "순찰", "등하교", "교통", "주차", "환경정비", "예초", "산불",
+                    "하천", "텃밭", "보안관", "캠페인"]
+INTERACTION_KEYWORDS = {
+    3: ["고객응대", "응대", "안내", "상담", "좌석", "안내방송", "민원", "접수", "판매", "해설"],
+    2: ["돌봄", "지도", "교육", "강사", "보조", "말벗", "학생", "아동", "어르신", "노인", "청소년", "보안관"],
+    1: ["청소", "미화", "정리", "운반", "예초", "환경정비", "분리수거", "세척"],
+}
+# 다른 뜻의 합성어에 들어 있는 키워드는 무시 (예: "청소년"의 "청소")
+COMPOUND_EXCLUDE = {"청소": ["청소년"]}
+ENGLISH_RE = re.compile(r"영어|english|외국인|통역", re.IGNORECASE)
+
+# 차원별 가중치 (합 1.0). 키워드가 하나도 안 잡힌 차원은 0점 → 보통 임계값 미만이 되어 LLM으로 간다.
+WEIGHTS = {"indoor": 0.3, "physical": 0.35, "interaction": 0.25, "english": 0.1}
+
+
+def _hits(text: str, words: List[str]) -> List[str]:
+    out = []
+    for w in words:
+        t = text
+        for compound in COMPOUND_EXCLUDE.get(w, ()):
+            t = t.replace(compound, " ")
+        if w in t:
+            out.append(w)
+    return out
+
+
+def _level(text: str, table: Dict[int, List[str]]) -> Tuple[Optional[int], float, List[str]]:
+    """(채택 단계, 신뢰도, 잡힌 키워드). 잡힌 단계 간 차이가 크면 신뢰도를 낮춘다."""
+    found = {lv: _hits(text, words) for lv, words in table.items()}
+    levels = [lv for lv, ws in found.items() if ws]
+    if not levels:
+        return None, 0.0, []
+    spread = max(levels) - min(levels)
+    conf = 1.0 if spread <= 1 else 0.6
+    return max(levels), conf, [w for lv in sorted(levels) for w in found[lv]]
+
+
+def short_desc(description: str, limit: int = 80) -> str:
+    """설명 첫 문장을 limit자 이내로 (LLM desc 대체용)."""
+    text = " ".join((description or "").split())
+    first = re.split(r"(?<=[.!?。])\s|\n", text, maxsplit=1)[0]
+    return first[:limit]
+
+
+def job_org(cand: Dict[str, Any]) -> Optional[str]:
+    """공고 원본 필드의 기관명 (org → client(의뢰 기관) → place(근무 기관)). 없으면 None."""
+    for field in ("org", "client", "place"):
+        v = cand.get(field)
+        if isinstance(v, str) and v.strip():
+            return v.strip()
+    return None
+
+
+def tag_job(title: Optional[str], description: Optional[str]) -> Tuple[Dict[str, Any], float]:
+    """
+    제목+설명 키워드로 features를 채우고 (features, confidence 0~1)을 반환.
+    features 스키마는 SYSTEM_PROMPT와 같다 (warnings는 규칙으로 만들지 않아 항상 []).
+    """
+    text = f"{title or ''} {description or ''}"
+
+    physical, phys_conf, phys_words = _level(text, PHYSICAL_KEYWORDS)
+    interaction, inter_conf, inter_words = _level(text, INTERACTION_KEYWORDS)
+
+    ins, outs = _hits(text, INDOOR_KEYWORDS), _hits(text, OUTDOOR_KEYWORDS)
+    if ins and outs:
+        indoor, indoor_conf = "mixed", 0.7
+    elif ins:
+        indoor, indoor_conf = "indoor", 1.0
+    elif outs:
+        indoor, indoor_conf = "outdoor", 1.0
+    else:
+        indoor, indoor_conf = None, 0.0
+
+    # 공고에 영어 언급이 없으면 대부분 english=false
+    english = bool(ENGLISH_RE.search(text))
+    english_conf = 1.0 if english else 0.8
+
+    tags: List[str] = []
+    for w in ins + outs + phys_words + inter_words:
+        if w not in tags:
+            tags.append(w)
+
+    feats = {
+        "indoor": indoor,
+        "english": english,
+        "physical": physical,
+        "interaction": interaction,
+        "warnings": [],
+        "tags": tags[:MAX_TAGS],
+    }
+    confidence = (WEIGHTS["indoor"] * indoor_conf + WEIGHTS["physical"] * phys_conf
+                  + WEIGHTS["interaction"] * inter_conf + WEIGHTS["english"] * english_conf)
+    return feats, round(confidence, 3)
+
+
+def split_by_rules(cands: List[Dict[str, Any]], threshold: float = DEFAULT_RULE_THRESHOLD
+                   ) -> Tuple[Dict[Any, Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    후보를 규칙으로 태깅해 (job_id -> 보강 결과, LLM으로 보낼 후보)로 나눔.
+    보강 결과는 llm_enrich_batch와 같은 모양 {"org", "desc", "features"} (+ "source": "rule", "confidence").
+    org는 공고 원본 필드(org → client → place)에서 채운다. 기관명을 알 수 없는 공고는 LLM으로 보낸다.
+    """
+    done: Dict[Any, Dict[str, Any]] = {}
+    rest: List[Dict[str, Any]] = []
+    for c in cands:
+        desc = c.get("description") or c.get("desc") or ""
+        feats, conf = tag_job(c.get("title"), desc)
+        org = job_org(c)
+        if conf >= threshold and org:
+            done[c["job_id"]] = {"org": org, "desc": short_desc(desc), "features": feats,
+                                 "source": "rule", "confidence": conf}
+        else:
+            rest.append(c)
+    return done, rest
@@ -0,0 +1,207 @@
+# spool.py
+# 스풀 디렉터리 일괄/상주 실행 (오케스트레이터 --spool)
+# - 디렉터리의 factpack(*.json)을 프로세스 풀로 나눠 Producer → Consumer 실행, 결과는 <out>/<이름>.explain.json
+# - 워커는 시작할 때 한 번만 모듈 import/클라이언트 생성/캐시 연결 → 파일마다 재사용 (warm worker)
+# - 결과는 임시 파일에 쓴 뒤 os.replace로 교체 (중간에 죽어도 반쯤 쓴 결과가 남지 않음)
+# - 출력이 있고 입력보다 새로우면 건너뜀 → 중단 후 다시 실행하면 이어서 처리
+# - watch=True면 새 파일이 생길 때마다 계속 처리 (Ctrl-C로 종료), 끝나면 처리량 요약 출력
+# 사용 예:
+#   summary = run_spool("spool/in", "spool/out", worker_opts, workers=4)
+#   # {"done": 120, "failed": 0, "skipped": 30, "factpacks_per_min": 95.1, "llm_calls_per_min": 1650.3, ...}
+
+import os, json, time, signal
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+OUTPUT_SUFFIX = ".explain.json"
+PRODUCER_SUFFIX = ".ai_1_output.json"
+
+# 워커 프로세스 상태 (_init_worker에서 한 번 채움)
+_W: Dict[str, Any] = {}
+
+
+# ---------------- 파일 ----------------
+def output_path(in_path: str, out_dir: str, suffix: str = OUTPUT_SUFFIX) -> str:
+    stem = os.path.splitext(os.path.basename(in_path))[0]
+    return os.path.join(out_dir, stem + suffix)
+
+
+def is_up_to_date(in_path: str, out_path: str) -> bool:
+    """출력이 있고 입력보다 새로우면 True (재실행 시 건너뜀)"""
+    try:
+        return os.path.getmtime(out_path) >= os.path.getmtime(in_path)
+    except OSError:
+        return False
+
+
+def write_json_atomic(path: str, obj: Any) -> None:
+    """같은 디렉터리 임시 파일에 쓰고 os.replace로 교체 (읽는 쪽은 이전 파일 또는 완성된 파일만 본다)"""
+    tmp = f"{path}.tmp.{os.getpid()}"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def scan(spool_dir: str, out_dir: str) -> Tuple[List[str], int]:
+    """(처리할 입력 경로 목록, 최신이라 건너뛴 수). 쓰는 중인 임시 파일(.tmp/.part, 숨김)은 제외"""
+    todo, skipped = [], 0
+    for name in sorted(os.listdir(spool_dir)):
+        if not name.endswith(".json") or name.startswith("."):
+            continue
+        path = os.path.join(spool_dir, name)
+        if not os.path.isfile(path):
+            continue
+        if is_up_to_date(path, output_path(path, out_dir)):
+            skipped += 1
+        else:
+            todo.append(path)
+    return todo, skipped
+
+
+# ---------------- 워커 ----------------
+def _init_worker(opts: Dict[str, Any]) -> None:
+    """
+    워커 프로세스 초기화: Producer/Consumer import, 클라이언트 하나 공유, 단계별 모델, 캐시 연결.
+    opts: p_opts, c_opts, p_model, c_model, p_cache_db, c_cache_db, pipeline, queue_size, keep_producer
+    """
+    import AI_1_producer as producer
+    import AI_2_consumer as consumer
+    from llm_cache import LLMCache
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C는 부모가 받아 진행 중 작업을 마무리시킴
+    # 클라이언트는 첫 호출 때 한 번 만들어 이 워커의 모든 파일이 같이 쓴다 (llm_backend.shared_client)
+    if opts.get("p_model"):
+        producer.MODEL = opts["p_model"]
+    if opts.get("c_model"):
+        consumer.MODEL = opts["c_model"]
+    p_opts, c_opts = dict(opts.get("p_opts") or {}), dict(opts.get("c_opts") or {})
+    if opts.get("p_cache_db"):
+        p_opts["cache"] = LLMCache(opts["p_cache_db"], table="enrich")
+        p_opts["his_store"] = LLMCache(opts["p_cache_db"], table="his_short")
+    if opts.get("c_cache_db"):
+        c_opts["cache"] = LLMCache(opts["c_cache_db"], table="explain")
+    c_opts.setdefault("progress", False)
+    _W.update(producer=producer, consumer=consumer, p_opts=p_opts, c_opts=c_opts, opts=opts)
+
+
+def _process_one(in_path: str, out_dir: str) -> Dict[str, Any]:
+    """
+    factpack 1개 처리 (워커 프로세스에서 실행).
+    반환: {file, ok, ms, llm_calls, error, metrics(계측 dict)}
+    """
+    from telemetry import TELEMETRY
+
+    producer, consumer, opts = _W["producer"], _W["consumer"], _W["opts"]
+    TELEMETRY.reset()  # 파일 단위 계측 (부모가 합침)
+    start = time.time()
+    res: Dict[str, Any] = {"file": in_path, "ok": False, "error": None}
+    try:
+        with open(in_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if opts.get("pipeline"):
+            from pipeline import run_pipelined
+            enriched, output, _ = run_pipelined(producer, consumer, data, p_opts=_W["p_opts"],
+                                                c_opts=_W["c_opts"], queue_size=opts.get("queue_size", 8))
+        else:
+            enriched = producer.enrich_factpack_with_llm(data, **_W["p_opts"])
+            output = consumer.consumer_pipeline(enriched, **_W["c_opts"])
+        if opts.get("keep_producer"):
+            write_json_atomic(output_path(in_path, out_dir, PRODUCER_SUFFIX), enriched)
+        write_json_atomic(output_path(in_path, out_dir), output)
+        res["ok"] = True
+    except Exception as e:
+        res["error"] = f"{type(e).__name__}: {e}"
+    res["ms"] = round((time.time() - start) * 1000, 2)
+    res["llm_calls"] = len(TELEMETRY.calls)
+    res["metrics"] = TELEMETRY.to_dict()
+    return res
+
+
+# ---------------- 실행 ----------------
+def _files(spool_dir: str, out_dir: str, watch: bool, poll_sec: float, stats: Dict[str, Any]) -> Iterator[str]:
+    """처리할 입력을 차례로 내보냄. watch면 새로 생기거나 바뀐 파일을 계속 찾는다."""
+    seen: Dict[str, float] = {}
+    first = True
+    while True:
+        todo, skipped = scan(spool_dir, out_dir)
+        if first:
+            stats["skipped"] = skipped
+            first = False
+        found = False
+        for path in todo:
+            mtime = os.path.getmtime(path)
+            if seen.get(path) == mtime:  # 이미 보냈거나 실패한 같은 버전
+                continue
+            seen[path] = mtime
+            found = True
+            yield path
+        if not watch:
+            return
+        if not found:
+            yield ""  # 유휴 신호: 끝난 작업을 거두고 잠시 쉼
+            time.sleep(poll_sec)
+
+
+def summarize(stats: Dict[str, Any], elapsed_sec: float) -> Dict[str, Any]:
+    minutes = max(elapsed_sec, 1e-9) / 60
+    return {
+        "done": stats["done"], "failed": stats["failed"], "skipped": stats["skipped"],
+        "elapsed_sec": round(elapsed_sec, 2),
+        "llm_calls": stats["llm_calls"],
+        "factpacks_per_min": round(stats["done"] / minutes, 2),
+        "llm_calls_per_min": round(stats["llm_calls"] / minutes, 2),
+        "errors": stats["errors"][:20],
+    }
+
+
+def run_spool(spool_dir: str, out_dir: str, worker_opts: Dict[str, Any], workers: int = 2,
+              watch: bool = False, poll_sec: float = 2.0, telemetry: Optional[Any] = None,
+              log=print) -> Dict[str, Any]:
+    """
+    스풀 디렉터리를 workers개 프로세스로 처리하고 처리량 요약을 반환.
+    진행 중 작업은 최대 workers*2개 (디렉터리가 커도 제출 대기열이 무한히 늘지 않음).
+    telemetry(Telemetry)를 주면 워커들의 LLM 호출 계측을 합친다.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    stats: Dict[str, Any] = {"done": 0, "failed": 0, "skipped": 0, "llm_calls": 0, "errors": []}
+    start = time.time()
+    limit = max(1, workers) * 2
+
+    def collect(done):
+        for fut in done:
+            r = fut.result()
+            stats["llm_calls"] += r["llm_calls"]
+            if telemetry is not None:
+                telemetry.merge(r["metrics"])
+            if r["ok"]:
+                stats["done"] += 1
+                log(f"✅ {os.path.basename(r['file'])} ({r['ms'] / 1000:.2f}s, LLM {r['llm_calls']}회)")
+            else:
+                stats["failed"] += 1
+                stats["errors"].append({"file": r["file"], "error": r["error"]})
+                log(f"❌ {os.path.basename(r['file'])}: {r['error']}")
+
+    with ProcessPoolExecutor(max_workers=max(1, workers), initializer=_init_worker,
+                             initargs=(worker_opts,)) as pool:
+        pending = set()
+        try:
+            for path in _files(spool_dir, out_dir, watch, poll_sec, stats):
+                if path:
+                    pending.add(pool.submit(_process_one, path, out_dir))
+                while pending and (len(pending) >= limit or not path):
+                    done, pending = wait(pending, timeout=0 if not path else None, return_when=FIRST_COMPLETED)
+                    collect(done)
+                    if not done:
+                        break
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        except KeyboardInterrupt:
+            log("⏹️  중단: 진행 중인 작업만 마무리합니다")
+            for fut in pending:
+                fut.cancel()
+            pool.shutdown(wait=True, cancel_futures=True)
+            collect([f for f in pending if f.done() and not f.cancelled()])
+    return summarize(stats, time.time() - start)
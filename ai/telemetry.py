@@ -0,0 +1,217 @@
+# telemetry.py
+# LLM 호출 계측 (Producer / Consumer / Orchestrator 공용)
+# - 호출마다 지연(ms), prompt/completion 토큰, 재시도 여부, 결과(ok|error|timeout|parse_error|partial)를 기록
+# - (stage, op, attempt) 별 p50/p95/p99 요약 + 합계를 JSON 또는 Prometheus 텍스트로 저장
+# - JSON 파일에는 원시 호출 기록(calls)도 들어 있어 여러 프로세스 결과를 합쳐 다시 백분위를 낼 수 있다
+# - 오케스트레이터 단계(producer/consumer/pipeline) 소요 시간은 LLM 호출과 섞이지 않게 stages로 따로 기록
+# 사용 예:
+#   from telemetry import TELEMETRY
+#   with TELEMETRY.call("consumer", "explain", retry=0) as rec:
+#       resp = client.chat.completions.create(...)
+#       rec.usage(resp)
+#   TELEMETRY.incr("consumer.validation_failed")
+#   TELEMETRY.stage("producer", 12.3)   # 단계 소요 시간(초)
+#   TELEMETRY.write("metrics.json")      # .prom / .txt 이면 Prometheus 텍스트 형식
+
+import os, json, time, threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+from tracing import TRACER
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def quantile(sorted_vals: List[float], q: float) -> float:
+    """선형 보간 백분위 (numpy 기본 방식과 동일). 빈 리스트는 0."""
+    if not sorted_vals:
+        return 0.0
+    pos = (len(sorted_vals) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (pos - lo)
+
+
+def classify_error(e: BaseException) -> str:
+    """예외를 결과 분류로 (openai.APITimeoutError, FakeLLMTimeout, socket timeout → timeout)"""
+    if isinstance(e, ValueError) and type(e).__name__ == "JSONDecodeError":
+        return "parse_error"
+    name = type(e).__name__.lower()
+    return "timeout" if "timeout" in name or "timedout" in name else "error"
+
+
+class CallRecord:
+    """call() 블록 안에서 토큰/결과를 채우는 기록 한 건."""
+
+    __slots__ = ("stage", "op", "retry", "outcome", "latency_ms", "prompt_tokens", "completion_tokens", "ts")
+
+    def __init__(self, stage: str, op: str, retry: int):
+        self.stage, self.op, self.retry = stage, op, retry
+        self.outcome = "ok"
+        self.latency_ms = 0.0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.ts = time.time()
+
+    def usage(self, resp: Any) -> None:
+        """openai 응답의 usage에서 토큰 수를 읽음 (없으면 0)."""
+        u = getattr(resp, "usage", None)
+        self.prompt_tokens = int(getattr(u, "prompt_tokens", 0) or 0)
+        self.completion_tokens = int(getattr(u, "completion_tokens", 0) or 0)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: getattr(self, k) for k in self.__slots__}
+
+
+class Telemetry:
+    """호출 기록/카운터 수집기. 스레드 풀에서 같이 써도 되도록 append만 락으로 보호."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls: List[Dict[str, Any]] = []
+        self.counters: Dict[str, int] = {}
+        self.stages: List[Dict[str, Any]] = []
+
+    # ---------------- 기록 ----------------
+    @contextmanager
+    def call(self, stage: str, op: str, retry: int = 0) -> Iterator[CallRecord]:
+        """
+        블록 실행 시간을 호출 지연으로 기록. 예외가 나면 outcome을 분류해 기록한 뒤 그대로 다시 던진다.
+        블록 안에서 rec.outcome을 바꿀 수 있다 (예: 응답 일부 누락 → "partial").
+        """
+        rec = CallRecord(stage, op, retry)
+        with TRACER.span(f"llm.{op}", cat=stage, retry=retry) as sp:  # --trace 켜졌을 때만 구간 기록
+            start = time.perf_counter()
+            try:
+                yield rec
+            except BaseException as e:
+                rec.outcome = classify_error(e)
+                raise
+            finally:
+                rec.latency_ms = round((time.perf_counter() - start) * 1000, 2)
+                self.add(rec.to_dict())
+                if sp is not None:
+                    sp.update(outcome=rec.outcome, prompt_tokens=rec.prompt_tokens,
+                              completion_tokens=rec.completion_tokens)
+
+    def add(self, call: Dict[str, Any]) -> None:
+        with self._lock:
+            self.calls.append(call)
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def stage(self, name: str, seconds: float) -> None:
+        """파이프라인 단계 하나의 소요 시간 (LLM 호출 수/지연 백분위에는 들어가지 않음)."""
+        with self._lock:
+            self.stages.append({"stage": name, "wall_ms": round(seconds * 1000, 2), "ts": time.time()})
+
+    def merge(self, other: Dict[str, Any]) -> None:
+        """다른 프로세스가 write()한 JSON(dict)의 원시 기록/카운터/단계 시간을 합침."""
+        with self._lock:
+            self.calls.extend(other.get("calls") or [])
+            self.stages.extend(other.get("stages") or [])
+            for k, v in (other.get("counters") or {}).items():
+                self.counters[k] = self.counters.get(k, 0) + v
+
+    def reset(self) -> None:
+        with self._lock:
+            self.calls = []
+            self.counters = {}
+            self.stages = []
+
+    # ---------------- 요약 ----------------
+    def summary(self) -> List[Dict[str, Any]]:
+        """(stage, op, attempt=first|retry) 별 호출 수/결과 분포/지연 백분위/토큰 합계."""
+        with self._lock:
+            calls = list(self.calls)
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for c in calls:
+            key = (c["stage"], c["op"], "retry" if c.get("retry") else "first")
+            groups.setdefault(key, []).append(c)
+        out = []
+        for (stage, op, attempt), cs in sorted(groups.items()):
+            lat = sorted(c["latency_ms"] for c in cs)
+            outcomes: Dict[str, int] = {}
+            for c in cs:
+                outcomes[c["outcome"]] = outcomes.get(c["outcome"], 0) + 1
+            out.append({
+                "stage": stage, "op": op, "attempt": attempt,
+                "calls": len(cs),
+                "outcomes": outcomes,
+                "latency_ms": {"p50": round(quantile(lat, 0.5), 2), "p95": round(quantile(lat, 0.95), 2),
+                               "p99": round(quantile(lat, 0.99), 2), "max": lat[-1], "sum": round(sum(lat), 2)},
+                "prompt_tokens": sum(c["prompt_tokens"] for c in cs),
+                "completion_tokens": sum(c["completion_tokens"] for c in cs),
+            })
+        return out
+
+    def to_dict(self, include_calls: bool = True) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self.counters)
+            calls = list(self.calls)
+            stages = list(self.stages)
+        d: Dict[str, Any] = {"summary": self.summary(), "counters": counters, "stages": stages}
+        if include_calls:
+            d["calls"] = calls
+        return d
+
+    def to_prometheus(self) -> str:
+        """Prometheus 텍스트 노출 형식 (summary 타입 + counter)."""
+        lines = [
+            "# HELP masil_llm_call_latency_ms LLM call latency in milliseconds",
+            "# TYPE masil_llm_call_latency_ms summary",
+        ]
+        rows = self.summary()
+        for r in rows:
+            lab = f'stage="{r["stage"]}",op="{r["op"]}",attempt="{r["attempt"]}"'
+            for q in QUANTILES:
+                lines.append(f'masil_llm_call_latency_ms{{{lab},quantile="{q}"}} {r["latency_ms"]["p" + str(int(q * 100))]}')
+            lines.append(f"masil_llm_call_latency_ms_sum{{{lab}}} {r['latency_ms']['sum']}")
+            lines.append(f"masil_llm_call_latency_ms_count{{{lab}}} {r['calls']}")
+        lines += ["# HELP masil_llm_calls_total LLM calls by outcome", "# TYPE masil_llm_calls_total counter"]
+        for r in rows:
+            for outcome, n in sorted(r["outcomes"].items()):
+                lines.append(f'masil_llm_calls_total{{stage="{r["stage"]}",op="{r["op"]}",attempt="{r["attempt"]}",'
+                             f'outcome="{outcome}"}} {n}')
+        lines += ["# HELP masil_llm_tokens_total LLM tokens", "# TYPE masil_llm_tokens_total counter"]
+        for r in rows:
+            for kind in ("prompt", "completion"):
+                lines.append(f'masil_llm_tokens_total{{stage="{r["stage"]}",op="{r["op"]}",attempt="{r["attempt"]}",'
+                             f'kind="{kind}"}} {r[kind + "_tokens"]}')
+        with self._lock:
+            counters = sorted(self.counters.items())
+            stages = list(self.stages)
+        if stages:
+            by_stage: Dict[str, List[float]] = {}
+            for st in stages:
+                by_stage.setdefault(st["stage"], []).append(st["wall_ms"])
+            lines += ["# HELP masil_stage_wall_ms Pipeline stage wall time in milliseconds",
+                      "# TYPE masil_stage_wall_ms summary"]
+            for name, vals in sorted(by_stage.items()):
+                lines.append(f'masil_stage_wall_ms_sum{{stage="{name}"}} {round(sum(vals), 2)}')
+                lines.append(f'masil_stage_wall_ms_count{{stage="{name}"}} {len(vals)}')
+        if counters:
+            lines += ["# HELP masil_events_total Pipeline event counters", "# TYPE masil_events_total counter"]
+            for name, n in counters:
+                lines.append(f'masil_events_total{{name="{name}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str) -> None:
+        """확장자가 .prom/.txt 면 Prometheus 텍스트, 그 외에는 JSON (원시 호출 기록 포함)."""
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+
+
+def load_metrics(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# 프로세스 전역 수집기 (Producer/Consumer가 같이 씀)
+TELEMETRY = Telemetry()
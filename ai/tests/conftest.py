@@ -0,0 +1,20 @@
+# conftest.py
+# ai/ 스크립트 테스트 공용 설정: ai/를 import 경로에 넣고 LLM은 fake 백엔드만 사용 (네트워크/API 키 없이 실행)
+# 실행: cd ai && python -m pytest -q tests
+
+import os, sys
+
+os.environ["MASIL_LLM_BACKEND"] = "fake"
+os.environ.pop("OPENAI_API_KEY", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from telemetry import TELEMETRY
+
+
+@pytest.fixture(autouse=True)
+def _reset_telemetry():
+    """프로세스 전역 계측을 테스트마다 비움"""
+    TELEMETRY.reset()
+    yield
+    TELEMETRY.reset()
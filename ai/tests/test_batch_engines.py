@@ -0,0 +1,124 @@
+import random
+
+import pytest
+
+import AI_1_producer as producer
+from AI_1_producer import WagePercentileIndex
+
+
+def hhmm(m):
+    return f"{m // 60:02d}:{m % 60:02d}"
+
+
+def random_availability(rng):
+    avail = {}
+    for day in rng.sample(producer.WEEKDAYS, rng.randint(0, 7)):
+        slots = []
+        for _ in range(rng.randint(1, 3)):
+            slots.append([hhmm(rng.randrange(0, 1440, 15)), hhmm(rng.randrange(0, 1440, 15))])
+        avail[day] = slots
+    # 회원가입 화면 형식(한글 요일 + 시간대 이름)도 섞는다
+    for day in rng.sample(list(producer.AVAIL_DAY_ALIASES), rng.randint(0, 2)):
+        avail[day] = rng.sample(list(producer.AVAIL_SLOT_LABELS), rng.randint(0, 3))
+    return avail
+
+
+def random_work_days(rng):
+    r = rng.random()
+    if r < 0.05:
+        return "0000000"
+    if r < 0.1:
+        return rng.choice(["", "101", "1x10101", None])
+    return "".join(rng.choice("01") for _ in range(7))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_time_overlap_batch_equals_scalar(seed):
+    rng = random.Random(seed)
+    avail = random_availability(rng)
+    n = 50
+    work_days = [random_work_days(rng) for _ in range(n)]
+    starts = [hhmm(rng.randrange(0, 1440, 10)) for _ in range(n)]
+    ends = [hhmm(rng.randrange(0, 1440, 10)) for _ in range(n)]
+
+    batch = producer.compute_time_overlap_metrics_batch(avail, work_days, starts, ends)
+    profile = producer.compile_availability(avail)
+    assert batch == producer.compute_time_overlap_metrics_batch(profile, work_days, starts, ends)
+    for i in range(n):
+        assert batch[i] == producer.compute_time_overlap_metrics(avail, work_days[i], starts[i], ends[i])
+
+
+def test_time_overlap_batch_empty():
+    assert producer.compute_time_overlap_metrics_batch({"Mon": [["09:00", "12:00"]]}, [], [], []) == []
+
+
+def test_korean_availability_matches_explicit_slots():
+    korean = {"월": ["오전", "저녁"], "화": [], "토": ["오후"]}
+    explicit = {"Mon": [["06:00", "12:00"], ["18:00", "22:00"]], "Sat": [["12:00", "18:00"]]}
+    assert producer.compile_availability(korean).slots == producer.compile_availability(explicit).slots
+    with pytest.raises(ValueError):
+        producer.compile_availability({"월": ["새벽"]})
+
+
+def test_haversine_batch_equals_scalar():
+    rng = random.Random(0)
+    lat1, lon1 = 37.55, 127.07
+    lats = [rng.uniform(33.0, 38.6) for _ in range(500)]
+    lons = [rng.uniform(124.6, 131.9) for _ in range(500)]
+    dist = producer.haversine_km_batch(lat1, lon1, lats, lons)
+    for d, lat2, lon2 in zip(dist, lats, lons):
+        assert float(d) == pytest.approx(producer.haversine_km(lat1, lon1, lat2, lon2), abs=1e-9)
+
+    rounded = [round(float(d), 2) for d in dist]
+    assert list(producer.estimate_travel_min_batch(rounded)) == [producer.estimate_travel_min(d) for d in rounded]
+
+
+def test_compute_distance_travel_batch_path_equals_scalar_path():
+    rng = random.Random(1)
+    n = producer.GEO_BATCH_MIN * 3
+    cands = [{"job_latitude": 37.55 + rng.uniform(-0.3, 0.3), "job_longitude": 127.07 + rng.uniform(-0.3, 0.3)}
+             for _ in range(n)]
+    cands[3]["job_latitude"] = None  # 좌표 없는 후보는 (None, None)
+    batch = producer.compute_distance_travel(37.55, 127.07, cands)
+    scalar = [producer.compute_distance_travel(37.55, 127.07, [c])[0] for c in cands]  # 1개씩 → 스칼라 경로
+    assert batch == scalar
+    assert batch[3] == (None, None)
+
+
+def test_wage_index_matches_compute_pay_norm():
+    rng = random.Random(2)
+    cands = [{"job_id": i, "place": rng.choice(["강남구", "성동구", "종로구"]),
+              "hourly_wage": rng.choice([9860, 10000, 10500, 11000, 12000, 13500])} for i in range(40)]
+    cands += [{"job_id": 100, "place": "중구", "hourly_wage": 15000}]  # 표본 부족 지역 → 전체 분포
+    index = WagePercentileIndex.from_candidates(cands)
+    for c in cands:
+        region = [x for x in cands if x["place"] == c["place"]]
+        assert index.pay_norm(c["place"], c["hourly_wage"]) == \
+            producer.compute_pay_norm(region, c["hourly_wage"], cands)
+
+
+def test_wage_index_upsert_and_remove():
+    cands = [{"job_id": i, "place": "강남구", "hourly_wage": 10000 + 500 * i} for i in range(6)]
+    index = WagePercentileIndex.from_candidates(cands)
+    assert index.upsert_jobs(cands) == 0  # 같은 값을 다시 넣으면 변화 없음
+
+    cands[0] = dict(cands[0], hourly_wage=20000)
+    assert index.upsert_jobs(cands) == 1
+    rebuilt = WagePercentileIndex.from_candidates(cands)
+    assert index.quartiles("강남구") == rebuilt.quartiles("강남구")
+
+    assert index.remove_job(cands[1])
+    assert not index.remove_job(cands[1])
+    rebuilt = WagePercentileIndex.from_candidates([c for c in cands if c["job_id"] != 1])
+    assert index.quartiles("강남구") == rebuilt.quartiles("강남구")
+    assert index.quartiles(None) == rebuilt.quartiles(None)
+
+
+def test_wage_index_save_load_roundtrip(tmp_path):
+    cands = [{"job_id": i, "place": "성동구", "hourly_wage": 10000 + 100 * i} for i in range(5)]
+    index = WagePercentileIndex.from_candidates(cands)
+    path = tmp_path / "wage_index.json"
+    index.save(str(path))
+    loaded = WagePercentileIndex.load(str(path))
+    assert loaded.quartiles("성동구") == index.quartiles("성동구")
+    assert loaded.upsert_jobs(cands) == 0  # 저장된 job_id도 복원됨
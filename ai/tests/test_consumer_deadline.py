@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+import AI_1_producer as producer
+import AI_2_consumer as consumer
+from llm_backend import FakeOpenAI
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample", "ai_1_input.json")
+
+
+@pytest.fixture(scope="module")
+def enriched():
+    producer.client = FakeOpenAI()
+    try:
+        with open(SAMPLE, "r", encoding="utf-8") as f:
+            return producer.enrich_factpack_with_llm(json.load(f), top_k=6, batch_size=6)
+    finally:
+        producer.client = None
+
+
+@pytest.mark.parametrize("opts", [{}, {"concurrency": 2}, {"explain_batch_size": 2},
+                                  {"concurrency": 2, "explain_batch_size": 2}])
+def test_deadline_missed_counts_every_deadline_template(enriched, monkeypatch, opts):
+    # 호출당 300ms, 마감 500ms → 첫 호출 뒤 남은 후보는 마감 안에 끝나지 못함 (순차/동시 경로 모두)
+    monkeypatch.setattr(consumer, "client", FakeOpenAI(latency="fixed:300"))
+    meta = consumer.consumer_pipeline(enriched, top_k=6, progress=False, deadline_ms=500, **opts)["meta"]
+    assert meta["templated"] > 0
+    assert meta["deadline_missed"] == meta["templated"]
+
+
+def test_no_deadline_misses_without_deadline_pressure(enriched, monkeypatch):
+    monkeypatch.setattr(consumer, "client", FakeOpenAI())
+    meta = consumer.consumer_pipeline(enriched, top_k=6, progress=False, deadline_ms=5000)["meta"]
+    assert meta["templated"] == meta["deadline_missed"] == 0
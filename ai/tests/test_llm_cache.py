@@ -0,0 +1,73 @@
+import llm_cache
+from llm_cache import LLMCache, make_key
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(llm_cache.time, "time", clock)
+    return LLMCache(str(tmp_path / "cache.sqlite"), table="enrich", **kwargs), clock
+
+
+def stored_keys(cache):
+    """조회 시각을 건드리지 않고 저장된 키 목록을 읽음"""
+    return {k for (k,) in cache._conn.execute(f"SELECT key FROM {cache.table}")}
+
+
+def test_make_key_is_order_insensitive_for_dicts():
+    assert make_key("enrich", {"a": 1, "b": 2}) == make_key("enrich", {"b": 2, "a": 1})
+    assert make_key("enrich", "m1", "x") != make_key("enrich", "m2", "x")
+
+
+def test_ttl_expiry(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl_sec=60, max_entries=None)
+    cache.put("a", {"desc": "A"})
+    clock.now += 60
+    assert cache.get("a") == {"desc": "A"}  # 경계값은 아직 유효
+    clock.now += 1
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 1}
+    # 만료 항목은 조회 시 삭제됨
+    (n,) = cache._conn.execute("SELECT COUNT(*) FROM enrich").fetchone()
+    assert n == 0
+
+
+def test_ttl_counts_from_creation_not_access(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl_sec=60, max_entries=None)
+    cache.put("a", 1)
+    for _ in range(3):
+        clock.now += 30
+        cache.get("a")
+    assert cache.get("a") is None
+
+
+def test_lru_evicts_least_recently_accessed(tmp_path, monkeypatch):
+    cache, clock = make_cache(tmp_path, monkeypatch, ttl_sec=None, max_entries=3)
+    for k in ("a", "b", "c"):
+        clock.now += 1
+        cache.put(k, k)
+    clock.now += 1
+    assert cache.get("a") == "a"  # a를 최근 조회로 갱신 → 가장 오래된 것은 b
+    clock.now += 1
+    cache.put("d", "d")
+    assert stored_keys(cache) == {"a", "c", "d"}
+
+    clock.now += 1
+    cache.put_many([("e", "e"), ("f", "f")])  # 두 개 초과 → c, a 순으로 삭제
+    assert stored_keys(cache) == {"d", "e", "f"}
+
+
+def test_persists_across_instances(tmp_path, monkeypatch):
+    cache, _ = make_cache(tmp_path, monkeypatch)
+    cache.put("k", {"items": [1, 2]})
+    cache.close()
+    reopened = LLMCache(str(tmp_path / "cache.sqlite"), table="enrich")
+    assert reopened.get("k") == {"items": [1, 2]}
+    assert LLMCache(str(tmp_path / "cache.sqlite"), table="explain").get("k") is None
@@ -0,0 +1,48 @@
+import copy
+import json
+import os
+
+import AI_1_producer as producer
+from llm_backend import FakeOpenAI
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample", "ai_1_input.json")
+
+
+class RecordingFake(FakeOpenAI):
+    """보낸 enrich 요청의 user_pref_keywords를 기록하는 fake 클라이언트"""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent_keywords = []
+        create = self.chat.completions.create
+
+        def _create(**kw):
+            for m in kw.get("messages") or []:
+                if m.get("role") == "user" and '"candidates"' in str(m.get("content")):
+                    self.sent_keywords.append(json.loads(m["content"]).get("user_pref_keywords"))
+            return create(**kw)
+
+        self.chat.completions.create = _create
+
+
+def factpacks():
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        base = json.load(f)
+    a, b, c = copy.deepcopy(base), copy.deepcopy(base), copy.deepcopy(base)
+    b["user"].update(user_id=456, interests=["요리", "돌봄"])
+    c["user"].update(user_id=789)
+    return [a, b, c]
+
+
+def test_batch_uses_each_users_keywords_and_matches_single_path(monkeypatch):
+    fake = RecordingFake()
+    monkeypatch.setattr(producer, "client", fake)
+    batch = producer.enrich_factpacks_batch(factpacks(), top_k=5, batch_size=5)
+    assert sorted(map(tuple, fake.sent_keywords)) == [("요리", "돌봄"), ("정원", "실내")]
+    assert batch[0]["meta"]["batch"]["keyword_groups"] == 2
+    assert batch[0]["meta"]["batch"]["enriched_jobs"] == 10
+
+    for fp, out in zip(factpacks(), batch):
+        single = producer.enrich_factpack_with_llm(fp, top_k=5, batch_size=5)
+        assert out["user"] == single["user"]
+        assert out["candidates"] == single["candidates"]
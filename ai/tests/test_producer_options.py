@@ -0,0 +1,32 @@
+import json
+import os
+import sys
+
+import AI_1_producer as producer
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample", "ai_1_input.json")
+
+
+def test_cli_options_do_not_leak_into_module_defaults(tmp_path, monkeypatch):
+    before = (producer.ENRICH_TOKEN_BUDGET, producer.ENRICH_MAX_SPLIT_DEPTH, producer.RULE_THRESHOLD)
+    out = tmp_path / "out.json"
+    monkeypatch.setattr(sys, "argv", ["AI_1_producer.py", SAMPLE, "-o", str(out), "-k", "5", "--token_budget", "1",
+                                      "--max_split_depth", "0", "--fast_path", "--rule_threshold", "0.5"])
+    producer.main()
+    assert (producer.ENRICH_TOKEN_BUDGET, producer.ENRICH_MAX_SPLIT_DEPTH, producer.RULE_THRESHOLD) == before
+    meta = json.loads(out.read_text(encoding="utf-8"))["meta"]
+    assert "rule_bypass_ratio" in meta
+
+    # 같은 프로세스의 다음 실행(오케스트레이터 --inproc/파이프라인/스풀 워커)은 기본 설정 그대로
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        enriched = producer.enrich_factpack_with_llm(json.load(f), top_k=5, batch_size=5)
+    assert "rule_bypass_ratio" not in enriched["meta"]
+    assert {c["enrich"]["source"] for c in enriched["candidates"]} == {"llm"}
+
+
+def test_rule_threshold_is_per_call():
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    fast = producer.enrich_factpack_with_llm(data, top_k=5, batch_size=5, rule_threshold=0.5)
+    assert fast["meta"]["rule_bypass_ratio"] > 0
+    assert any(c["enrich"]["source"] == "rule" for c in fast["candidates"])
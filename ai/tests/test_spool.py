@@ -0,0 +1,67 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import spool
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample", "ai_1_input.json")
+
+
+def set_mtime(path, t):
+    os.utime(path, (t, t))
+
+
+def test_write_json_atomic_replaces_and_leaves_no_temp(tmp_path):
+    path = tmp_path / "out.json"
+    spool.write_json_atomic(str(path), {"v": 1})
+    spool.write_json_atomic(str(path), {"v": 2, "text": "한글"})
+    assert json.loads(path.read_text(encoding="utf-8")) == {"v": 2, "text": "한글"}
+    assert os.listdir(tmp_path) == ["out.json"]
+
+
+def test_write_json_atomic_keeps_previous_file_on_failure(tmp_path):
+    path = tmp_path / "out.json"
+    spool.write_json_atomic(str(path), {"v": 1})
+    with pytest.raises(TypeError):
+        spool.write_json_atomic(str(path), {"v": 2, "bad": object()})  # 직렬화 도중 실패
+    assert json.loads(path.read_text(encoding="utf-8")) == {"v": 1}
+
+
+def test_scan_skips_up_to_date_and_temp_files(tmp_path):
+    in_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    in_dir.mkdir(); out_dir.mkdir()
+    for name in ("a.json", "b.json", "c.json", ".hidden.json", "d.json.tmp.123", "e.json.part", "notes.txt"):
+        (in_dir / name).write_text("{}", encoding="utf-8")
+    (in_dir / "sub.json").mkdir()
+    for name in ("a.json", "b.json", "c.json"):
+        set_mtime(in_dir / name, 1000)
+
+    (out_dir / "a.explain.json").write_text("{}", encoding="utf-8")
+    set_mtime(out_dir / "a.explain.json", 2000)   # 입력보다 새로움 → 건너뜀
+    (out_dir / "b.explain.json").write_text("{}", encoding="utf-8")
+    set_mtime(out_dir / "b.explain.json", 500)    # 입력이 더 새로움 → 다시 처리
+
+    todo, skipped = spool.scan(str(in_dir), str(out_dir))
+    assert [os.path.basename(p) for p in todo] == ["b.json", "c.json"]
+    assert skipped == 1
+
+
+def test_run_spool_processes_then_skips_on_rerun(tmp_path):
+    in_dir, out_dir = tmp_path / "in", tmp_path / "out"
+    in_dir.mkdir()
+    for name in ("u1.json", "u2.json"):
+        shutil.copy(SAMPLE, in_dir / name)
+    (in_dir / "broken.json").write_text("{", encoding="utf-8")
+    opts = {"p_opts": {"top_k": 3, "batch_size": 3}, "c_opts": {"top_k": 2}}
+
+    first = spool.run_spool(str(in_dir), str(out_dir), opts, workers=1, log=lambda *_: None)
+    assert (first["done"], first["failed"], first["skipped"]) == (2, 1, 0)
+    assert first["llm_calls"] > 0
+    assert sorted(os.listdir(out_dir)) == ["u1.explain.json", "u2.explain.json"]
+    out = json.loads((out_dir / "u1.explain.json").read_text(encoding="utf-8"))
+    assert len(out["items"]) == 2
+
+    again = spool.run_spool(str(in_dir), str(out_dir), opts, workers=1, log=lambda *_: None)
+    assert (again["done"], again["failed"], again["skipped"]) == (0, 1, 2)
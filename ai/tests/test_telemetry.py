@@ -0,0 +1,80 @@
+import json
+import os
+
+import pytest
+
+import AI_1_producer as producer
+import AI_2_consumer as consumer
+from llm_backend import FakeOpenAI
+from telemetry import TELEMETRY, Telemetry
+
+SAMPLE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sample", "ai_1_input.json")
+
+
+@pytest.fixture
+def factpack():
+    with open(SAMPLE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def inject(monkeypatch):
+    """모듈의 client에 fake 클라이언트를 주입 (테스트가 끝나면 원래대로)"""
+    def _inject(module, **kwargs):
+        monkeypatch.setattr(module, "client", FakeOpenAI(**kwargs))
+    return _inject
+
+
+def outcomes(stage, op):
+    out = {}
+    for row in TELEMETRY.summary():
+        if row["stage"] == stage and row["op"] == op:
+            for k, n in row["outcomes"].items():
+                out[k] = out.get(k, 0) + n
+    return out
+
+
+def test_consumer_malformed_response_is_parse_error(factpack, inject):
+    inject(producer)
+    fp = producer.enrich_factpack_with_llm(factpack, top_k=3, batch_size=3)
+    TELEMETRY.reset()
+    inject(consumer, canned={"*": "not json {"})
+    out = consumer.consumer_pipeline(fp, top_k=2, progress=False)
+    assert all(it["fallback"] for it in out["items"])
+    assert outcomes("consumer", "explain") == {"parse_error": 2}
+
+
+def test_consumer_batch_non_object_response_is_parse_error(factpack, inject):
+    inject(producer)
+    fp = producer.enrich_factpack_with_llm(factpack, top_k=2, batch_size=2)
+    TELEMETRY.reset()
+    inject(consumer, canned={"*": "[1, 2]"})
+    consumer.consumer_pipeline(fp, top_k=2, progress=False, explain_batch_size=2)
+    assert set(outcomes("consumer", "explain_batch")) == {"parse_error"}
+
+
+def test_producer_malformed_enrich_response_is_parse_error(factpack, inject):
+    inject(producer, canned={"*": "```json\n{\"items\": [\n```"})
+    out = producer.enrich_factpack_with_llm(factpack, top_k=2, batch_size=2)
+    assert [c["enrich"]["source"] for c in out["candidates"]] == ["fallback", "fallback"]
+    assert set(outcomes("producer", "enrich")) == {"parse_error"}
+
+
+def test_valid_responses_are_ok(factpack, inject):
+    inject(producer)
+    inject(consumer)
+    fp = producer.enrich_factpack_with_llm(factpack, top_k=3, batch_size=3)
+    consumer.consumer_pipeline(fp, top_k=3, progress=False)
+    assert outcomes("producer", "enrich") == {"ok": 1}
+    assert outcomes("consumer", "explain") == {"ok": 3}
+
+
+def test_prometheus_reports_parse_errors_and_stages_separately():
+    t = Telemetry()
+    t.add({"stage": "consumer", "op": "explain", "retry": 0, "outcome": "parse_error", "latency_ms": 5.0,
+           "prompt_tokens": 0, "completion_tokens": 0, "ts": 0})
+    t.stage("consumer", 1.5)
+    text = t.to_prometheus()
+    assert 'masil_llm_calls_total{stage="consumer",op="explain",attempt="first",outcome="parse_error"} 1' in text
+    assert 'masil_stage_wall_ms_sum{stage="consumer"} 1500.0' in text
+    assert 'stage="orchestrator"' not in text
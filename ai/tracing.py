@@ -0,0 +1,144 @@
+# tracing.py
+# 실행 구간(span) 기록 → Chrome trace-event JSON (chrome://tracing, https://ui.perfetto.dev 에서 열기)
+# - 기본은 꺼져 있음: span()/traced()는 TRACER.enabled 확인 한 번만 하고 아무것도 기록하지 않는다
+# - 켜면(--trace out.json) 구간마다 "X"(complete) 이벤트 {name, cat, ts, dur, pid, tid, args}를 모은다
+# - ts는 epoch 기준 µs라 여러 프로세스(오케스트레이터 하위 프로세스)의 파일을 합쳐도 시간축이 맞는다
+# 사용 예:
+#   from tracing import TRACER, traced
+#   TRACER.enable("producer")
+#   with TRACER.span("io.read", cat="io", path=path):
+#       data = json.load(f)
+#   @traced("score", cat="producer")
+#   def score_candidates(...): ...
+#   TRACER.write("trace.json")
+
+import os, json, time, threading
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# perf_counter(단조 증가)를 epoch에 맞춰 µs로 변환하는 기준점
+_EPOCH0 = time.time()
+_PC0 = time.perf_counter()
+
+
+def now_us() -> float:
+    return (_EPOCH0 + (time.perf_counter() - _PC0)) * 1e6
+
+
+class _NoopSpan:
+    """꺼져 있을 때 돌려주는 공용 컨텍스트 (기록 없음, as 값은 None)"""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("tracer", "event", "start")
+
+    def __init__(self, tracer: "Tracer", name: str, cat: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.event = {"name": name, "cat": cat, "ph": "X", "args": args}
+
+    def __enter__(self) -> Dict[str, Any]:
+        self.start = now_us()
+        return self.event["args"]  # 블록 안에서 결과(outcome 등)를 덧붙일 수 있게
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        ev = self.event
+        ev["ts"] = round(self.start, 1)
+        ev["dur"] = round(now_us() - self.start, 1)
+        if exc_type is not None:
+            ev["args"]["error"] = exc_type.__name__
+        self.tracer._add(ev)
+        return False
+
+
+class Tracer:
+    """구간 기록기. 스레드 풀에서 같이 써도 되도록 추가만 락으로 보호 (tid로 스레드별 줄 구분)."""
+
+    def __init__(self):
+        self.enabled = False
+        self._lock = threading.Lock()
+        self.events: List[Dict[str, Any]] = []
+        self._threads: set = set()
+        self.process_name = ""
+
+    def enable(self, process_name: str = "") -> None:
+        self.enabled = True
+        self.process_name = process_name or self.process_name
+        if self.process_name:
+            self._add({"name": "process_name", "ph": "M", "args": {"name": self.process_name}}, meta=True)
+
+    def span(self, name: str, cat: str = "", **args: Any):
+        """with TRACER.span("llm.enrich", cat="producer", n=5) as a: ... (꺼져 있으면 a는 None)"""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, cat, args)
+
+    def instant(self, name: str, cat: str = "", **args: Any) -> None:
+        if self.enabled:
+            self._add({"name": name, "cat": cat, "ph": "i", "s": "t", "ts": round(now_us(), 1), "args": args})
+
+    def _add(self, ev: Dict[str, Any], meta: bool = False) -> None:
+        th = threading.current_thread()
+        ev["pid"] = os.getpid()
+        ev["tid"] = th.ident
+        with self._lock:
+            if not meta and th.ident not in self._threads:
+                self._threads.add(th.ident)
+                self.events.append({"name": "thread_name", "ph": "M", "pid": ev["pid"], "tid": th.ident,
+                                    "args": {"name": th.name}})
+            self.events.append(ev)
+
+    def extend(self, events: Iterable[Dict[str, Any]]) -> None:
+        """다른 프로세스가 쓴 이벤트를 합침 (pid가 달라 Chrome 트레이스에서 프로세스별로 나뉜다)"""
+        with self._lock:
+            self.events.extend(events)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.events = []
+            self._threads = set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"traceEvents": list(self.events), "displayTimeUnit": "ms"}
+
+    def write(self, path: str) -> None:
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("traceEvents", []) if isinstance(data, dict) else data
+
+
+# 프로세스 전역 기록기 (Producer/Consumer/Orchestrator가 같이 씀)
+TRACER = Tracer()
+
+
+def traced(name: Optional[str] = None, cat: str = "") -> Callable:
+    """함수 전체를 구간으로 기록하는 데코레이터 (꺼져 있으면 enabled 확인 후 바로 원래 함수 호출)"""
+    def deco(fn: Callable) -> Callable:
+        label = name or fn.__name__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not TRACER.enabled:
+                return fn(*args, **kwargs)
+            with _Span(TRACER, label, cat, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
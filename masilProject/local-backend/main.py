@@ -2,28 +2,57 @@ import hashlib
 import json
 import math
 import os
+import sys
+import threading
 import traceback
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Tuple
 from uuid import UUID
 
-import numpy as np
 import requests
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-from openai import OpenAI
 from pydantic import BaseModel, Field
-from supabase import Client, create_client
 
 # --- 1. 초기화 ---
 load_dotenv()
 
 # Supabase 및 OpenAI 클라이언트
+# 첫 사용 시 생성 (워커 기동 시 supabase/openai import와 연결 생성을 건너뜀)
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+_supabase = None
+_openai = None
+_client_lock = threading.Lock()
+# MASIL_LLM_BACKEND=fake|record|replay 이면 AI 스크립트와 같은 llm_backend 대역 클라이언트 사용 (오프라인 부하 테스트)
+AI_DIR = os.getenv("MASIL_AI_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "ai"))
+
+def get_supabase():
+    global _supabase
+    if _supabase is None:
+        with _client_lock:
+            if _supabase is None:
+                from supabase import create_client
+                _supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+    return _supabase
+
+def get_openai():
+    global _openai
+    if _openai is None:
+        with _client_lock:
+            if _openai is None:
+                backend = (os.getenv("MASIL_LLM_BACKEND") or "openai").lower()
+                if backend == "openai":
+                    from openai import OpenAI
+                    _openai = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+                else:
+                    if AI_DIR not in sys.path:
+                        sys.path.insert(0, AI_DIR)
+                    from llm_backend import make_client
+                    _openai = make_client(backend)
+    return _openai
 
 # FastAPI 앱
 app = FastAPI()
@@ -74,7 +103,92 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
     return R * c
 
-# (기타 compute_time_overlap, llm_enrich_batch 등 필요한 유틸 함수들을 여기에 추가합니다)
+# 후보 수가 이 값 이상이면 거리를 NumPy 배열 연산으로 한 번에 계산
+GEO_BATCH_MIN = 32
+
+def haversine_km_batch(lat1: float, lon1: float, lats2, lons2) -> "np.ndarray":
+    """haversine_km의 배열 버전: 사용자 좌표 1개 × 일자리 좌표 열 -> 거리(km) 배열."""
+    import numpy as np  # 후보가 많을 때만 필요 → 기동 경로에서 제외
+    R = 6371.0088
+    lats2 = np.asarray(lats2, dtype=np.float64)
+    lons2 = np.asarray(lons2, dtype=np.float64)
+    phi1, phi2 = math.radians(lat1), np.radians(lats2)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lons2 - lon1)
+    a = np.sin(dphi / 2) ** 2 + math.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return R * c
+
+def compute_distances(home_lat, home_lon, jobs: List[Dict[str, Any]]) -> List[Optional[float]]:
+    """
+    일자리별 거리(km). 사용자/일자리 좌표가 하나라도 없으면 None (AI-1 compute_distance_travel과 같은 규칙).
+    좌표가 있는 일자리가 GEO_BATCH_MIN개 이상이면 배열 버전으로 계산.
+    """
+    def is_num(x): return isinstance(x, (int, float))
+    out: List[Optional[float]] = [None] * len(jobs)
+    if not (is_num(home_lat) and is_num(home_lon)):
+        return out
+    idx = [i for i, job in enumerate(jobs) if is_num(job.get('job_latitude')) and is_num(job.get('job_longitude'))]
+    if len(idx) < GEO_BATCH_MIN:
+        for i in idx:
+            out[i] = haversine_km(home_lat, home_lon, jobs[i]['job_latitude'], jobs[i]['job_longitude'])
+        return out
+    dist = haversine_km_batch(home_lat, home_lon,
+                              [jobs[i]['job_latitude'] for i in idx],
+                              [jobs[i]['job_longitude'] for i in idx])
+    for j, i in enumerate(idx):
+        out[i] = float(dist[j])
+    return out
+
+# 가용 시간 파싱/시간 겹침 지표는 AI-1 Producer 구현을 그대로 사용 (회원가입 화면의 한글 요일/시간대 형식 포함)
+# Producer 모듈은 numpy를 쓰므로 첫 추천 요청 때 import (워커 기동 경로에서 제외)
+_ai1 = None
+
+def get_ai1():
+    global _ai1
+    if _ai1 is None:
+        with _client_lock:
+            if _ai1 is None:
+                if AI_DIR not in sys.path:
+                    sys.path.insert(0, AI_DIR)
+                import AI_1_producer
+                _ai1 = AI_1_producer
+    return _ai1
+
+# 사용자별 가용 시간 프로필 캐시 (요청 간 재사용, LRU)
+AVAIL_PROFILE_CACHE_SIZE = 1024
+_avail_profile_cache: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+
+def get_availability_profile(user_id: str, availability_json: Any) -> Optional[Any]:
+    """
+    user_id로 캐시된 AvailabilityProfile을 돌려준다. 캐시 키는 (user_id, availability_json 원문)이라
+    프로필 화면에서 가용 시간을 바꾸면 다시 컴파일한다. 비어 있거나 형식이 잘못됐으면 None.
+    """
+    if not availability_json:
+        return None
+    raw = availability_json if isinstance(availability_json, str) else \
+        json.dumps(availability_json, sort_keys=True, ensure_ascii=False)
+    entry = _avail_profile_cache.get(user_id)
+    if entry is not None and entry[0] == raw:
+        _avail_profile_cache.move_to_end(user_id)
+        return entry[1]
+    try:
+        profile = get_ai1().compile_availability(availability_json)
+    except ImportError as e:
+        print(f"[recommend] AI-1 모듈을 불러오지 못함 ({e}), time_fit 생략")
+        return None
+    except Exception:
+        print(f"[recommend] availability_json 형식 오류 (user_id={user_id}), time_fit 생략")
+        return None
+    if profile.total_min == 0:
+        return None
+    _avail_profile_cache[user_id] = (raw, profile)
+    _avail_profile_cache.move_to_end(user_id)
+    while len(_avail_profile_cache) > AVAIL_PROFILE_CACHE_SIZE:
+        _avail_profile_cache.popitem(last=False)
+    return profile
+
+# (기타 llm_enrich_batch 등 필요한 유틸 함수들을 여기에 추가합니다)
 
 # --- 4. API 엔드포인트 ---
 
@@ -83,11 +197,11 @@ def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
 def create_job(job: Job):
     text_to_embed = f"제목: {job.title}\n내용: {job.description}\n장소: {job.place}\n클라이언트: {job.client}"
     try:
-        embedding_response = client.embeddings.create(input=[text_to_embed], model="text-embedding-3-small")
+        embedding_response = get_openai().embeddings.create(input=[text_to_embed], model="text-embedding-3-small")
         embedding_vector = embedding_response.data[0].embedding
         job_data = job.model_dump()
         job_data["embedding"] = embedding_vector
-        response = supabase.from_("jobs").insert(job_data).execute()
+        response = get_supabase().from_("jobs").insert(job_data).execute()
         return response.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"데이터 생성 실패: {str(e)}")
@@ -102,14 +216,14 @@ def get_jobs(
 ):
     try:
         if latitude is not None and longitude is not None:
-            response = supabase.rpc('nearby_jobs', {
+            response = get_supabase().rpc('nearby_jobs', {
                 'user_lat': latitude, 'user_lon': longitude,
                 'radius_meters': radius_km * 1000, 'result_limit': limit
             }).execute()
             return response.data
         else:
             select_query = "job_id, title, job_latitude, job_longitude" if view == 'map' else "*"
-            response = supabase.from_("jobs").select(select_query).order("created_at", desc=True).limit(limit).execute()
+            response = get_supabase().from_("jobs").select(select_query).order("created_at", desc=True).limit(limit).execute()
             return response.data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"데이터 조회 실패: {str(e)}")
@@ -117,7 +231,7 @@ def get_jobs(
 @app.get("/api/jobs/{job_id}")
 def get_job_by_id(job_id: int):
     try:
-        response = supabase.from_("jobs").select("*").eq("job_id", job_id).single().execute()
+        response = get_supabase().from_("jobs").select("*").eq("job_id", job_id).single().execute()
         return response.data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"ID {job_id} 조회 실패: {str(e)}")
@@ -126,12 +240,12 @@ def get_job_by_id(job_id: int):
 def update_job(job_id: int, job: Job):
     text_to_embed = f"제목: {job.title}\n내용: {job.description}\n장소: {job.place}\n클라이언트: {job.client}"
     try:
-        embedding_response = client.embeddings.create(input=[text_to_embed], model="text-embedding-3-small")
+        embedding_response = get_openai().embeddings.create(input=[text_to_embed], model="text-embedding-3-small")
         embedding_vector = embedding_response.data[0].embedding
         job_data = job.model_dump()
         job_data["embedding"] = embedding_vector
         job_data["updated_at"] = "now()"
-        response = supabase.from_("jobs").update(job_data).eq("job_id", job_id).execute()
+        response = get_supabase().from_("jobs").update(job_data).eq("job_id", job_id).execute()
         return response.data[0]
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"데이터 수정 실패: {str(e)}")
@@ -139,7 +253,7 @@ def update_job(job_id: int, job: Job):
 @app.delete("/api/jobs/{job_id}")
 def delete_job(job_id: int):
     try:
-        response = supabase.from_("jobs").delete().eq("job_id", job_id).execute()
+        response = get_supabase().from_("jobs").delete().eq("job_id", job_id).execute()
         if not response.data:
             raise HTTPException(status_code=404, detail=f"ID {job_id}를 찾을 수 없습니다.")
         return {"message": f"ID {job_id}가 성공적으로 삭제되었습니다."}
@@ -154,14 +268,14 @@ def create_review_for_job(job_id: int, review: Review):
         review_data = review.model_dump()
         review_data["job_id"] = job_id
         review_data["user_id"] = str(review.user_id)
-        supabase.from_("user_job_reviews").insert(review_data).execute()
+        get_supabase().from_("user_job_reviews").insert(review_data).execute()
         
-        agg_response = supabase.from_("user_job_reviews").select("rating", count="exact").eq("job_id", job_id).execute()
+        agg_response = get_supabase().from_("user_job_reviews").select("rating", count="exact").eq("job_id", job_id).execute()
         ratings = [item['rating'] for item in agg_response.data if item.get('rating') is not None]
         new_review_count = agg_response.count
         new_avg_rating = sum(ratings) / len(ratings) if ratings else 0
 
-        supabase.from_("jobs").update({
+        get_supabase().from_("jobs").update({
             # "average_rating": new_avg_rating,
             # "review_count": new_review_count
         }).eq("job_id", job_id).execute()
@@ -173,7 +287,7 @@ def create_review_for_job(job_id: int, review: Review):
 @app.get("/api/jobs/{job_id}/reviews")
 def get_reviews_for_job(job_id: int):
     try:
-        response = supabase.from_("user_job_reviews").select("*").eq("job_id", job_id).execute()
+        response = get_supabase().from_("user_job_reviews").select("*").eq("job_id", job_id).execute()
         return response.data
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"리뷰 조회 실패: {str(e)}")
@@ -187,7 +301,7 @@ class SessionUpdateRequest(BaseModel):
 @app.post("/api/users/update-session")
 def update_user_session(request: SessionUpdateRequest):
     try:
-        response = supabase.from_("users").update({
+        response = get_supabase().from_("users").update({
             "latest_session_id": str(request.session_id)
         }).eq("id", str(request.user_id)).execute()
         if not response.data:
@@ -226,17 +340,17 @@ def recommend_jobs(request: RecommendRequest):
     """(동기 최종본) 사용자 질문을 받아 RAG 파이프라인을 실행하고 추천 결과를 반환합니다."""
     try:
         # --- 1단계: 사용자 컨텍스트 조회 ---
-        user_response = supabase.from_("users").select("*").eq("id", str(request.user_id)).single().execute()
+        user_response = get_supabase().from_("users").select("*").eq("id", str(request.user_id)).single().execute()
         user_ctx = user_response.data
         if not user_ctx:
             raise HTTPException(status_code=404, detail="사용자 정보를 찾을 수 없습니다.")
 
         # --- 2단계: 쿼리 임베딩 ---
-        embedding_response = client.embeddings.create(input=[request.query], model="text-embedding-3-small")
+        embedding_response = get_openai().embeddings.create(input=[request.query], model="text-embedding-3-small")
         query_embedding = embedding_response.data[0].embedding
 
         # --- 3단계: 후보군 검색 (Retrieval) ---
-        candidates_response = supabase.rpc('match_jobs', {
+        candidates_response = get_supabase().rpc('match_jobs', {
             'query_embedding': query_embedding,
             'match_threshold': 0.3, # 실제 서비스에서는 이 값을 튜닝해야 합니다.
             'match_count': 50
@@ -249,18 +363,29 @@ def recommend_jobs(request: RecommendRequest):
         retrieved_ids = [job['job_id'] for job in retrieved_jobs]
         similarity_map = {job['job_id']: job['similarity'] for job in retrieved_jobs}
         
-        full_candidates_response = supabase.from_("jobs").select("*").in_("job_id", retrieved_ids).execute()
+        full_candidates_response = get_supabase().from_("jobs").select("*").in_("job_id", retrieved_ids).execute()
         candidates = full_candidates_response.data
 
         # --- 4단계: 필터링 및 재정렬 (Filtering & Reranking) ---
         reranked_jobs = []
-        for job in candidates:
-            # 거리 계산
-            distance_km = haversine_km(
-                user_ctx.get('home_latitude'), user_ctx.get('home_longitude'),
-                job.get('job_latitude'), job.get('job_longitude')
-            )
-            # TODO: AI-1의 상세 계산 로직 (시간 겹침, 임금 정규화 등)을 여기에 추가합니다.
+        # 거리 계산 (후보가 많으면 배열 연산으로 한 번에, 좌표가 없는 후보는 None)
+        distances = compute_distances(user_ctx.get('home_latitude'), user_ctx.get('home_longitude'), candidates)
+
+        # 사용자 가용 시간은 user_id별로 한 번만 컴파일해 요청 간 재사용
+        avail_profile = get_availability_profile(str(request.user_id), user_ctx.get('availability_json'))
+
+        for job, distance_km in zip(candidates, distances):
+            if distance_km is None:  # 좌표가 없으면 거리 점수를 낼 수 없어 제외
+                continue
+            # 시간 겹침 (참고 지표로만 응답에 포함, 점수에는 아직 반영하지 않음 → 형식 오류면 이 공고만 생략)
+            if avail_profile is not None and job.get('start_time') and job.get('end_time'):
+                try:
+                    job['time_fit'] = get_ai1().time_overlap_metrics_from_profile(
+                        avail_profile, job.get('work_days'), job['start_time'], job['end_time']
+                    )['time_fit']
+                except Exception:
+                    pass
+            # TODO: AI-1의 임금 정규화 등 상세 계산 로직을 여기에 추가합니다.
             
             # 최종 점수 계산 (예시: 의미유사도 70%, 거리 30%)
             distance_score = 1 - (distance_km / 20) if distance_km <= 20 else 0 # 20km를 최대 거리로 가정
@@ -286,7 +411,7 @@ def recommend_jobs(request: RecommendRequest):
                         [질문]
                         {request.query}"""
 
-        chat_response = client.chat.completions.create(
+        chat_response = get_openai().chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}]
         )